@@ -1,3 +1,3 @@
-from .client import JsonRPCClient, JsonRPCError
-from .mixin import EthereumMixin
+from .client import AccountSnapshot, FilterWatch, JsonRPCClient, JsonRPCError, Series
+from .mixin import EthereumMixin, get_application_client, start_ethereum_client, stop_ethereum_client
 from .utils import prepare_ethereum_jsonrpc_client
@@ -0,0 +1,336 @@
+"""Encoders and decoders generated per function signature.
+
+The generic ethereum.abi functions re-parse every type string and walk
+every value on each call. For the common elementary types (intN, uintN,
+address, bool, bytesN, bytes and string) the code here is generated once
+per list of types, so encoding and decoding come down to slicing and
+int.to_bytes/int.from_bytes calls, with addresses decoded straight to 0x
+prefixed strings.
+
+Anything the generated code doesn't handle, whether an unsupported type
+or an argument it isn't sure about, goes through ethereum.abi instead so
+results and errors are always the same as the generic path"""
+
+import re
+
+from ethereum.abi import encode_abi, decode_abi
+
+ZERO_WORD = b'\x00' * 32
+
+ELEMENTARY_TYPE_RE = re.compile(r"^(uint|int|address|bool|bytes|string)([0-9]*)$")
+
+def _fix_address(val):
+    if isinstance(val, bytes):
+        val = val.decode('ascii')
+    if val.startswith('0x'):
+        return val
+    return '0x{}'.format(val)
+
+def fix_address_decoding(decoded, types):
+    """ethereum library result decoding doesn't add 0x to addresses
+    this parses the decoded results and adds 0x to any address types"""
+    rval = []
+    for val, type in zip(decoded, types):
+        if type == 'address':
+            rval.append(_fix_address(val))
+        elif type == 'address[]':
+            rval.append([_fix_address(v) for v in val])
+        else:
+            rval.append(val)
+    return rval
+
+class _Fallback(Exception):
+    """raised by generated code when the generic ethereum.abi path should be used"""
+
+def parse_type(typ):
+    """returns (base, bits) for supported elementary types, or None"""
+
+    m = ELEMENTARY_TYPE_RE.match(typ)
+    if m is None:
+        return None
+    base, sub = m.groups()
+    if base in ('uint', 'int'):
+        # ethereum.abi requires the size (the abi from solc always has it)
+        if not sub:
+            return None
+        bits = int(sub)
+        if bits % 8 or not 8 <= bits <= 256:
+            return None
+        return base, bits
+    if base == 'bytes':
+        if not sub:
+            return 'dynbytes', None
+        size = int(sub)
+        if not 1 <= size <= 32:
+            return None
+        return base, size
+    if sub:
+        return None
+    return base, None
+
+def _uint_encoder(bits):
+    limit = 1 << bits
+
+    def encode_uint(value):
+        if type(value) is not int or not 0 <= value < limit:
+            raise _Fallback()
+        return value.to_bytes(32, 'big')
+    return encode_uint
+
+def _int_encoder(bits):
+    low = -(1 << (bits - 1))
+    high = 1 << (bits - 1)
+
+    def encode_int(value):
+        if type(value) is not int or not low <= value < high:
+            raise _Fallback()
+        return value.to_bytes(32, 'big', signed=True)
+    return encode_int
+
+def _encode_address(value):
+    if isinstance(value, bytes):
+        if len(value) != 20:
+            raise _Fallback()
+        return b'\x00' * 12 + value
+    if isinstance(value, str):
+        if len(value) == 42 and value[:2] == '0x':
+            value = value[2:]
+        elif len(value) != 40:
+            raise _Fallback()
+        try:
+            return b'\x00' * 12 + bytes.fromhex(value)
+        except ValueError:
+            raise _Fallback()
+    raise _Fallback()
+
+def _encode_bool(value):
+    if value is True:
+        return b'\x00' * 31 + b'\x01'
+    if value is False:
+        return ZERO_WORD
+    raise _Fallback()
+
+def _bytes_encoder(size):
+
+    def encode_bytes(value):
+        if not isinstance(value, bytes) or len(value) > size:
+            raise _Fallback()
+        return value.ljust(32, b'\x00')
+    return encode_bytes
+
+def _encode_dynbytes(value):
+    if not isinstance(value, bytes):
+        raise _Fallback()
+    length = len(value)
+    padded = (length + 31) // 32 * 32
+    return length.to_bytes(32, 'big') + value.ljust(padded, b'\x00')
+
+def _encode_string(value):
+    if not isinstance(value, bytes):
+        raise _Fallback()
+    # ethereum.abi rejects strings that aren't valid utf8
+    try:
+        value.decode('utf-8')
+    except UnicodeDecodeError:
+        raise _Fallback()
+    return _encode_dynbytes(value)
+
+def _int_decoder(bits):
+    mask = (1 << bits) - 1
+    half = 1 << (bits - 1)
+    full = 1 << bits
+
+    def decode_int(word):
+        value = int.from_bytes(word, 'big') & mask
+        if value >= half:
+            return value - full
+        return value
+    return decode_int
+
+def _decode_dynbytes(data, pos):
+    offset = int.from_bytes(data[pos:pos + 32], 'big')
+    length = int.from_bytes(data[offset:offset + 32], 'big')
+    end = offset + 32 + length
+    if end > len(data):
+        raise _Fallback()
+    return data[offset + 32:end]
+
+def _generic_encoder(types):
+    types = list(types)
+
+    def encode(args):
+        return encode_abi(types, args)
+    return encode
+
+def _generic_decoder(types):
+    types = list(types)
+
+    def decode(data):
+        return fix_address_decoding(decode_abi(types, data), types)
+    return decode
+
+def _build(source, namespace, name):
+    exec(compile(source, '<abicodec {}>'.format(name), 'exec'), namespace)
+    return namespace[name]
+
+def _compile_encoder(types, parsed):
+
+    namespace = {'_Fallback': _Fallback, '_encode_abi': encode_abi, '_types': list(types)}
+    count = len(types)
+    args = ', '.join('a{}'.format(i) for i in range(count))
+    body = []
+    head = []
+    tails = []
+    for i, (base, size) in enumerate(parsed):
+        if base == 'uint':
+            namespace['e{}'.format(i)] = _uint_encoder(size)
+        elif base == 'int':
+            namespace['e{}'.format(i)] = _int_encoder(size)
+        elif base == 'address':
+            namespace['e{}'.format(i)] = _encode_address
+        elif base == 'bool':
+            namespace['e{}'.format(i)] = _encode_bool
+        elif base == 'bytes':
+            namespace['e{}'.format(i)] = _bytes_encoder(size)
+        else:
+            if base == 'string':
+                namespace['e{}'.format(i)] = _encode_string
+            else:
+                namespace['e{}'.format(i)] = _encode_dynbytes
+            body.append("t{0} = e{0}(a{0})".format(i))
+            body.append("h{0} = offset.to_bytes(32, 'big')".format(i))
+            body.append("offset += len(t{})".format(i))
+            head.append("h{}".format(i))
+            tails.append("t{}".format(i))
+            continue
+        head.append("e{0}(a{0})".format(i))
+
+    lines = [
+        "def encode(args):",
+        "    try:",
+        "        {}, = args".format(args) if count else "        if args: raise _Fallback()",
+        "        offset = {}".format(32 * count),
+    ]
+    lines.extend("        {}".format(line) for line in body)
+    lines.append("        return b''.join(({},))".format(', '.join(head + tails)) if count else "        return b''")
+    lines.extend([
+        "    except (_Fallback, TypeError, ValueError):",
+        "        return _encode_abi(_types, args)",
+    ])
+    return _build('\n'.join(lines) + '\n', namespace, 'encode')
+
+def _compile_decoder(types, parsed):
+
+    namespace = {'_Fallback': _Fallback, '_from_bytes': int.from_bytes, '_ZERO': ZERO_WORD,
+                 '_generic': _generic_decoder(types), '_dynbytes': _decode_dynbytes}
+    values = []
+    for i, (base, size) in enumerate(parsed):
+        start, end = 32 * i, 32 * (i + 1)
+        word = "data[{}:{}]".format(start, end)
+        if base == 'uint':
+            if size == 256:
+                values.append("_from_bytes({}, 'big')".format(word))
+            else:
+                values.append("_from_bytes({}, 'big') & {}".format(word, (1 << size) - 1))
+        elif base == 'int':
+            if size == 256:
+                values.append("_from_bytes({}, 'big', signed=True)".format(word))
+            else:
+                namespace['d{}'.format(i)] = _int_decoder(size)
+                values.append("d{}({})".format(i, word))
+        elif base == 'address':
+            values.append("'0x' + data[{}:{}].hex()".format(start + 12, end))
+        elif base == 'bool':
+            values.append("{} != _ZERO".format(word))
+        elif base == 'bytes':
+            values.append("data[{}:{}]".format(start, start + size))
+        else:
+            values.append("_dynbytes(data, {})".format(start))
+
+    lines = [
+        "def decode(data):",
+        "    if len(data) < {}:".format(32 * len(types)),
+        "        return _generic(data)",
+        "    try:",
+        "        return [{}]".format(', '.join(values)),
+        "    except _Fallback:",
+        "        return _generic(data)",
+    ]
+    return _build('\n'.join(lines) + '\n', namespace, 'decode')
+
+_encoders = {}
+_decoders = {}
+
+def get_encoder(types):
+    """returns a function taking a sequence of arguments for the given
+    types and returning their abi encoding"""
+
+    types = tuple(types)
+    encoder = _encoders.get(types)
+    if encoder is None:
+        parsed = [parse_type(typ) for typ in types]
+        if None in parsed:
+            encoder = _generic_encoder(types)
+        else:
+            encoder = _compile_encoder(types, parsed)
+        _encoders[types] = encoder
+    return encoder
+
+def get_decoder(types):
+    """returns a function taking abi encoded bytes and returning a list
+    of values of the given types, with addresses as 0x prefixed strings"""
+
+    types = tuple(types)
+    decoder = _decoders.get(types)
+    if decoder is None:
+        parsed = [parse_type(typ) for typ in types]
+        if None in parsed:
+            decoder = _generic_decoder(types)
+        else:
+            decoder = _compile_decoder(types, parsed)
+        _decoders[types] = decoder
+    return decoder
+
+def _topic_int_decoder(bits):
+    mask = (1 << bits) - 1
+    half = 1 << (bits - 1)
+    full = 1 << bits
+
+    def decode_int_topic(topic):
+        value = int(topic, 16) & mask
+        if value >= half:
+            return value - full
+        return value
+    return decode_int_topic
+
+def _topic_uint_decoder(bits):
+    if bits == 256:
+        return lambda topic: int(topic, 16)
+    mask = (1 << bits) - 1
+    return lambda topic: int(topic, 16) & mask
+
+def _topic_bytes_decoder(size):
+    end = 2 + size * 2
+    return lambda topic: bytes.fromhex(topic[2:end])
+
+def get_topic_decoder(typ):
+    """returns a function decoding an indexed event argument of the given
+    type from its 0x prefixed hex topic. Indexed dynamic types are only
+    stored as their keccak hash, so these decode to the raw 32 bytes"""
+
+    parsed = parse_type(typ)
+    if parsed is None:
+        base = None
+    else:
+        base, size = parsed
+    if base == 'uint':
+        return _topic_uint_decoder(size)
+    if base == 'int':
+        return _topic_int_decoder(size)
+    if base == 'address':
+        return lambda topic: '0x' + topic[-40:]
+    if base == 'bool':
+        return lambda topic: int(topic, 16) != 0
+    if base == 'bytes':
+        return _topic_bytes_decoder(size)
+    return lambda topic: bytes.fromhex(topic[2:])
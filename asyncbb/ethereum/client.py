@@ -1,30 +1,26 @@
-import binascii
+import array
+import asyncio
+import json
 import random
-import regex
+import re
 import tornado.httpclient
+import zlib
+
+from collections import namedtuple, OrderedDict
 
 from asyncbb.jsonrpc import JsonRPCError
+from asyncbb.ethereum.results import Block, Receipt, Transaction
+from asyncbb.ethereum import tracers
+from asyncbb.ethereum.hexcodec import decode_int, validate_hex, validate_hex_list
+from asyncbb.ethereum.retry import RetryPolicy
 
 JSON_RPC_VERSION = "2.0"
 
-HEX_RE = regex.compile("(0x)?([0-9a-fA-F]+)")
-
-def validate_hex(value, length=None):
-    if isinstance(value, int):
-        value = hex(value)[2:]
-    if isinstance(value, bytes):
-        value = binascii.b2a_hex(value).decode('ascii')
-    else:
-        m = HEX_RE.match(value)
-        if m:
-            value = m.group(2)
-        else:
-            raise ValueError("Unable to convert value to valid hex string")
-    if length:
-        if len(value) > length * 2:
-            raise ValueError("Value is too long")
-        return '0x' + value.rjust(length * 2, '0')
-    return '0x' + value
+# gzip is fast enough at level 1 to pay for itself on the links worth compressing
+REQUEST_COMPRESSION_LEVEL = 1
+
+# error messages returned by nodes for unknown or disabled methods
+METHOD_NOT_FOUND_ERRORS = ("method not found", "does not exist", "not available", "not supported")
 
 def validate_block_param(param):
 
@@ -32,19 +28,197 @@ def validate_block_param(param):
         return validate_hex(param)
     return param
 
+def _gzip(data):
+    compressor = zlib.compressobj(REQUEST_COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+def _decompress(data):
+    """decompresses a gzip or deflate encoded body. Some servers send raw
+    deflate streams rather than zlib wrapped ones for deflate"""
+    try:
+        # detects the gzip or zlib header
+        return zlib.decompress(data, 32 + zlib.MAX_WBITS)
+    except zlib.error:
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+
+class AccountSnapshot(namedtuple('AccountSnapshot', ['block_number', 'addresses', 'balances', 'nonces', 'codes'])):
+    """The state of many accounts at a single block, as parallel sequences:
+    `balances[i]` and `nonces[i]` belong to `addresses[i]`. `codes` is None
+    unless code was requested"""
+
+    __slots__ = ()
+
+    def account(self, index):
+        """returns (address, balance, nonce, code) for the account at index"""
+        return (self.addresses[index], self.balances[index], self.nonces[index],
+                None if self.codes is None else self.codes[index])
+
+class Series(namedtuple('Series', ['blocks', 'timestamps', 'values'])):
+    """Results of a query sampled at many blocks, as columns: `values[i]`
+    is the result at block `blocks[i]`, mined at `timestamps[i]`"""
+
+    __slots__ = ()
+
+class FilterWatch:
+    """Async iterator over the changes of a filter, returned by JsonRPCClient.watch.
+
+    Polls quickly (every min_interval seconds) right after changes arrive,
+    and while nothing is changing backs off exponentially up to block_time,
+    since there's unlikely to be anything new before the next block. Empty
+    polls are never yielded.
+
+    `polls` and `empty_polls` count the eth_getFilterChanges calls made,
+    and `avoided_polls` how many fewer were made than polling every
+    min_interval would have"""
+
+    def __init__(self, client, filter_id, *, min_interval=0.1, block_time=15.0, backoff=2.0):
+        self.client = client
+        self.filter_id = filter_id
+        self.min_interval = min_interval
+        self.block_time = block_time
+        self.backoff = backoff
+        self.interval = min_interval
+        self.polls = 0
+        self.empty_polls = 0
+        self._started = None
+
+    @property
+    def avoided_polls(self):
+        if self._started is None:
+            return 0
+        elapsed = asyncio.get_event_loop().time() - self._started
+        return max(0, int(elapsed / self.min_interval) - self.polls)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_event_loop()
+        if self._started is None:
+            self._started = loop.time()
+        elif self.polls:
+            await asyncio.sleep(self.interval)
+        while True:
+            changes = await self.client.eth_getFilterChanges(self.filter_id)
+            self.polls += 1
+            if changes:
+                self.interval = self.min_interval
+                return changes
+            self.empty_polls += 1
+            self.interval = min(self.interval * self.backoff, self.block_time)
+            await asyncio.sleep(self.interval)
+
 class JsonRPCClient:
 
-    def __init__(self, url):
+    # maximum number of results for blocks that can no longer change
+    # (historical samples, block receipts) kept in memory
+    CACHE_SIZE = 100000
+
+    def __init__(self, url, *, accept_encoding=True, compress_requests=None, retry=True):
+        """`accept_encoding` asks the node for gzip or deflate compressed
+        responses, which are decompressed here. If `compress_requests` is
+        set, request bodies of at least that many bytes are sent gzip
+        compressed, which the node (or a proxy in front of it) must accept.
+
+        `retry` is the RetryPolicy for failed requests (see
+        asyncbb.ethereum.retry). True uses the default policy and False
+        disables retries"""
 
         self._url = url
         self._httpclient = tornado.httpclient.AsyncHTTPClient()
+        self.accept_encoding = accept_encoding
+        self.compress_requests = compress_requests
+        if retry is True:
+            retry = RetryPolicy()
+        self.retry = retry or None
+        # bytes of request and response bodies as sent over the wire
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._in_flight = 0
+        self._drained = None
+        self._cache = OrderedDict()
+        # the method used by get_block_receipts, or False if the node has
+        # none and receipts are fetched one by one. None until detected
+        self._block_receipts_method = None
+
+    async def _post(self, data):
+        """sends the jsonrpc request (or batch) and returns the decoded response"""
+
+        body = tornado.escape.utf8(tornado.escape.json_encode(data))
+        headers = {'Content-Type': "application/json"}
+        if self.compress_requests is not None and len(body) >= self.compress_requests:
+            body = _gzip(body)
+            headers['Content-Encoding'] = "gzip"
+        if self.accept_encoding:
+            headers['Accept-Encoding'] = "gzip, deflate"
+        self.bytes_sent += len(body)
+
+        self._in_flight += 1
+        try:
+            resp = await self._httpclient.fetch(
+                self._url,
+                method="POST",
+                headers=headers,
+                body=body,
+                # decompressed below, since tornado only handles gzip
+                decompress_response=False
+            )
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0 and self._drained is not None and not self._drained.done():
+                self._drained.set_result(None)
+
+        body = resp.body
+        self.bytes_received += len(body)
+        encoding = resp.headers.get('Content-Encoding', '').lower()
+        if encoding in ("gzip", "deflate"):
+            body = _decompress(body)
+        return tornado.escape.json_decode(body)
+
+    @property
+    def in_flight(self):
+        """the number of requests waiting on a response"""
+        return self._in_flight
+
+    async def close(self, timeout=None):
+        """waits for any in flight requests to finish, returning False if
+        they didn't within `timeout` seconds"""
+
+        if self._in_flight == 0:
+            return True
+        if self._drained is None or self._drained.done():
+            self._drained = asyncio.get_event_loop().create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._drained), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
 
     async def _fetch(self, method, params=None):
-        id = random.randint(0, 1000000)
 
         if params is None:
             params = []
 
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await self._fetch_once(method, params)
+            except Exception as e:
+                if self.retry is None:
+                    raise
+                delay = self.retry.retry_delay(e, [method], attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            if self.retry is not None:
+                self.retry.record_success()
+            return result
+
+    async def _fetch_once(self, method, params):
+        id = random.randint(0, 1000000)
+
         data = {
             "jsonrpc": JSON_RPC_VERSION,
             "id": id,
@@ -52,17 +226,7 @@ class JsonRPCClient:
             "params": params
         }
 
-        # NOTE: letting errors fall through here for now as it means
-        # there is something drastically wrong with the jsonrpc server
-        # which means something probably needs to be fixed
-        resp = await self._httpclient.fetch(
-            self._url,
-            method="POST",
-            headers={'Content-Type': "application/json"},
-            body=tornado.escape.json_encode(data)
-        )
-
-        rval = tornado.escape.json_decode(resp.body)
+        rval = await self._post(data)
 
         # verify the id we got back is the same as what we passed
         if id != rval['id']:
@@ -75,6 +239,86 @@ class JsonRPCClient:
 
         return rval['result']
 
+    async def _fetch_batch(self, calls):
+        """Sends a list of (method, params) pairs as a single jsonrpc batch request.
+
+        Returns a list of results in the same order as `calls`. Errors for
+        individual calls are not raised, instead a JsonRPCError is put in
+        place of that call's result. Calls that failed in a way the retry
+        policy allows retrying are sent again in a smaller batch"""
+
+        if not calls:
+            return []
+
+        results = [None] * len(calls)
+        # indexes of the calls still to be sent
+        pending = list(range(len(calls)))
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                batch = await self._fetch_batch_once([calls[i] for i in pending])
+            except Exception as e:
+                if self.retry is None:
+                    raise
+                delay = self.retry.retry_delay(e, [calls[i][0] for i in pending], attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            for i, result in zip(pending, batch):
+                results[i] = result
+            if self.retry is None:
+                return results
+            self.retry.record_success()
+            # only the calls that failed in a retryable way are sent again
+            failed = [i for i in pending if isinstance(results[i], JsonRPCError) and
+                      self.retry.is_retryable(results[i], [calls[i][0]], attempt)]
+            if not failed:
+                return results
+            delay = self.retry.retry_delay(results[failed[0]], [calls[i][0] for i in failed], attempt)
+            if delay is None:
+                return results
+            await asyncio.sleep(delay)
+            pending = failed
+
+    async def _fetch_batch_once(self, calls):
+
+        base_id = random.randint(0, 1000000)
+        data = [{
+            "jsonrpc": JSON_RPC_VERSION,
+            "id": base_id + i,
+            "method": method,
+            "params": [] if params is None else params
+        } for i, (method, params) in enumerate(calls)]
+
+        rvals = await self._post(data)
+
+        # a single error object is returned if the whole batch was rejected
+        if isinstance(rvals, dict):
+            error = rvals.get('error') or {}
+            raise JsonRPCError(rvals.get('id'), error.get('code', -1),
+                               error.get('message', "batch request failed"), error.get('data'))
+
+        results = [None] * len(calls)
+        seen = [False] * len(calls)
+        for rval in rvals:
+            idx = rval.get('id')
+            if not isinstance(idx, int) or not 0 <= idx - base_id < len(calls):
+                raise JsonRPCError(-1, -1, "returned id was not part of the batch request", None)
+            idx -= base_id
+            seen[idx] = True
+            if "error" in rval:
+                results[idx] = JsonRPCError(rval['id'], rval['error']['code'], rval['error']['message'],
+                                            rval['error']['data'] if 'data' in rval['error'] else None)
+            else:
+                results[idx] = rval['result']
+
+        if not all(seen):
+            raise JsonRPCError(-1, -1, "batch response was missing results", None)
+
+        return results
+
     async def eth_getBalance(self, address, block="latest"):
 
         address = validate_hex(address)
@@ -82,10 +326,223 @@ class JsonRPCClient:
 
         result = await self._fetch("eth_getBalance", [address, block])
 
-        if result.startswith("0x"):
-            result = result[2:]
+        return decode_int(result)
 
-        return int(result, 16)
+    async def get_accounts(self, addresses, block="latest", *, include_code=False, batch_size=100, concurrency=4):
+        """Fetches the balance and nonce (and code if include_code is set) of
+        every address at the same block, returning an AccountSnapshot.
+
+        "latest" is resolved to a block number first so every batch sees the
+        same state. The lookups are sent as jsonrpc batches of at most
+        batch_size calls, with at most `concurrency` batches in flight"""
+
+        addresses = validate_hex_list(addresses)
+
+        if block == "latest":
+            block_number = await self.eth_blockNumber()
+        elif block == "earliest":
+            block_number = 0
+        elif block == "pending":
+            block_number = None
+        elif isinstance(block, int):
+            block_number = block
+        else:
+            block_number = int(validate_block_param(block), 16)
+        block = "pending" if block_number is None else hex(block_number)
+
+        methods = ["eth_getBalance", "eth_getTransactionCount"]
+        if include_code:
+            methods.append("eth_getCode")
+        per_batch = max(1, batch_size // len(methods))
+
+        balances = [0] * len(addresses)
+        nonces = array.array('Q', bytes(8 * len(addresses)))
+        codes = [None] * len(addresses) if include_code else None
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(start):
+            chunk = addresses[start:start + per_batch]
+            async with semaphore:
+                results = await self._fetch_batch([(method, [address, block])
+                                                   for address in chunk for method in methods])
+            for result in results:
+                if isinstance(result, JsonRPCError):
+                    raise result
+            step = len(methods)
+            for i in range(len(chunk)):
+                balances[start + i] = int(results[i * step], 16)
+                nonces[start + i] = int(results[i * step + 1], 16)
+                if include_code:
+                    codes[start + i] = results[i * step + 2]
+
+        futures = [asyncio.ensure_future(fetch(start)) for start in range(0, len(addresses), per_batch)]
+        try:
+            await asyncio.gather(*futures)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        return AccountSnapshot(block_number, addresses, balances, nonces, codes)
+
+    def _cache_get(self, key):
+        try:
+            self._cache.move_to_end(key)
+        except KeyError:
+            return None
+        return self._cache[key]
+
+    def _cache_put(self, key, value):
+        self._cache[key] = value
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def sample(self, call, blocks, step=None, *, decode=None, confirmations=12,
+                     batch_size=100, concurrency=4):
+        """Runs the same query at many block heights, returning a Series.
+
+        `call` is a (method, params) pair, where the block parameter is left
+        off the end of params, e.g. ("eth_getBalance", [address]) or
+        ("eth_call", [{"to": address, "data": data}]). `blocks` is an
+        iterable of block numbers, optionally taking every `step`th one.
+        If given, `decode` is applied to each result.
+
+        Queries and block timestamps are sent as concurrent jsonrpc batches.
+        Results for blocks more than `confirmations` below the head can't
+        change, so they are cached and not fetched again"""
+
+        method, params = call
+        params = list(params)
+        blocks = list(blocks)
+        if step:
+            blocks = blocks[::step]
+
+        head = await self.eth_blockNumber()
+        stable = head - confirmations
+        call_key = (method, json.dumps(params, sort_keys=True))
+
+        values = [None] * len(blocks)
+        timestamps = array.array('Q', bytes(8 * len(blocks)))
+        calls = []
+        # index of the value (or timestamp) each call fills in
+        targets = []
+        for i, block in enumerate(blocks):
+            value = self._cache_get((call_key, block))
+            if value is None:
+                calls.append((method, params + [hex(block)]))
+                targets.append(('value', i))
+            else:
+                values[i] = value
+            timestamp = self._cache_get(('timestamp', block))
+            if timestamp is None:
+                calls.append(("eth_getBlockByNumber", [hex(block), False]))
+                targets.append(('timestamp', i))
+            else:
+                timestamps[i] = timestamp
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(start):
+            async with semaphore:
+                results = await self._fetch_batch(calls[start:start + batch_size])
+            for (kind, i), result in zip(targets[start:start + batch_size], results):
+                if isinstance(result, JsonRPCError):
+                    raise result
+                block = blocks[i]
+                if kind == 'value':
+                    values[i] = result
+                    if block <= stable:
+                        self._cache_put((call_key, block), result)
+                else:
+                    if result is None:
+                        raise JsonRPCError(None, -1, "block {} not found".format(block), None)
+                    timestamps[i] = int(result['timestamp'], 16)
+                    if block <= stable:
+                        self._cache_put(('timestamp', block), timestamps[i])
+
+        futures = [asyncio.ensure_future(fetch(start)) for start in range(0, len(calls), batch_size)]
+        try:
+            await asyncio.gather(*futures)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        if decode is not None:
+            values = [decode(value) for value in values]
+        return Series(array.array('Q', blocks), timestamps, values)
+
+    async def _detect_block_receipts_method(self):
+
+        try:
+            version = (await self.web3_clientVersion()).lower()
+        except JsonRPCError:
+            version = ''
+        if version.startswith('parity') or version.startswith('openethereum'):
+            return "parity_getBlockReceipts"
+        if version.startswith(('erigon', 'nethermind', 'besu')):
+            return "eth_getBlockReceipts"
+        m = re.match(r"geth/v(\d+)\.(\d+)", version)
+        if m and (int(m.group(1)), int(m.group(2))) >= (1, 13):
+            return "eth_getBlockReceipts"
+        return False
+
+    async def get_block_receipts(self, block, *, typed=False):
+        """Returns the receipts of every transaction in the block, given by
+        number, tag or hash, in transaction order.
+
+        Uses parity_getBlockReceipts or eth_getBlockReceipts if the node
+        supports them (detected once from web3_clientVersion), otherwise
+        fetches the block's transaction hashes and then all of the receipts
+        in a single batch. Receipts are cached by block hash, since a block's
+        receipts never change. Raises a JsonRPCError if any of the receipts
+        aren't available yet"""
+
+        if self._block_receipts_method is None:
+            self._block_receipts_method = await self._detect_block_receipts_method()
+
+        is_hash = isinstance(block, str) and len(block) == 66
+        if is_hash:
+            receipts = self._cache_get(('receipts', block.lower()))
+            if receipts is not None:
+                return [Receipt(r) for r in receipts] if typed else receipts
+
+        receipts = None
+        if self._block_receipts_method:
+            param = block if is_hash else validate_block_param(block)
+            try:
+                receipts = await self._fetch(self._block_receipts_method, [param])
+            except JsonRPCError as e:
+                # the method can be disabled even if the node has it
+                message = str(e).lower()
+                if not any(msg in message for msg in METHOD_NOT_FOUND_ERRORS):
+                    raise
+                self._block_receipts_method = False
+
+        if receipts is None:
+            if is_hash:
+                block = await self.eth_getBlockByHash(block, with_transactions=False)
+            else:
+                block = await self.eth_getBlockByNumber(block, with_transactions=False)
+            if block is None:
+                return None
+            # pending blocks have no hash yet, so can't have been cached
+            if block['hash'] is not None:
+                receipts = self._cache_get(('receipts', block['hash'].lower()))
+            if receipts is None:
+                receipts = await self._fetch_batch([("eth_getTransactionReceipt", [tx_hash])
+                                                    for tx_hash in block['transactions']])
+                for tx_hash, receipt in zip(block['transactions'], receipts):
+                    if isinstance(receipt, JsonRPCError):
+                        raise receipt
+                    if receipt is None:
+                        # the node hasn't indexed the block's receipts yet
+                        raise JsonRPCError(None, -1, "receipt for transaction {} not found".format(tx_hash), None)
+
+        # pending blocks have no hash yet
+        if receipts and receipts[0].get('blockHash'):
+            self._cache_put(('receipts', receipts[0]['blockHash'].lower()), receipts)
+        return [Receipt(r) for r in receipts] if typed else receipts
 
     async def eth_getTransactionCount(self, address, block="latest"):
 
@@ -94,10 +551,7 @@ class JsonRPCClient:
 
         result = await self._fetch("eth_getTransactionCount", [address, block])
 
-        if result.startswith("0x"):
-            result = result[2:]
-
-        return int(result, 16)
+        return decode_int(result)
 
     async def eth_estimateGas(self, source_address, target_address, **kwargs):
 
@@ -124,35 +578,48 @@ class JsonRPCClient:
 
         return result
 
-    async def eth_getTransactionReceipt(self, tx):
+    async def eth_getTransactionReceipt(self, tx, *, typed=False):
 
         tx = validate_hex(tx)
         result = await self._fetch("eth_getTransactionReceipt", [tx])
 
+        if typed and result is not None:
+            return Receipt(result)
         return result
 
-    async def eth_getTransactionByHash(self, tx):
+    async def eth_getTransactionByHash(self, tx, *, typed=False):
 
         tx = validate_hex(tx)
         result = await self._fetch("eth_getTransactionByHash", [tx])
 
+        if typed and result is not None:
+            return Transaction(result)
         return result
 
     async def eth_blockNumber(self):
 
         result = await self._fetch("eth_blockNumber", [])
 
-        if result.startswith("0x"):
-            result = result[2:]
-
-        return int(result, 16)
+        return decode_int(result)
 
-    async def eth_getBlockByNumber(self, number, with_transactions=True):
+    async def eth_getBlockByNumber(self, number, with_transactions=True, *, typed=False):
 
         number = validate_block_param(number)
 
         result = await self._fetch("eth_getBlockByNumber", [number, with_transactions])
 
+        if typed and result is not None:
+            return Block(result)
+        return result
+
+    async def eth_getBlockByHash(self, block_hash, with_transactions=True, *, typed=False):
+
+        block_hash = validate_hex(block_hash)
+
+        result = await self._fetch("eth_getBlockByHash", [block_hash, with_transactions])
+
+        if typed and result is not None:
+            return Block(result)
         return result
 
     async def eth_newFilter(self, *, fromBlock=None, toBlock=None, address=None, topics=None):
@@ -163,11 +630,17 @@ class JsonRPCClient:
         if toBlock:
             kwargs['toBlock'] = validate_block_param(toBlock)
         if address:
-            kwargs['address'] = validate_hex(address)
+            if isinstance(address, list):
+                kwargs['address'] = validate_hex_list(address)
+            else:
+                kwargs['address'] = validate_hex(address)
         if topics:
             if not isinstance(topics, list):
                 raise TypeError("topics must be an array of DATA")
-            kwargs['topics'] = [None if i is None else validate_hex(i, 32) for i in topics]
+            # each position can be null, a topic or a list of topics to match any of
+            kwargs['topics'] = [None if i is None else
+                                [validate_hex(t, 32) for t in i] if isinstance(i, list) else
+                                validate_hex(i, 32) for i in topics]
 
         result = await self._fetch("eth_newFilter", [kwargs])
 
@@ -191,6 +664,10 @@ class JsonRPCClient:
 
         return result
 
+    def watch(self, filter_id, *, min_interval=0.1, block_time=15.0, backoff=2.0):
+        """returns a FilterWatch, for use as `async for changes in client.watch(filter_id)`"""
+        return FilterWatch(self, filter_id, min_interval=min_interval, block_time=block_time, backoff=backoff)
+
     async def eth_getFilterLogs(self, filter_id):
 
         result = await self._fetch("eth_getFilterLogs", [filter_id])
@@ -256,8 +733,122 @@ class JsonRPCClient:
 
         return result
 
-    async def debug_traceTransaction(self, transaction_hash, *, disableStorage=None, disableMemory=None, disableStack=None,
-                                     fullStorage=None, tracer=None, timeout=None):
+    async def trace_block(self, block):
+
+        block = validate_block_param(block)
+        result = await self._fetch("trace_block", [block])
+
+        return result
+
+    async def trace_filter(self, *, fromBlock=None, toBlock=None, fromAddress=None, toAddress=None,
+                           after=None, count=None):
+
+        kwargs = {}
+        if fromBlock is not None:
+            kwargs['fromBlock'] = validate_block_param(fromBlock)
+        if toBlock is not None:
+            kwargs['toBlock'] = validate_block_param(toBlock)
+        if fromAddress:
+            kwargs['fromAddress'] = validate_hex_list(fromAddress)
+        if toAddress:
+            kwargs['toAddress'] = validate_hex_list(toAddress)
+        if after is not None:
+            kwargs['after'] = after
+        if count is not None:
+            kwargs['count'] = count
+
+        result = await self._fetch("trace_filter", [kwargs])
+
+        return result
+
+    async def iter_traces(self, from_block, to_block, *, method="trace_filter", fromAddress=None, toAddress=None,
+                          tracer=None, timeout=None, chunk_size=100, concurrency=4):
+        """Yields the traces of every block from from_block up to and
+        including to_block, in block order.
+
+        `method` is "trace_filter" (optionally restricted to fromAddress and
+        toAddress), "trace_block" or "debug_traceBlockByNumber" (with the
+        given tracer and timeout), and the traces yielded are whatever that
+        method returns for each block.
+
+        The range is split into chunks of chunk_size blocks, with at most
+        `concurrency` chunks in flight. A chunk that fails, e.g. because the
+        node timed out tracing it, is split in half and retried, down to
+        single blocks, so ranges that are too expensive for the node get
+        smaller rather than failing the whole iteration"""
+
+        if method not in ("trace_filter", "trace_block", "debug_traceBlockByNumber"):
+            raise ValueError("unknown trace method: {}".format(method))
+        if isinstance(fromAddress, str):
+            fromAddress = [fromAddress]
+        if isinstance(toAddress, str):
+            toAddress = [toAddress]
+        options = self._debug_trace_options(tracer=tracer, timeout=timeout)
+
+        async def trace(start, end):
+            if method == "trace_filter":
+                return await self.trace_filter(fromBlock=start, toBlock=end,
+                                               fromAddress=fromAddress, toAddress=toAddress)
+            if method == "trace_block":
+                calls = [("trace_block", [hex(number)]) for number in range(start, end + 1)]
+            else:
+                calls = [("debug_traceBlockByNumber", [hex(number), options]) for number in range(start, end + 1)]
+            results = await self._fetch_batch(calls)
+            traces = []
+            for result in results:
+                if isinstance(result, JsonRPCError):
+                    raise result
+                traces.extend(result or ())
+            return traces
+
+        # chunks split after failing, which take priority over new chunks
+        retries = []
+        next_start = from_block
+        running = {}
+        # finished chunks waiting on earlier ones: start -> (end, traces)
+        finished = {}
+        next_block = from_block
+        try:
+            while next_block <= to_block:
+                # finished chunks are held until the ones before them are done,
+                # so stop starting new chunks if a slow chunk holds up too many
+                # of them. retries and the chunk at next_block always go ahead,
+                # since they're what the held chunks are waiting on
+                while len(running) < concurrency:
+                    if retries:
+                        start, end = retries.pop()
+                    elif next_start <= to_block and (len(finished) < concurrency * 4 or next_start == next_block):
+                        start, end = next_start, min(next_start + chunk_size - 1, to_block)
+                        next_start = end + 1
+                    else:
+                        break
+                    running[asyncio.ensure_future(trace(start, end))] = (start, end)
+
+                # next_block isn't finished, so the chunk with it must be running
+                assert running, "no chunk running for block {}".format(next_block)
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    start, end = running.pop(future)
+                    try:
+                        finished[start] = (end, future.result())
+                    except (JsonRPCError, tornado.httpclient.HTTPError):
+                        if start == end:
+                            raise
+                        middle = (start + end) // 2
+                        retries.append((middle + 1, end))
+                        retries.append((start, middle))
+
+                while next_block in finished:
+                    end, traces = finished.pop(next_block)
+                    for result in traces:
+                        yield result
+                    next_block = end + 1
+        finally:
+            for future in running:
+                future.cancel()
+
+    def _debug_trace_options(self, *, disableStorage=None, disableMemory=None, disableStack=None,
+                             tracer=None, timeout=None):
         kwargs = {}
         if disableStorage is not None:
             kwargs['disableStorage'] = disableStorage
@@ -269,10 +860,53 @@ class JsonRPCClient:
             kwargs['tracer'] = tracer
         if timeout is not None:
             kwargs['timeout'] = str(timeout)
+        return kwargs
 
+    async def debug_traceTransaction(self, transaction_hash, *, disableStorage=None, disableMemory=None, disableStack=None,
+                                     fullStorage=None, tracer=None, timeout=None):
+
+        kwargs = self._debug_trace_options(disableStorage=disableStorage, disableMemory=disableMemory,
+                                           disableStack=disableStack, tracer=tracer, timeout=timeout)
         result = await self._fetch("debug_traceTransaction", [transaction_hash, kwargs])
         return result
 
+    async def run_tracer(self, transaction_hash, preset, *, timeout=None):
+        """traces the transaction with one of the presets from
+        asyncbb.ethereum.tracers, returning its decoded result"""
+
+        result = await self.debug_traceTransaction(transaction_hash, tracer=preset.tracer, timeout=timeout)
+        return preset.decode(result)
+
+    async def get_call_tree(self, transaction_hash, *, timeout=None):
+        """returns the root CallFrame of the transaction's calls"""
+        return await self.run_tracer(transaction_hash, tracers.CALL_TREE, timeout=timeout)
+
+    async def get_value_transfers(self, transaction_hash, *, timeout=None):
+        """returns the ValueTransfers made by the transaction, including
+        internal ones, leaving out those in calls that reverted"""
+        return await self.run_tracer(transaction_hash, tracers.VALUE_TRANSFERS, timeout=timeout)
+
+    async def get_storage_slots(self, transaction_hash, *, timeout=None):
+        """returns {address: {slot: StorageAccess}} for the storage the transaction touched"""
+        return await self.run_tracer(transaction_hash, tracers.STORAGE_SLOTS, timeout=timeout)
+
+    async def get_opcode_gas(self, transaction_hash, *, timeout=None):
+        """returns {opcode: OpcodeGas}, the count and gas of each opcode the transaction ran"""
+        return await self.run_tracer(transaction_hash, tracers.OPCODE_GAS, timeout=timeout)
+
+    async def get_selector_profile(self, transaction_hash, *, timeout=None):
+        """returns {(address, selector): SelectorCalls} for every call the transaction made"""
+        return await self.run_tracer(transaction_hash, tracers.SELECTOR_PROFILE, timeout=timeout)
+
+    async def debug_traceBlockByNumber(self, block, *, disableStorage=None, disableMemory=None, disableStack=None,
+                                       tracer=None, timeout=None):
+
+        block = validate_block_param(block)
+        kwargs = self._debug_trace_options(disableStorage=disableStorage, disableMemory=disableMemory,
+                                           disableStack=disableStack, tracer=tracer, timeout=timeout)
+        result = await self._fetch("debug_traceBlockByNumber", [block, kwargs])
+        return result
+
     async def web3_clientVersion(self):
 
         result = await self._fetch("web3_clientVersion", [])
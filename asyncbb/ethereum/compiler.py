@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from collections import namedtuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), '.cache', 'asyncbb-eth', 'solc')
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+IMPORT_RE = re.compile(rb"""import\s+(?:[^;"']*?\s+from\s+)?["']([^"']+)["']""")
+
+class CompilerError(Exception):
+    pass
+
+_solc_versions = {}
+
+async def solc_version(solc='solc'):
+    """returns the version string reported by the given solc binary,
+    cached for the life of the process"""
+
+    version = _solc_versions.get(solc)
+    if version is None:
+        process = await asyncio.create_subprocess_exec(solc, '--version', stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.STDOUT)
+        output, _ = await process.communicate()
+        version = _solc_versions[solc] = output.decode('utf-8').strip()
+    return version
+
+def _resolve_import(path, importer_dir, import_mappings, cwd):
+    for prefix, mapping in import_mappings or ():
+        if path.startswith(prefix):
+            path = mapping + path[len(prefix):]
+            break
+    if path.startswith('./') or path.startswith('../'):
+        path = os.path.join(importer_dir, path)
+    elif not os.path.isabs(path) and cwd:
+        path = os.path.join(cwd, path)
+    return os.path.normpath(path)
+
+def source_digest(sourcecode, filename, *, import_mappings=None, cwd=None):
+    """Returns a sha256 hash covering the source and, recursively, every
+    file it imports (after applying import_mappings), so that changing
+    an imported file changes the digest.
+
+    `sourcecode` is the source as bytes, or None to read it from filename"""
+
+    digest = hashlib.sha256()
+    seen = set()
+    pending = [(filename, sourcecode)]
+    while pending:
+        path, source = pending.pop()
+        if source is None:
+            try:
+                with open(path, 'rb') as f:
+                    source = f.read()
+            except OSError:
+                source = b''
+                digest.update(b'missing:')
+        digest.update(path.encode('utf-8') + b'\0' + hashlib.sha256(source).digest())
+
+        importer_dir = os.path.dirname(path) if path != '<stdin>' else (cwd or '.')
+        for match in IMPORT_RE.finditer(source):
+            resolved = _resolve_import(match.group(1).decode('utf-8'), importer_dir, import_mappings, cwd)
+            if resolved not in seen:
+                seen.add(resolved)
+                pending.append((resolved, None))
+    return digest.hexdigest()
+
+def compile_cache_key(digest, *, filename, libraries=None, optimize=False, version=None):
+    """combines everything affecting solc's output into a single cache key"""
+
+    key = json.dumps([digest, filename, sorted(libraries or []), bool(optimize), version])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+class CompilationCache:
+    """Content addressed on disk cache of solc --combined-json output.
+
+    Entries are written atomically (written to a temporary file and then
+    renamed into place) so concurrent processes never see partial entries.
+    Once the cache grows beyond max_size bytes the least recently used
+    entries are removed"""
+
+    def __init__(self, path=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, '{}.json'.format(key))
+
+    def get(self, key):
+        """returns the cached contracts for the given key, or None"""
+
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r') as f:
+                contracts = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            # keep track of use for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return contracts
+
+    def put(self, key, contracts):
+        """stores the contracts for the given key. Failing to write the
+        entry (e.g. a read only or full disk) isn't an error, the result
+        just isn't cached"""
+
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.tmp-', suffix='.json')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(contracts, f)
+            os.replace(tmp, self._entry_path(key))
+        except BaseException as e:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            if isinstance(e, OSError):
+                return
+            raise
+        try:
+            self._evict()
+        except OSError:
+            pass
+
+    def _evict(self):
+
+        entries = []
+        total = 0
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith('.json') or entry.name.startswith('.tmp-'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        if total <= self.max_size:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_size:
+                break
+
+    def clear(self):
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.json'):
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+
+_default_cache = None
+
+def get_default_cache():
+    """returns the process wide cache, stored in SOLC_CACHE_DIR if set or
+    ~/.cache/asyncbb-eth/solc otherwise. Setting SOLC_CACHE_DIR to an empty
+    string disables caching, and so does a directory that can't be created
+    (e.g. a read only home directory)"""
+
+    global _default_cache
+    path = os.environ.get('SOLC_CACHE_DIR', DEFAULT_CACHE_DIR)
+    if not path:
+        return None
+    if _default_cache is None or _default_cache.path != path:
+        try:
+            _default_cache = CompilationCache(path)
+        except OSError:
+            return None
+    return _default_cache
+
+class CompiledSource(namedtuple('CompiledSource', ['filename', 'contracts'])):
+    """The output of a single solc run. `contracts` is the combined-json
+    mapping of "filename:ContractName" to the contract's abi and bin, which
+    includes every contract defined in the source and the files it imports"""
+
+    __slots__ = ()
+
+    def get(self, contract_name):
+        """returns the (abi, bin) of the named contract, preferring the one
+        defined in the compiled file itself over those from imports"""
+
+        try:
+            contract = self.contracts['{}:{}'.format(self.filename, contract_name)]
+        except KeyError:
+            suffix = ':{}'.format(contract_name)
+            for name, contract in self.contracts.items():
+                if name.endswith(suffix):
+                    break
+            else:
+                raise KeyError("contract {} not found in {}".format(contract_name, self.filename))
+        return json.loads(contract['abi']), contract['bin']
+
+    def names(self):
+        return [name.rsplit(':', 1)[1] for name in self.contracts]
+
+async def compile_source(sourcecode, *, import_mappings=None, libraries=None, optimize=False,
+                         cwd=None, cache=True, solc='solc'):
+    """Compiles the given source (or filename, relative to cwd if given)
+    without blocking the event loop, returning a CompiledSource.
+
+    if `cache` is True the default CompilationCache is used, otherwise it
+    can be a CompilationCache or None to always run solc"""
+
+    args = [solc, '--combined-json', 'bin,abi', '--add-std']
+    if libraries:
+        args.extend(['--libraries', ','.join(['{}:{}'.format(*library) for library in libraries])])
+    if optimize:
+        args.append('--optimize')
+    if import_mappings:
+        args.extend(["{}={}".format(path, mapping) for path, mapping in import_mappings])
+    # check if sourcecode is actually a filename
+    if isinstance(sourcecode, str):
+        if cwd:
+            filename = os.path.join(cwd, sourcecode)
+        else:
+            filename = sourcecode
+        if os.path.exists(filename):
+            args.append(filename)
+            sourcecode = None
+        else:
+            filename = '<stdin>'
+            sourcecode = sourcecode.encode('utf-8')
+    else:
+        filename = '<stdin>'
+
+    if cache is True:
+        cache = get_default_cache()
+    if cache:
+        digest = source_digest(sourcecode, filename, import_mappings=import_mappings, cwd=cwd)
+        cache_key = compile_cache_key(digest, filename=filename, libraries=libraries,
+                                      optimize=optimize, version=await solc_version(solc))
+        contracts = cache.get(cache_key)
+        if contracts is not None:
+            return CompiledSource(filename, contracts)
+
+    process = await asyncio.create_subprocess_exec(*args, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                                                   stderr=asyncio.subprocess.PIPE, cwd=cwd)
+    output, stderrdata = await process.communicate(input=sourcecode)
+    try:
+        contracts = json.loads(output.decode('utf-8'))['contracts']
+    except (ValueError, KeyError):
+        if output and stderrdata:
+            output += b'\n' + stderrdata
+        elif stderrdata:
+            output = stderrdata
+        raise CompilerError("Failed to compile source: {}\n{}\n{}".format(
+            filename, ' '.join(args), output.decode('utf-8', 'replace')))
+
+    if cache:
+        cache.put(cache_key, contracts)
+    return CompiledSource(filename, contracts)
+
+async def compile_many(sources, *, max_workers=4, **kwargs):
+    """Compiles each of the given sources (or filenames) concurrently,
+    running at most max_workers solc processes at once. Returns a list of
+    CompiledSource in the same order as sources. Remaining keyword
+    arguments are passed to compile_source"""
+
+    semaphore = asyncio.Semaphore(max_workers)
+    # identical sources only need compiling once
+    pending = {}
+
+    async def run(sourcecode):
+        async with semaphore:
+            return await compile_source(sourcecode, **kwargs)
+
+    for sourcecode in sources:
+        if sourcecode not in pending:
+            pending[sourcecode] = asyncio.ensure_future(run(sourcecode))
+    try:
+        await asyncio.gather(*pending.values())
+    except BaseException:
+        for future in pending.values():
+            future.cancel()
+        raise
+    return [pending[sourcecode].result() for sourcecode in sources]
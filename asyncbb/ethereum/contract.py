@@ -1,71 +1,130 @@
 import asyncio
 import binascii
-import subprocess
 import os
-import rlp
-import json
-from tornado.escape import json_decode
-from ethutils import data_decoder, data_encoder, private_key_to_address
-from ethereum.abi import ContractTranslator
-from ethereum.transactions import Transaction
+import weakref
+import tornado.ioloop
 from asyncbb.ethereum.client import JsonRPCClient
-
-def fix_address_decoding(decoded, types):
-    """ethereum library result decoding doesn't add 0x to addresses
-    this parses the decoded results and adds 0x to any address types"""
-    rval = []
-    for val, type in zip(decoded, types):
-        if type == 'address':
-            rval.append('0x{}'.format(val.decode('ascii')))
-        elif type == 'address[]':
-            rval.append(['0x{}'.format(v.decode('ascii')) for v in val])
-        else:
-            rval.append(val)
-    return rval
+from asyncbb.ethereum.compiler import CompiledSource, compile_source
+
+# NOTE: pyethereum, rlp and ethutils (and the abi and signing modules built
+# on them) are slow to import, so they're only imported when first used.
+# processes that only need JsonRPCClient never load them. Each of these
+# stand-ins replaces itself with the real function on its first call, so
+# later calls don't go through the import statement again
+
+def _data_decoder(value):
+    global _data_decoder
+    from ethutils import data_decoder as _data_decoder
+    return _data_decoder(value)
+
+def _sign_transaction(*args, **kwargs):
+    global _sign_transaction
+    from asyncbb.ethereum.signing import sign_transaction as _sign_transaction
+    return _sign_transaction(*args, **kwargs)
+
+def _get_abi_entry(abi):
+    global _get_abi_entry
+    from asyncbb.ethereum.registry import get_abi_entry as _get_abi_entry
+    return _get_abi_entry(abi)
+
+def _get_method_table(translator):
+    global _get_method_table
+    from asyncbb.ethereum.registry import get_method_table as _get_method_table
+    return _get_method_table(translator)
+
+def _get_event_table(translator):
+    global _get_event_table
+    from asyncbb.ethereum.events import get_event_table as _get_event_table
+    return _get_event_table(translator)
+
+def _decode_log(event_table, log):
+    global _decode_log
+    from asyncbb.ethereum.events import decode_log as _decode_log
+    return _decode_log(event_table, log)
+
+def __getattr__(name):
+    # fix_address_decoding used to live here
+    if name == 'fix_address_decoding':
+        from asyncbb.ethereum.abicodec import fix_address_decoding
+        return fix_address_decoding
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+def _private_key_to_address(private_key):
+    global _private_key_to_address
+    from ethutils import private_key_to_address as _private_key_to_address
+    return _private_key_to_address(private_key)
+
+# shared clients for contracts that aren't given one, per ioloop and node url
+_default_clients = weakref.WeakKeyDictionary()
+
+def get_default_client():
+    """returns a JsonRPCClient for the node given by the ETHEREUM_NODE_URL
+    environment variable, shared by everything running on the current ioloop"""
+
+    ethurl = os.environ.get('ETHEREUM_NODE_URL')
+    if not ethurl:
+        raise Exception("requires 'ETHEREUM_NODE_URL' environment variable to be set")
+
+    clients = _default_clients.setdefault(tornado.ioloop.IOLoop.current(), {})
+    client = clients.get(ethurl)
+    if client is None:
+        client = clients[ethurl] = JsonRPCClient(ethurl)
+    return client
 
 class ContractMethod:
 
-    def __init__(self, name, contract, *, from_key=None, constant=None):
+    __slots__ = ('name', 'contract', 'spec', 'is_constant', 'from_key', 'from_address')
+
+    def __init__(self, name, contract, *, from_key=None, from_address=None, constant=None):
         self.name = name
         self.contract = contract
+        self.spec = contract.methods[name]
         # TODO: forcing const seems to do nothing, since eth_call
         # will just return a tx_hash (on parity at least)
         if constant is None:
-            self.is_constant = self.contract.translator.function_data[name]['is_constant']
+            self.is_constant = self.spec.is_constant
         else:
             # force constantness of this function
             self.is_constant = constant
         if from_key:
             if isinstance(from_key, str):
-                self.from_key = data_decoder(from_key)
+                self.from_key = _data_decoder(from_key)
             else:
                 self.from_key = from_key
-            self.from_address = private_key_to_address(from_key)
+            # deriving the address is an ec point multiplication, so callers
+            # that already know it can pass it in
+            if from_address is None:
+                from_address = _private_key_to_address(self.from_key)
+            self.from_address = from_address
         else:
+            self.from_key = None
             self.from_address = None
 
     def set_sender(self, key):
         return self.__class__(self.name, self.contract, from_key=key, constant=self.is_constant)
 
-    async def __call__(self, *args, startgas=None, gasprice=20000000000, value=0):
+    def encode(self, *args):
+        """returns the call data for calling this function with the given arguments"""
+        return self.spec.selector + self.spec.encoder(args)
 
-        # TODO: figure out if we can validate args
+    def decode(self, data):
+        """decodes the raw bytes returned from calling this function,
+        with addresses as 0x prefixed strings"""
+        return self.spec.decoder(data)
 
-        ethurl = os.environ.get('ETHEREUM_NODE_URL')
-        if not ethurl:
-            raise Exception("requires 'ETHEREUM_NODE_URL' environment variable to be set")
+    async def __call__(self, *args, startgas=None, gasprice=20000000000, value=0, signer=None):
 
-        ethclient = JsonRPCClient(ethurl)
+        # TODO: figure out if we can validate args
+
+        ethclient = self.contract.client
 
-        data = self.contract.translator.encode_function_call(self.name, args)
+        data = self.encode(*args)
 
         # TODO: figure out if there's a better way to tell if the function needs to be called via sendTransaction
         if self.is_constant:
             result = await ethclient.eth_call(from_address=self.from_address or '', to_address=self.contract.address,
                                               data=data)
-            decoded = self.contract.translator.decode_function_result(self.name, data_decoder(result))
-            # make sure addresses are encoded as expected
-            decoded = fix_address_decoding(decoded, self.contract.translator.function_data[self.name]['decode_types'])
+            decoded = self.decode(_data_decoder(result))
             # return the single value if there is only a single return value
             if len(decoded) == 1:
                 return decoded[0]
@@ -88,10 +147,10 @@ class ContractMethod:
             if balance < (startgas * gasprice):
                 raise Exception("Given account doesn't have enough funds")
 
-            tx = Transaction(nonce, gasprice, startgas, self.contract.address, value, data, 0, 0, 0)
-            tx.sign(self.from_key)
-
-            tx_encoded = data_encoder(rlp.encode(tx, Transaction))
+            if signer is not None:
+                _, tx_encoded, _ = await signer.sign(self.from_key, nonce, gasprice, startgas, self.contract.address, value, data)
+            else:
+                _, tx_encoded, _ = _sign_transaction(self.from_key, nonce, gasprice, startgas, self.contract.address, value, data)
             try:
                 tx_hash = await ethclient.eth_sendRawTransaction(tx_encoded)
             except:
@@ -118,79 +177,150 @@ class ContractMethod:
 
 class Contract:
 
-    def __init__(self, *, abi, address, translator=None, log_filter_id=None):
-        self.abi = abi
-        self.valid_funcs = [part['name'] for part in abi if part['type'] == 'function']
-        self.translator = translator or ContractTranslator(abi)
+    def __init__(self, *, abi, address, translator=None, log_filter_id=None, client=None):
+        if translator is None:
+            # share the parsed abi with every other contract using it
+            entry = _get_abi_entry(abi)
+            self.abi = entry.abi
+            self.translator = entry.translator
+            self.methods = entry.methods
+            self.event_table = entry.event_table
+        else:
+            self.abi = abi
+            self.translator = translator
+            self.methods = _get_method_table(translator)
+            self.event_table = _get_event_table(translator)
         self.address = address
         self.log_filter_id = log_filter_id
+        self._client = client
+
+    @property
+    def valid_funcs(self):
+        return list(self.methods)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_default_client()
+        return self._client
+
+    def _make_method(self, name):
+        return ContractMethod(name, self)
+
+    def decode_logs(self, logs):
+        """returns a DecodedLog for each of the given logs that was emitted by
+        this contract and matches one of its events, skipping any others"""
+
+        address = self.address.lower()
+        event_table = self.event_table
+        rval = []
+        for log in logs:
+            if log['address'].lower() != address:
+                continue
+            decoded = _decode_log(event_table, log)
+            if decoded is not None:
+                rval.append(decoded)
+        return rval
+
+    async def events(self, *event_names, from_block=None, poll_interval=1.0):
+        """Streams DecodedLogs for this contract's events as they arrive.
+
+        If no event names are given all events are included. Uses the
+        contract's log_filter_id if set, otherwise installs (and on exit
+        uninstalls) a new filter. If from_block is given, logs already
+        matching the filter are yielded first"""
+
+        if event_names:
+            topics = [spec.topic for spec in self.event_table.values() if spec.name in event_names]
+            unknown = set(event_names) - {spec.name for spec in self.event_table.values()}
+            if unknown:
+                raise AttributeError("'{}' has no events named {}".format(
+                    self.__class__.__name__, ', '.join(sorted(unknown))))
+        else:
+            topics = list(self.event_table)
+
+        client = self.client
+        filter_id = self.log_filter_id
+        installed = filter_id is None
+        if installed:
+            filter_id = await client.eth_newFilter(fromBlock=from_block, address=self.address,
+                                                   topics=[topics] if topics else None)
+            wanted = None
+        else:
+            # an existing filter may match events that weren't asked for
+            wanted = set(event_names) if event_names else None
+
+        def decode(logs):
+            decoded = self.decode_logs(logs)
+            if wanted is not None:
+                decoded = [log for log in decoded if log.event in wanted]
+            return decoded
+
+        try:
+            if from_block is not None:
+                for decoded in decode(await client.eth_getFilterLogs(filter_id)):
+                    yield decoded
+            while True:
+                logs = await client.eth_getFilterChanges(filter_id)
+                if logs:
+                    for decoded in decode(logs):
+                        yield decoded
+                else:
+                    await asyncio.sleep(poll_interval)
+        finally:
+            if installed:
+                await client.eth_uninstallFilter(filter_id)
 
     def __getattr__(self, name):
 
-        if name in self.valid_funcs:
-            return ContractMethod(name, self)
+        # avoid recursing when looking up our own attributes before __init__ has set them
+        if name.startswith('__') or name in ('methods', '_client'):
+            raise AttributeError(name)
+
+        if name in self.methods:
+            # cache the method object as an instance attribute so further
+            # lookups don't reach __getattr__
+            method = self.__dict__[name] = self._make_method(name)
+            return method
 
-        raise AttributeError("'Contract' object has no attribute '{}'".format(name))
+        raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, name))
 
     @classmethod
     async def from_source_code(cls, sourcecode, contract_name, constructor_data=None,
                                *, address=None, deployer_private_key=None, import_mappings=None,
-                               libraries=None, optimize=False, deploy=True, cwd=None):
+                               libraries=None, optimize=False, deploy=True, cwd=None, client=None,
+                               cache=True):
+        """Compiles and deploys (or binds to an existing deployment at
+        `address`) the named contract. `sourcecode` is the source, a filename
+        or a CompiledSource from compile_source/compile_many, so that one solc
+        run can be shared by every contract in a file"""
 
         if deploy:
-            ethurl = os.environ.get('ETHEREUM_NODE_URL')
-            if not ethurl:
-                raise Exception("requires 'ETHEREUM_NODE_URL' environment variable to be set")
+            if client is None:
+                client = get_default_client()
 
             if address is None and deployer_private_key is None:
                 raise TypeError("requires either address or deployer_private_key")
             if address is None and not isinstance(constructor_data, (list, type(None))):
                 raise TypeError("must supply constructor_data as a list (hint: use [] if args should be empty)")
 
-        args = ['solc', '--combined-json', 'bin,abi', '--add-std']
-        if libraries:
-            args.extend(['--libraries', ','.join(['{}:{}'.format(*library) for library in libraries])])
-        if optimize:
-            args.append('--optimize')
-        if import_mappings:
-            args.extend(["{}={}".format(path, mapping) for path, mapping in import_mappings])
-        # check if sourcecode is actually a filename
-        if cwd:
-            filename = os.path.join(cwd, sourcecode)
+        if isinstance(sourcecode, CompiledSource):
+            compiled = sourcecode
         else:
-            filename = sourcecode
-        if os.path.exists(filename):
-            args.append(filename)
-            sourcecode = None
-        else:
-            filename = '<stdin>'
-        process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
-        output, stderrdata = process.communicate(input=sourcecode)
-        try:
-            output = json_decode(output)
-        except json.JSONDecodeError:
-            if output and stderrdata:
-                output += b'\n' + stderrdata
-            elif stderrdata:
-                output = stderrdata
-            raise Exception("Failed to compile source: {}\n{}\n{}".format(filename, ' '.join(args), output.decode('utf-8')))
-
-        try:
-            contract = output['contracts']['{}:{}'.format(filename, contract_name)]
-        except KeyError:
-            print(output)
-            raise
-        abi = json_decode(contract['abi'])
+            compiled = await compile_source(sourcecode, import_mappings=import_mappings, libraries=libraries,
+                                            optimize=optimize, cwd=cwd, cache=cache)
+        abi, bytecode = compiled.get(contract_name)
 
         # deploy contract
-        translator = ContractTranslator(abi)
+        translator = _get_abi_entry(abi).translator
 
         if not deploy:
             return Contract(abi=abi,
                             address=address,
-                            translator=translator)
+                            translator=translator,
+                            client=client)
 
-        ethclient = JsonRPCClient(ethurl)
+        ethclient = client
 
         if address is not None:
             # verify there is code at the given address
@@ -204,12 +334,13 @@ class Contract:
                 raise Exception("No code found at given address")
             return Contract(abi=abi,
                             address=address,
-                            translator=translator)
+                            translator=translator,
+                            client=client)
 
         try:
-            bytecode = data_decoder(contract['bin'])
+            bytecode = _data_decoder(bytecode)
         except binascii.Error:
-            print(contract['bin'])
+            print(bytecode)
             raise
 
         if constructor_data is not None:
@@ -217,8 +348,8 @@ class Contract:
             bytecode += constructor_call
 
         if isinstance(deployer_private_key, str):
-            deployer_private_key = data_decoder(deployer_private_key)
-        deployer_address = private_key_to_address(deployer_private_key)
+            deployer_private_key = _data_decoder(deployer_private_key)
+        deployer_address = _private_key_to_address(deployer_private_key)
         nonce = await ethclient.eth_getTransactionCount(deployer_address)
         balance = await ethclient.eth_getBalance(deployer_address)
 
@@ -230,12 +361,8 @@ class Contract:
         if balance < (startgas * gasprice):
             raise Exception("Given account doesn't have enough funds")
 
-        tx = Transaction(nonce, gasprice, startgas, '', value, bytecode, 0, 0, 0)
-        tx.sign(deployer_private_key)
-
-        tx_encoded = data_encoder(rlp.encode(tx, Transaction))
-
-        contract_address = data_encoder(tx.creates)
+        _, tx_encoded, contract_address = _sign_transaction(deployer_private_key, nonce, gasprice, startgas,
+                                                            '', value, bytecode)
 
         tx_hash = await ethclient.eth_sendRawTransaction(tx_encoded)
 
@@ -250,7 +377,7 @@ class Contract:
                     raise Exception("Failed to deploy contract: resulting address '{}' has no code".format(contract_address))
                 break
 
-        return Contract(abi=abi, address=contract_address, translator=translator)
+        return Contract(abi=abi, address=contract_address, translator=translator, client=client)
 
 class BoundContract(Contract):
     """A Contract that bound to a specific sender.
@@ -258,11 +385,15 @@ class BoundContract(Contract):
 
     def __init__(self, *, sender, **kwargs):
         self.sender = sender
+        # the sender is fixed, so its address is only derived once
+        if sender:
+            key = _data_decoder(sender) if isinstance(sender, str) else sender
+            self.sender_address = _private_key_to_address(key)
+        else:
+            self.sender_address = None
         super().__init__(**kwargs)
 
-    def __getattr__(self, name):
-
-        attr = super().__getattr__(name)
+    def _make_method(self, name):
         if self.sender:
-            return attr.set_sender(self.sender)
-        return attr
+            return ContractMethod(name, self, from_key=self.sender, from_address=self.sender_address)
+        return ContractMethod(name, self)
@@ -0,0 +1,244 @@
+import asyncio
+
+from ethereum.utils import mk_contract_address
+from ethutils import data_decoder, data_encoder, private_key_to_address
+
+from asyncbb.ethereum.client import JsonRPCError
+from asyncbb.ethereum.compiler import compile_source
+from asyncbb.ethereum.contract import Contract
+from asyncbb.ethereum.registry import get_abi_entry
+from asyncbb.ethereum.signing import sign_transactions
+
+DEFAULT_GASPRICE = 20000000000
+# used when gas can't be estimated ahead of time, e.g. a constructor
+# calling a library that hasn't been mined yet
+DEFAULT_DEPLOY_STARTGAS = 4000000
+
+class DeploymentError(Exception):
+    pass
+
+class PlannedAddress:
+    """Placeholder for the address of another contract in the same plan,
+    for use in constructor_data"""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return 'PlannedAddress({!r})'.format(self.name)
+
+class _Deployment:
+
+    __slots__ = ('name', 'sourcecode', 'contract_name', 'constructor_data', 'libraries',
+                 'depends', 'startgas', 'address', 'abi', 'bytecode')
+
+    def __init__(self, name, sourcecode, contract_name, constructor_data, libraries, depends, startgas):
+        self.name = name
+        self.sourcecode = sourcecode
+        self.contract_name = contract_name
+        self.constructor_data = constructor_data
+        self.libraries = libraries
+        self.depends = depends
+        self.startgas = startgas
+        self.address = None
+        self.abi = None
+        self.bytecode = None
+
+class DeploymentPlanner:
+    """Deploys a set of contracts that depend on each other, e.g. libraries
+    and the contracts linked against them, in one go.
+
+    The address each contract will be created at is computed up front from
+    the deployer's nonce, so dependents can be linked and constructed with
+    the addresses of contracts that haven't been mined yet. All the
+    deployments are then compiled concurrently, signed together, submitted
+    in a single batch, and waited on together.
+
+    e.g.
+
+        planner = DeploymentPlanner(client, deployer_key)
+        planner.add('math', 'contracts/SafeMath.sol', 'SafeMath')
+        planner.add('token', 'contracts/Token.sol', 'Token', constructor_data=[1000], libraries=['math'])
+        planner.add('sale', 'contracts/Sale.sol', 'Sale', constructor_data=[planner.address_of('token')])
+        contracts = await planner.deploy()
+    """
+
+    def __init__(self, client, deployer_private_key, *, gasprice=DEFAULT_GASPRICE, signer=None,
+                 network_id=None, max_workers=4, poll_interval=0.5, import_mappings=None,
+                 optimize=False, cwd=None, cache=True, solc='solc'):
+
+        if isinstance(deployer_private_key, str):
+            deployer_private_key = data_decoder(deployer_private_key)
+        self.client = client
+        self.private_key = deployer_private_key
+        self.deployer_address = private_key_to_address(deployer_private_key)
+        self.gasprice = gasprice
+        self.signer = signer
+        self.network_id = network_id
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.compile_options = {'import_mappings': import_mappings, 'optimize': optimize,
+                                'cwd': cwd, 'cache': cache, 'solc': solc}
+        self._deployments = {}
+
+    def add(self, name, sourcecode, contract_name=None, *, constructor_data=None, libraries=(),
+            depends=(), startgas=None):
+        """Adds a contract to the plan under the given name.
+
+        `libraries` are the names of other planned contracts to link this one
+        against. Any PlannedAddress in constructor_data (see address_of) is
+        replaced by that contract's address. `depends` lists any other
+        planned contracts that must be deployed before this one.
+        If startgas isn't given it is estimated"""
+
+        if name in self._deployments:
+            raise ValueError("'{}' has already been added".format(name))
+        if constructor_data is not None and not isinstance(constructor_data, list):
+            raise TypeError("must supply constructor_data as a list")
+        depends = set(depends) | set(libraries)
+        depends.update(arg.name for arg in constructor_data or () if isinstance(arg, PlannedAddress))
+        self._deployments[name] = _Deployment(name, sourcecode, contract_name or name, constructor_data,
+                                              list(libraries), depends, startgas)
+
+    def address_of(self, name):
+        """returns a placeholder for the planned contract's address to use in constructor_data"""
+        return PlannedAddress(name)
+
+    def order(self):
+        """returns the names of the planned contracts in the order they will
+        be deployed, such that every contract comes after its dependencies"""
+
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise DeploymentError("dependency cycle: {}".format(' -> '.join(path + [name])))
+            if name not in self._deployments:
+                raise DeploymentError("'{}' depends on '{}' which isn't part of the plan".format(path[-1], name))
+            state[name] = 'visiting'
+            for dep in sorted(self._deployments[name].depends):
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self._deployments:
+            visit(name, [])
+        return order
+
+    async def _compile(self, deployments):
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+        # contracts sharing a source and linked libraries share a solc run
+        runs = {}
+
+        async def run(sourcecode, libraries):
+            async with semaphore:
+                return await compile_source(sourcecode, libraries=libraries, **self.compile_options)
+
+        keys = []
+        for deployment in deployments:
+            libraries = tuple(sorted((self._deployments[lib].contract_name, self._deployments[lib].address)
+                                     for lib in deployment.libraries))
+            key = (deployment.sourcecode, libraries)
+            if key not in runs:
+                runs[key] = asyncio.ensure_future(run(deployment.sourcecode, list(libraries) or None))
+            keys.append(key)
+        try:
+            await asyncio.gather(*runs.values())
+        except BaseException:
+            for future in runs.values():
+                future.cancel()
+            raise
+
+        for deployment, key in zip(deployments, keys):
+            abi, bytecode = runs[key].result().get(deployment.contract_name)
+            if '__' in bytecode:
+                raise DeploymentError("'{}' has unlinked libraries".format(deployment.name))
+            bytecode = data_decoder(bytecode)
+            if deployment.constructor_data is not None:
+                args = [self._deployments[arg.name].address if isinstance(arg, PlannedAddress) else arg
+                        for arg in deployment.constructor_data]
+                bytecode += get_abi_entry(abi).translator.encode_constructor_arguments(args)
+            deployment.abi = abi
+            deployment.bytecode = bytecode
+
+    async def _estimate(self, deployments):
+
+        pending = [d for d in deployments if d.startgas is None]
+        results = await self.client._fetch_batch([
+            ("eth_estimateGas", [{"from": self.deployer_address, "data": data_encoder(d.bytecode),
+                                  "gasPrice": hex(self.gasprice)}])
+            for d in pending])
+        startgas = {d.name: d.startgas for d in deployments}
+        for deployment, result in zip(pending, results):
+            if isinstance(result, JsonRPCError):
+                startgas[deployment.name] = DEFAULT_DEPLOY_STARTGAS
+            else:
+                startgas[deployment.name] = int(result, 16)
+        return startgas
+
+    async def _sign(self, transactions):
+        if self.signer is not None:
+            return await self.signer.sign_batch(self.private_key, transactions, network_id=self.network_id)
+        return sign_transactions(self.private_key, transactions, network_id=self.network_id)
+
+    async def deploy(self):
+        """Deploys everything added to the plan, returning a dict of name to
+        Contract once all of them have been mined and have code"""
+
+        order = self.order()
+        if not order:
+            return {}
+        deployments = [self._deployments[name] for name in order]
+
+        nonce, balance = await self.client._fetch_batch([
+            ("eth_getTransactionCount", [self.deployer_address, "pending"]),
+            ("eth_getBalance", [self.deployer_address, "latest"])])
+        for result in (nonce, balance):
+            if isinstance(result, JsonRPCError):
+                raise result
+        nonce = int(nonce, 16)
+        balance = int(balance, 16)
+
+        for i, deployment in enumerate(deployments):
+            deployment.address = data_encoder(mk_contract_address(data_decoder(self.deployer_address), nonce + i))
+
+        await self._compile(deployments)
+        startgas = await self._estimate(deployments)
+
+        if balance < sum(startgas.values()) * self.gasprice:
+            raise DeploymentError("Given account doesn't have enough funds")
+
+        signed = await self._sign([(nonce + i, self.gasprice, startgas[d.name], b'', 0, d.bytecode)
+                                   for i, d in enumerate(deployments)])
+
+        results = await self.client._fetch_batch([("eth_sendRawTransaction", [raw]) for _, raw, _ in signed])
+        for deployment, result in zip(deployments, results):
+            if isinstance(result, JsonRPCError):
+                raise DeploymentError("Failed to submit '{}': {}".format(deployment.name, result))
+
+        # wait for everything to be mined
+        receipts = [None] * len(deployments)
+        while True:
+            pending = [i for i, receipt in enumerate(receipts) if receipt is None]
+            if not pending:
+                break
+            results = await self.client._fetch_batch([("eth_getTransactionReceipt", [signed[i][0]]) for i in pending])
+            for i, result in zip(pending, results):
+                if not isinstance(result, JsonRPCError) and result is not None and result.get('blockNumber'):
+                    receipts[i] = result
+            if any(receipt is None for receipt in receipts):
+                await asyncio.sleep(self.poll_interval)
+
+        codes = await self.client._fetch_batch([("eth_getCode", [d.address, "latest"]) for d in deployments])
+        for deployment, code in zip(deployments, codes):
+            if isinstance(code, JsonRPCError) or code in (None, "0x"):
+                raise DeploymentError("Failed to deploy contract '{}': resulting address '{}' has no code".format(
+                    deployment.name, deployment.address))
+
+        return {d.name: Contract(abi=d.abi, address=d.address, client=self.client) for d in deployments}
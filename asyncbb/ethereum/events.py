@@ -0,0 +1,157 @@
+import weakref
+
+from collections import namedtuple
+from types import MappingProxyType
+
+from asyncbb.ethereum.abicodec import get_decoder, get_topic_decoder
+
+DecodedLog = namedtuple('DecodedLog', ['event', 'args', 'log'])
+DecodedLog.__doc__ = """A log decoded against a known event. `event` is the event name,
+`args` a dict of argument name to value and `log` the raw log from the node"""
+
+class EventSpec(namedtuple('EventSpec', ['name', 'topic', 'names', 'types', 'indexed', 'topic_count',
+                                         'decoder'])):
+    """Immutable description of a contract event, precomputed from the abi.
+    `topic` is the 0x prefixed hex event id (the log's first topic),
+    `topic_count` how many topics its logs have (the id and one per indexed
+    argument) and `decoder` takes a log's topics and data and returns the
+    args dict"""
+
+    __slots__ = ()
+
+def _event_decoder(names, types, indexed):
+    """builds a function (topics, data) -> args specialised for the event's
+    split of indexed and non indexed arguments"""
+
+    unindexed_types = [typ for typ, idx in zip(types, indexed) if not idx]
+    indexed_args = []
+    unindexed_args = []
+    topic = 1
+    for name, typ, idx in zip(names, types, indexed):
+        if idx:
+            indexed_args.append((name, topic, get_topic_decoder(typ)))
+            topic += 1
+        else:
+            unindexed_args.append((name, len(unindexed_args)))
+
+    if not unindexed_types:
+        def decode(topics, data):
+            return {name: fn(topics[i]) for name, i, fn in indexed_args}
+        return decode
+
+    decode_data = get_decoder(unindexed_types)
+
+    if not indexed_args:
+        def decode(topics, data):
+            values = decode_data(bytes.fromhex(data[2:]))
+            return {name: values[i] for name, i in unindexed_args}
+        return decode
+
+    def decode(topics, data):
+        args = {name: fn(topics[i]) for name, i, fn in indexed_args}
+        values = decode_data(bytes.fromhex(data[2:]))
+        for name, i in unindexed_args:
+            args[name] = values[i]
+        return args
+    return decode
+
+# event tables are built once per translator
+_event_tables = weakref.WeakKeyDictionary()
+
+def get_event_table(translator):
+    """returns a read only mapping of topic (0x prefixed lower case hex) to
+    EventSpec for all the non anonymous events known by the translator"""
+
+    table = _event_tables.get(translator)
+    if table is not None:
+        return table
+    specs = {}
+    for event_id, data in translator.event_data.items():
+        if data.get('anonymous'):
+            continue
+        if isinstance(event_id, bytes):
+            event_id = int.from_bytes(event_id, 'big')
+        topic = '0x{:064x}'.format(event_id)
+        names = tuple(data['names'])
+        types = tuple(data['types'])
+        indexed = tuple(data['indexed'])
+        specs[topic] = EventSpec(data['name'], topic, names, types, indexed, 1 + sum(map(bool, indexed)),
+                                 _event_decoder(names, types, indexed))
+    table = _event_tables[translator] = MappingProxyType(specs)
+    return table
+
+def _decode(spec, topics, log):
+    # the event id only covers the signature, not which arguments are
+    # indexed, e.g. ERC20 and ERC721 Transfer events share it. so a log that
+    # doesn't fit the spec is from some other event and isn't a match
+    if len(topics) != spec.topic_count:
+        return None
+    try:
+        args = spec.decoder(topics, log['data'])
+    except Exception:
+        return None
+    return DecodedLog(spec.name, args, log)
+
+def decode_log(events, log):
+    """decodes a single log from the node using the given event table,
+    returning None if the log isn't one of the events"""
+
+    topics = log.get('topics')
+    if not topics:
+        return None
+    spec = events.get(topics[0].lower())
+    if spec is None:
+        return None
+    return _decode(spec, topics, log)
+
+class EventRegistry:
+    """Decodes logs from many contracts at once.
+
+    Contracts are indexed by (address, topic), abis registered without an
+    address decode matching events from any address"""
+
+    def __init__(self):
+        self._index = {}
+        self._any_address = {}
+
+    def add(self, contract):
+        address = contract.address.lower()
+        for topic, spec in contract.event_table.items():
+            self._index[(address, topic)] = spec
+
+    def add_events(self, events, address=None):
+        """adds an event table (e.g. Contract.event_table) for the given
+        address, or for any address if none is given"""
+        if address is None:
+            self._any_address.update(events)
+        else:
+            address = address.lower()
+            for topic, spec in events.items():
+                self._index[(address, topic)] = spec
+
+    def remove(self, contract):
+        address = contract.address.lower()
+        for topic in contract.event_table:
+            self._index.pop((address, topic), None)
+
+    def decode_logs(self, logs):
+        """returns a DecodedLog for each log matching a registered event,
+        in the order given, skipping logs that don't match"""
+
+        index = self._index
+        any_address = self._any_address
+        rval = []
+        for log in logs:
+            topics = log.get('topics')
+            if not topics:
+                continue
+            topic = topics[0].lower()
+            spec = index.get((log['address'].lower(), topic))
+            if spec is None:
+                spec = any_address.get(topic)
+                if spec is None:
+                    continue
+            decoded = _decode(spec, topics, log)
+            if decoded is not None:
+                rval.append(decoded)
+        return rval
@@ -0,0 +1,237 @@
+"""Exports ranges of blocks into column oriented files.
+
+Each chunk of blocks is written to its own directory with one file per
+column in the NumPy .npy format, written directly so numpy isn't needed.
+Integer columns are little endian uint64 and hashes and addresses are
+fixed width byte strings, so chunks can be memory mapped back without any
+parsing, either with `numpy.load(path, mmap_mode='r')` or with read_column.
+
+Block columns: number, timestamp, gas_used, tx_count, hash, miner
+Transaction columns: block_number, index, hash, from, to, value, gas,
+gas_price, nonce
+
+`value` is stored as 32 byte big endian integers since it doesn't fit in
+64 bits. `to` is all zeros for contract creations"""
+
+import array
+import ast
+import asyncio
+import collections
+import mmap
+import os
+import sys
+
+from asyncbb.ethereum.client import JsonRPCError
+
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+BLOCK_COLUMNS = (('number', '<u8'), ('timestamp', '<u8'), ('gas_used', '<u8'), ('tx_count', '<u8'),
+                 ('hash', '|S32'), ('miner', '|S20'))
+TRANSACTION_COLUMNS = (('block_number', '<u8'), ('index', '<u8'), ('hash', '|S32'), ('from', '|S20'),
+                       ('to', '|S20'), ('value', '|S32'), ('gas', '<u8'), ('gas_price', '<u8'), ('nonce', '<u8'))
+
+ZERO_ADDRESS = b'\x00' * 20
+
+def _new_column(descr):
+    if descr == '<u8':
+        return array.array('Q')
+    return bytearray()
+
+def write_npy(path, descr, data):
+    """writes a 1 dimensional column to path in .npy format. `data` is an
+    array.array('Q') for '<u8' columns or the concatenated values of an
+    '|SN' column"""
+
+    if descr == '<u8':
+        count = len(data)
+        if sys.byteorder == 'big':
+            data = array.array('Q', data)
+            data.byteswap()
+        data = data.tobytes()
+    else:
+        count = len(data) // int(descr[2:])
+    header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({},), }}".format(descr, count)
+    # the header is padded so the data starts on a 64 byte boundary
+    length = len(NPY_MAGIC) + 2 + len(header) + 1
+    header += ' ' * (-length % 64) + '\n'
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(NPY_MAGIC)
+        f.write(len(header).to_bytes(2, 'little'))
+        f.write(header.encode('latin1'))
+        f.write(data)
+    os.replace(tmp, path)
+
+class Column:
+    """A memory mapped .npy column. Integer columns index to ints and
+    byte string columns to bytes"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(NPY_MAGIC)) != NPY_MAGIC:
+                raise ValueError("{} is not a version 1.0 npy file".format(path))
+            header_length = int.from_bytes(f.read(2), 'little')
+            header = ast.literal_eval(f.read(header_length).decode('latin1'))
+            offset = len(NPY_MAGIC) + 2 + header_length
+            self.descr = header['descr']
+            self.shape = header['shape']
+            size = os.fstat(f.fileno()).st_size
+            if size > offset:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._base = memoryview(self._mmap)
+            else:
+                self._mmap = None
+                self._base = memoryview(b'')
+            self._view = self._base[offset:]
+        if self.descr == '<u8':
+            self.width = 8
+            if sys.byteorder == 'little':
+                self._values = self._view.cast('Q')
+            else:
+                self._values = None
+        elif self.descr.startswith('|S'):
+            self.width = int(self.descr[2:])
+            self._values = None
+        else:
+            raise ValueError("unsupported column type {}".format(self.descr))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("column index out of range")
+        if self._values is not None:
+            return self._values[index]
+        value = bytes(self._view[index * self.width:(index + 1) * self.width])
+        if self.descr == '<u8':
+            return int.from_bytes(value, 'little')
+        return value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        if self._values is not None:
+            self._values.release()
+        self._view.release()
+        self._base.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+def read_column(path):
+    """memory maps a column written by the exporter (or any 1 dimensional
+    little endian uint64 or byte string .npy file)"""
+    return Column(path)
+
+def read_chunk(path, table='blocks'):
+    """returns a dict of column name to Column for the given table
+    ('blocks' or 'transactions') of a chunk directory"""
+
+    columns = BLOCK_COLUMNS if table == 'blocks' else TRANSACTION_COLUMNS
+    return {name: Column(os.path.join(path, '{}.{}.npy'.format(table, name))) for name, _ in columns}
+
+class BlockExporter:
+    """Streams a range of blocks from the node into chunked column files.
+
+    Blocks are fetched with transactions in concurrent jsonrpc batches and
+    each batch is appended to typed column buffers, in order, as it
+    completes. At most `concurrency * batch_size` blocks are held as parsed
+    json at once, and the column buffers are written out every `chunk_size`
+    blocks, so memory use is bounded by the chunk size rather than the range.
+
+    e.g.
+
+        exporter = BlockExporter(client, 'export/')
+        chunks = await exporter.export(4000000, 4100000)
+        timestamps = read_chunk(chunks[0])['timestamp']
+    """
+
+    def __init__(self, client, path, *, chunk_size=10000, batch_size=50, concurrency=4):
+        self.client = client
+        self.path = path
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    async def _fetch_batch(self, first, last):
+        """returns the blocks from first up to (not including) last, in order"""
+
+        results = await self.client._fetch_batch([
+            ("eth_getBlockByNumber", [hex(number), True]) for number in range(first, last)])
+        for number, result in zip(range(first, last), results):
+            if isinstance(result, JsonRPCError):
+                raise result
+            if result is None:
+                raise JsonRPCError(None, -1, "block {} not found".format(number), None)
+        return results
+
+    def _append_blocks(self, block_columns, tx_columns, blocks):
+
+        for block in blocks:
+            number = int(block['number'], 16)
+            transactions = block['transactions']
+            block_columns['number'].append(number)
+            block_columns['timestamp'].append(int(block['timestamp'], 16))
+            block_columns['gas_used'].append(int(block['gasUsed'], 16))
+            block_columns['tx_count'].append(len(transactions))
+            block_columns['hash'] += bytes.fromhex(block['hash'][2:])
+            miner = block.get('miner')
+            block_columns['miner'] += bytes.fromhex(miner[2:]) if miner else ZERO_ADDRESS
+
+            for tx in transactions:
+                tx_columns['block_number'].append(number)
+                tx_columns['index'].append(int(tx['transactionIndex'], 16))
+                tx_columns['hash'] += bytes.fromhex(tx['hash'][2:])
+                tx_columns['from'] += bytes.fromhex(tx['from'][2:])
+                tx_columns['to'] += bytes.fromhex(tx['to'][2:]) if tx.get('to') else ZERO_ADDRESS
+                tx_columns['value'] += int(tx['value'], 16).to_bytes(32, 'big')
+                tx_columns['gas'].append(int(tx['gas'], 16))
+                tx_columns['gas_price'].append(int(tx['gasPrice'], 16))
+                tx_columns['nonce'].append(int(tx['nonce'], 16))
+
+    async def _export_chunk(self, start, end):
+
+        block_columns = {name: _new_column(descr) for name, descr in BLOCK_COLUMNS}
+        tx_columns = {name: _new_column(descr) for name, descr in TRANSACTION_COLUMNS}
+
+        # at most `concurrency` batches are requested at once, and the oldest
+        # is appended to the columns before the next one is started, so no
+        # more than concurrency * batch_size blocks are held as dicts
+        pending = collections.deque()
+        try:
+            for first in range(start, end, self.batch_size):
+                if len(pending) >= self.concurrency:
+                    self._append_blocks(block_columns, tx_columns, await pending.popleft())
+                pending.append(asyncio.ensure_future(
+                    self._fetch_batch(first, min(first + self.batch_size, end))))
+            while pending:
+                self._append_blocks(block_columns, tx_columns, await pending.popleft())
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+        directory = os.path.join(self.path, '{:012d}-{:012d}'.format(start, end - 1))
+        os.makedirs(directory, exist_ok=True)
+        for table, columns, descrs in (('blocks', block_columns, BLOCK_COLUMNS),
+                                       ('transactions', tx_columns, TRANSACTION_COLUMNS)):
+            for name, descr in descrs:
+                write_npy(os.path.join(directory, '{}.{}.npy'.format(table, name)), descr, columns[name])
+        return directory
+
+    async def export(self, start, end):
+        """exports blocks from start up to (not including) end, returning the
+        list of chunk directories written"""
+
+        os.makedirs(self.path, exist_ok=True)
+        chunks = []
+        for chunk_start in range(start, end, self.chunk_size):
+            chunk_end = min(chunk_start + self.chunk_size, end)
+            chunks.append(await self._export_chunk(chunk_start, chunk_end))
+        return chunks
@@ -0,0 +1,280 @@
+import asyncio
+
+from asyncbb.ethereum.client import JsonRPCError, validate_hex
+
+FILTER_NOT_FOUND_ERRORS = ("filter not found",)
+
+def _normalize_topics(topics):
+    rval = []
+    for topic in topics or ():
+        if topic is None:
+            rval.append(None)
+        elif isinstance(topic, (list, tuple, set, frozenset)):
+            rval.append(frozenset(validate_hex(t, 32).lower() for t in topic))
+        else:
+            rval.append(frozenset([validate_hex(topic, 32).lower()]))
+    while rval and rval[-1] is None:
+        rval.pop()
+    return tuple(rval)
+
+class Subscription:
+    """A stream of results from a FilterManager. Results can be read with
+    `await subscription.get()` or `async for result in subscription`.
+    Call close() to stop receiving them"""
+
+    def __init__(self, manager, kind, addresses=None, topics=()):
+        self.manager = manager
+        self.kind = kind
+        self.addresses = addresses
+        self.topics = topics
+        self.queue = asyncio.Queue()
+
+    def matches(self, log):
+        if self.addresses is not None and log['address'].lower() not in self.addresses:
+            return False
+        log_topics = log.get('topics') or ()
+        for i, allowed in enumerate(self.topics):
+            if allowed is None:
+                continue
+            if i >= len(log_topics) or log_topics[i].lower() not in allowed:
+                return False
+        return True
+
+    async def get(self):
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.manager._remove(self)
+
+class _NodeFilter:
+    """a filter installed on the node on behalf of many subscriptions"""
+
+    __slots__ = ('kind', 'filter_id', 'params', 'backfilled')
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.filter_id = None
+        self.params = None
+        # keys of logs returned by eth_getFilterLogs after (re)installing,
+        # which the next eth_getFilterChanges may return again
+        self.backfilled = None
+
+def _log_key(log):
+    return (log.get('transactionHash'), log.get('logIndex'))
+
+class FilterManager:
+    """Shares node filters between many subscribers.
+
+    All log subscriptions are served by a single node log filter covering
+    the union of their addresses and a superset of their topics, and all
+    block subscriptions by a single block filter. Each poll fetches the
+    changes of both filters and the current block number in one jsonrpc
+    batch, and results are passed on to the subscriptions they exactly
+    match.
+
+    If the node forgets a filter ("filter not found", e.g. after a restart
+    or when it expires) it's installed again from the block after the last
+    one polled and the missed logs are fetched with eth_getFilterLogs.
+
+    e.g.
+
+        manager = FilterManager(client)
+        subscription = manager.subscribe_logs(address=token.address, topics=[TRANSFER_TOPIC])
+        async for log in subscription:
+            ...
+    """
+
+    def __init__(self, client, *, poll_interval=1.0):
+        self.client = client
+        self.poll_interval = poll_interval
+        self._logs = _NodeFilter('logs')
+        self._blocks = _NodeFilter('blocks')
+        self._subscriptions = []
+        self._task = None
+        self._last_block = None
+        # metrics
+        self.polls = 0
+        self.installs = 0
+        self.errors = 0
+        self.last_error = None
+
+    def subscribe_logs(self, address=None, topics=None):
+        """subscribes to logs from the given address (or list of addresses,
+        or any address if None) matching topics, where each topic position
+        is None, a topic or a list of topics to match any of"""
+
+        if address is None:
+            addresses = None
+        elif isinstance(address, (list, tuple, set, frozenset)):
+            addresses = frozenset(validate_hex(a).lower() for a in address)
+        else:
+            addresses = frozenset([validate_hex(address).lower()])
+        return self._add(Subscription(self, 'logs', addresses, _normalize_topics(topics)))
+
+    def subscribe_blocks(self):
+        """subscribes to the hashes of new blocks"""
+        return self._add(Subscription(self, 'blocks'))
+
+    def _add(self, subscription):
+        self._subscriptions.append(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return subscription
+
+    def _remove(self, subscription):
+        try:
+            self._subscriptions.remove(subscription)
+        except ValueError:
+            pass
+
+    @property
+    def node_filters(self):
+        """the number of filters currently installed on the node"""
+        return sum(1 for node_filter in (self._logs, self._blocks) if node_filter.filter_id is not None)
+
+    def _merged_log_params(self):
+        """returns the eth_newFilter params covering every log subscription,
+        or None if there are none"""
+
+        subscriptions = [s for s in self._subscriptions if s.kind == 'logs']
+        if not subscriptions:
+            return None
+
+        params = {}
+        if all(s.addresses is not None for s in subscriptions):
+            params['address'] = sorted(set().union(*(s.addresses for s in subscriptions)))
+
+        # a position can only be restricted if every subscription restricts it
+        topics = []
+        for i in range(min(len(s.topics) for s in subscriptions)):
+            allowed = [s.topics[i] for s in subscriptions]
+            if any(a is None for a in allowed):
+                topics.append(None)
+            else:
+                topics.append(sorted(set().union(*allowed)))
+        while topics and topics[-1] is None:
+            topics.pop()
+        if topics:
+            params['topics'] = topics
+        return params
+
+    async def _install(self, node_filter, params, from_block=None):
+        """installs a node filter, uninstalling the one it replaces. When
+        reinstalling from a past block the logs since then are returned"""
+
+        if node_filter.filter_id is not None:
+            await self._uninstall(node_filter)
+
+        self.installs += 1
+        if node_filter.kind == 'blocks':
+            node_filter.filter_id = await self.client.eth_newBlockFilter()
+            node_filter.params = params
+            return []
+
+        node_filter.filter_id = await self.client.eth_newFilter(fromBlock=from_block, **params)
+        node_filter.params = params
+        if from_block is None:
+            return []
+        logs = await self.client.eth_getFilterLogs(node_filter.filter_id)
+        node_filter.backfilled = {_log_key(log) for log in logs}
+        return logs
+
+    async def _sync_filters(self):
+        """makes sure the installed filters match the current subscriptions,
+        returning any logs backfilled while doing so"""
+
+        backfill = []
+        params = self._merged_log_params()
+        if params is None:
+            if self._logs.filter_id is not None:
+                await self._uninstall(self._logs)
+        elif params != self._logs.params:
+            # the replacement filter starts after the last poll, so nothing
+            # the old one would have returned is missed
+            from_block = None if self._last_block is None or self._logs.params is None else self._last_block + 1
+            backfill = await self._install(self._logs, params, from_block)
+
+        wants_blocks = any(s.kind == 'blocks' for s in self._subscriptions)
+        if wants_blocks and self._blocks.filter_id is None:
+            await self._install(self._blocks, {})
+        elif not wants_blocks and self._blocks.filter_id is not None:
+            await self._uninstall(self._blocks)
+        return backfill
+
+    async def _uninstall(self, node_filter):
+        try:
+            await self.client.eth_uninstallFilter(node_filter.filter_id)
+        except JsonRPCError:
+            pass
+        node_filter.filter_id = None
+        node_filter.params = None
+
+    def _dispatch(self, kind, results):
+        subscriptions = [s for s in self._subscriptions if s.kind == kind]
+        for result in results:
+            for subscription in subscriptions:
+                if kind == 'blocks' or subscription.matches(result):
+                    subscription.queue.put_nowait(result)
+
+    async def poll(self):
+        """polls the node filters once and passes the results on"""
+
+        self._dispatch('logs', await self._sync_filters())
+
+        filters = [f for f in (self._logs, self._blocks) if f.filter_id is not None]
+        calls = [("eth_getFilterChanges", [f.filter_id]) for f in filters]
+        calls.append(("eth_blockNumber", []))
+        results = await self.client._fetch_batch(calls)
+        self.polls += 1
+
+        block_number = results[-1]
+        for node_filter, changes in zip(filters, results):
+            if isinstance(changes, JsonRPCError):
+                if not any(msg in str(changes).lower() for msg in FILTER_NOT_FOUND_ERRORS):
+                    raise changes
+                # the node lost the filter, install it again and catch up
+                from_block = None if self._last_block is None else self._last_block + 1
+                changes = await self._install(node_filter, node_filter.params, from_block)
+            elif node_filter.backfilled is not None:
+                changes = [log for log in changes if _log_key(log) not in node_filter.backfilled]
+                node_filter.backfilled = None
+            self._dispatch(node_filter.kind, changes or [])
+
+        if not isinstance(block_number, JsonRPCError):
+            self._last_block = int(block_number, 16)
+
+    async def _run(self):
+        while True:
+            if not self._subscriptions:
+                # uninstall the node filters, unless someone subscribed meanwhile
+                await self._sync_filters()
+                if not self._subscriptions:
+                    return
+            try:
+                await self.poll()
+            except Exception as e:
+                # transient node errors shouldn't kill every subscription
+                self.errors += 1
+                self.last_error = e
+            await asyncio.sleep(self.poll_interval)
+
+    async def stop(self):
+        """stops polling and uninstalls the node filters"""
+
+        self._subscriptions.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for node_filter in (self._logs, self._blocks):
+            if node_filter.filter_id is not None:
+                await self._uninstall(node_filter)
@@ -0,0 +1,107 @@
+"""Conversions between python values and the hex strings used by jsonrpc.
+
+Most values passed to the client are already normalized "0x" prefixed
+strings, and the same few addresses are passed over and over. validate_hex
+remembers the normalized strings it has seen, so those are returned after
+a single set lookup, and checks new ones with an anchored match before
+falling back to the original regex for anything else. The results are the
+same as before for every input.
+
+Quantities returned by the node are decoded with a plain int(value, 16),
+which accepts the "0x" prefix itself"""
+
+import binascii
+import re
+import sys
+
+# the stdlib re matches this pattern exactly as the regex package does, and
+# is already imported by almost everything, where regex costs ~10ms to import
+HEX_RE = re.compile("(0x)?([0-9a-fA-F]+)")
+NORMALIZED_HEX_RE = re.compile("0x[0-9a-fA-F]+")
+
+# the most strings validate_hex and intern_address remember before starting over
+VALIDATED_CACHE_SIZE = 10000
+ADDRESS_CACHE_SIZE = 100000
+
+def _validate_hex_slow(value, length):
+    if isinstance(value, int):
+        value = hex(value)[2:]
+    if isinstance(value, bytes):
+        value = binascii.b2a_hex(value).decode('ascii')
+    else:
+        m = HEX_RE.match(value)
+        if m:
+            value = m.group(2)
+        else:
+            raise ValueError("Unable to convert value to valid hex string")
+    if length:
+        if len(value) > length * 2:
+            raise ValueError("Value is too long")
+        return '0x' + value.rjust(length * 2, '0')
+    return '0x' + value
+
+_validated = set()
+
+def validate_hex(value, length=None):
+    """returns value as a "0x" prefixed hex string, left padded with zeros
+    to `length` bytes if given. Accepts ints, bytes and hex strings with or
+    without the prefix"""
+
+    cls = type(value)
+    if cls is str:
+        # already normalized, and returned as is when no padding is needed
+        if value in _validated or NORMALIZED_HEX_RE.fullmatch(value) and _remember(value):
+            if not length or len(value) == length * 2 + 2:
+                return value
+            if len(value) > length * 2 + 2:
+                raise ValueError("Value is too long")
+            return '0x' + value[2:].rjust(length * 2, '0')
+    elif cls is int:
+        if value >= 0 and not length:
+            return hex(value)
+    elif cls is bytes:
+        if not length:
+            return '0x' + value.hex()
+    return _validate_hex_slow(value, length)
+
+def _remember(value):
+    if len(_validated) >= VALIDATED_CACHE_SIZE:
+        _validated.clear()
+    _validated.add(value)
+    return True
+
+def validate_hex_list(values, length=None):
+    """validate_hex for every value"""
+    return [validate_hex(value, length) for value in values]
+
+def decode_int(value):
+    """decodes a "0x" prefixed quantity"""
+    return int(value, 16)
+
+def decode_ints(values):
+    """decodes a list of "0x" prefixed quantities"""
+    return [int(value, 16) for value in values]
+
+def encode_int(value):
+    return hex(value)
+
+def encode_ints(values):
+    return [hex(value) for value in values]
+
+_addresses = {}
+
+def intern_address(value):
+    """returns the address lower cased and interned. The results for
+    recently seen strings are cached, so the many copies of popular
+    addresses in results share a single string without being lower cased
+    again"""
+
+    try:
+        return _addresses[value]
+    except KeyError:
+        pass
+    address = sys.intern(value.lower())
+    if len(_addresses) >= ADDRESS_CACHE_SIZE:
+        _addresses.clear()
+    _addresses[value] = address
+    return address
@@ -1,10 +1,43 @@
+from .client import JsonRPCError
 from .utils import prepare_ethereum_jsonrpc_client
 
+def get_application_client(application):
+    """returns the JsonRPCClient shared by every handler of the application,
+    creating it from the application's ethereum config the first time. A new
+    client is created if the config is replaced"""
+
+    config = application.config['ethereum']
+    cached = getattr(application, '_eth_jsonrpc_client', None)
+    if cached is None or cached[0] is not config:
+        cached = application._eth_jsonrpc_client = (config, prepare_ethereum_jsonrpc_client(config))
+    return cached[1]
+
+async def start_ethereum_client(application):
+    """Warms up the application's client: makes sure the node is reachable
+    and fetches its version and current block number in a single request,
+    storing them as `eth_client_version` and `eth_block_number` on the
+    application. Call from the application's startup before serving requests"""
+
+    client = get_application_client(application)
+    version, block_number = await client._fetch_batch([("web3_clientVersion", []), ("eth_blockNumber", [])])
+    for result in (version, block_number):
+        if isinstance(result, JsonRPCError):
+            raise result
+    application.eth_client_version = version
+    application.eth_block_number = int(block_number, 16)
+    return client
+
+async def stop_ethereum_client(application, timeout=10):
+    """Waits up to `timeout` seconds for the application client's in flight
+    requests to finish. Returns False if some were still running"""
+
+    cached = getattr(application, '_eth_jsonrpc_client', None)
+    if cached is None:
+        return True
+    return await cached[1].close(timeout)
+
 class EthereumMixin:
 
     @property
     def eth(self):
-        if not hasattr(self, '_eth_jsonrpc_client'):
-            self._eth_jsonrpc_client = prepare_ethereum_jsonrpc_client(
-                self.application.config['ethereum'])
-        return self._eth_jsonrpc_client
+        return get_application_client(self.application)
@@ -0,0 +1,163 @@
+from collections import namedtuple
+from ethereum.utils import sha3
+
+from asyncbb.ethereum.abicodec import get_encoder, get_decoder
+from asyncbb.ethereum.client import JsonRPCError, validate_block_param
+from asyncbb.ethereum.contract import Contract
+
+# Aggregates many calls into one. Solidity 0.4 can't take arrays of
+# structs or bytes through the abi, so calls are packed into a single
+# bytes argument as (address target, uint32 length, bytes data) and the
+# results are packed as (uint8 success, uint32 length, bytes returndata).
+MULTICALL_SOURCECODE = b"""
+pragma solidity ^0.4.21;
+
+contract Multicall {
+    function aggregate(bytes calls) public view returns (uint256 blockNumber, bytes results) {
+        blockNumber = block.number;
+        assembly {
+            let ptr := add(calls, 32)
+            let end := add(ptr, mload(calls))
+            results := mload(0x40)
+            let out := add(results, 32)
+            for { } lt(ptr, end) { } {
+                let target := div(mload(ptr), 0x1000000000000000000000000)
+                let len := div(mload(add(ptr, 20)), 0x100000000000000000000000000000000000000000000000000000000)
+                let input := add(ptr, 24)
+                let success := call(gas, target, 0, input, len, 0, 0)
+                let size := returndatasize
+                mstore8(out, success)
+                mstore(add(out, 1), mul(size, 0x100000000000000000000000000000000000000000000000000000000))
+                returndatacopy(add(out, 5), 0, size)
+                out := add(out, add(5, size))
+                ptr := add(input, len)
+            }
+            mstore(results, sub(out, add(results, 32)))
+            mstore(0x40, and(add(out, 31), not(31)))
+        }
+    }
+}
+"""
+
+AGGREGATE_SELECTOR = sha3("aggregate(bytes)")[:4]
+
+MulticallResult = namedtuple('MulticallResult', ['success', 'value'])
+MulticallResult.__doc__ = """The outcome of a single call in a Multicall. `value` is the
+decoded result (unwrapped if there's only one return value), or None if
+the call failed"""
+
+def _decode_result(method, data):
+    try:
+        decoded = method.decode(data)
+    except Exception:
+        # e.g. calling an address with no code returns success with no data
+        return MulticallResult(False, None)
+    if len(decoded) == 1:
+        return MulticallResult(True, decoded[0])
+    return MulticallResult(True, decoded)
+
+class Multicall:
+    """Gathers constant contract calls, possibly across many contracts, and
+    executes them together against a single block.
+
+    With the address of a deployed Multicall contract everything runs as a
+    single eth_call. Without one, or if there is no code at the address,
+    the calls are sent as jsonrpc batches of eth_call pinned to the same
+    block number.
+
+    e.g.
+
+        multicall = Multicall(client, address=MULTICALL_ADDRESS)
+        for token in tokens:
+            multicall.add(token.balanceOf, owner)
+        results = await multicall.execute()
+    """
+
+    def __init__(self, client, *, address=None, block="latest", batch_size=100):
+        self.client = client
+        self.address = address
+        self.block = block
+        self.batch_size = batch_size
+        self.block_number = None
+        self._calls = []
+
+    @classmethod
+    async def deploy(cls, client, deployer_private_key, **kwargs):
+        """deploys the Multicall contract, returning its address"""
+
+        # the contract has no constructor, so no constructor_data
+        contract = await Contract.from_source_code(MULTICALL_SOURCECODE, 'Multicall',
+                                                   deployer_private_key=deployer_private_key,
+                                                   client=client, **kwargs)
+        return contract.address
+
+    def add(self, method, *args):
+        """adds a call to the given ContractMethod, returning the index of its
+        result in the list returned by execute"""
+
+        self._calls.append((method, method.encode(*args)))
+        return len(self._calls) - 1
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def execute(self):
+        """runs all the calls added so far, returning a MulticallResult for each.
+        `block_number` is set to the block the calls were executed against"""
+
+        if self.block == "latest":
+            self.block_number = await self.client.eth_blockNumber()
+        elif isinstance(self.block, int):
+            self.block_number = self.block
+        else:
+            # earliest or pending can't be pinned
+            self.block_number = None
+        block = self.block if self.block_number is None else self.block_number
+
+        if not self._calls:
+            return []
+        if self.address is None:
+            return await self._execute_batched(block)
+        return await self._execute_aggregated(block)
+
+    async def _execute_aggregated(self, block):
+
+        packed = b''.join(bytes.fromhex(method.contract.address[2:]) + len(data).to_bytes(4, 'big') + data
+                          for method, data in self._calls)
+        calldata = AGGREGATE_SELECTOR + get_encoder(['bytes'])([packed])
+        result = await self.client.eth_call(to_address=self.address, data=calldata, block=block)
+        if result == "0x":
+            # nothing deployed at the address (at least not at this block)
+            return await self._execute_batched(block)
+        block_number, results = get_decoder(['uint256', 'bytes'])(bytes.fromhex(result[2:]))
+        if self.block_number is None:
+            self.block_number = block_number
+
+        rval = []
+        pos = 0
+        for method, _ in self._calls:
+            success = results[pos]
+            length = int.from_bytes(results[pos + 1:pos + 5], 'big')
+            data = results[pos + 5:pos + 5 + length]
+            pos += 5 + length
+            if success:
+                rval.append(_decode_result(method, data))
+            else:
+                rval.append(MulticallResult(False, None))
+        return rval
+
+    async def _execute_batched(self, block):
+
+        block = validate_block_param(block)
+        rval = []
+        for i in range(0, len(self._calls), self.batch_size):
+            chunk = self._calls[i:i + self.batch_size]
+            results = await self.client._fetch_batch([
+                ("eth_call", [{"to": method.contract.address, "data": '0x' + data.hex()}, block])
+                for method, data in chunk])
+            for (method, _), result in zip(chunk, results):
+                if isinstance(result, JsonRPCError):
+                    rval.append(MulticallResult(False, None))
+                else:
+                    rval.append(_decode_result(method, bytes.fromhex(result[2:])))
+        return rval
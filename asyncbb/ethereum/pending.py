@@ -0,0 +1,241 @@
+import asyncio
+
+from collections import OrderedDict
+
+from asyncbb.ethereum.client import JsonRPCError
+from asyncbb.ethereum.filters import FILTER_NOT_FOUND_ERRORS
+from asyncbb.ethereum.results import Transaction
+
+# what a subscription does with a new transaction when its queue is full
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+BLOCK = 'block'
+
+# queued to wake subscribers waiting on an empty queue when the stream ends
+_END = object()
+
+class RecentlySeen:
+    """A set remembering only the most recently added `maxsize` keys"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._keys = OrderedDict()
+
+    def add(self, key):
+        """adds the key, returning False if it was already present"""
+
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+        return True
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+class PendingSubscription:
+    """Receives the pending transactions from a PendingTxStream, with
+    `await subscription.get()` or `async for tx in subscription`.
+    `dropped` counts transactions lost to the overflow policy.
+
+    If the stream ends, `ended` is set and once the transactions already
+    queued have been taken get raises StopAsyncIteration"""
+
+    def __init__(self, stream, maxsize, overflow):
+        if overflow not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError("unknown overflow policy: {}".format(overflow))
+        self.stream = stream
+        self.overflow = overflow
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.ended = False
+
+    async def _put(self, tx):
+        if self.overflow == BLOCK:
+            await self.queue.put(tx)
+            return
+        if self.queue.full():
+            self.dropped += 1
+            if self.overflow == DROP_NEWEST:
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait(tx)
+
+    def _end(self):
+        self.ended = True
+        if self.queue.empty():
+            self.queue.put_nowait(_END)
+
+    async def get(self):
+        if self.ended and self.queue.empty():
+            raise StopAsyncIteration
+        tx = await self.queue.get()
+        if tx is _END:
+            # leave it for anyone else waiting
+            self.queue.put_nowait(_END)
+            raise StopAsyncIteration
+        return tx
+
+    def __aiter__(self):
+        return self
+
+    __anext__ = get
+
+    def close(self):
+        self.stream._remove(self)
+
+class PendingTxStream:
+    """Streams the bodies of new pending transactions to subscribers.
+
+    Pending transaction hashes are polled from a single node filter with an
+    adaptive interval (see JsonRPCClient.watch). Hashes seen recently are
+    skipped, and the rest are looked up in jsonrpc batches of batch_size
+    with at most `concurrency` batches in flight, which also limits how far
+    polling can run ahead of the lookups. Transactions that were mined (or
+    dropped) by the time they're looked up are skipped.
+
+    Each subscriber has its own bounded queue. When it's full, the
+    subscription's overflow policy decides whether to drop the oldest
+    queued transaction, drop the new one, or block the stream until the
+    subscriber catches up.
+
+    Errors polling the node are counted in `errors` and the filter is
+    recreated after poll_interval. If the filter watch ends, the stream
+    finishes the lookups already started and then ends every subscription,
+    as it does if it fails or is stopped.
+
+    e.g.
+
+        stream = PendingTxStream(client)
+        async for tx in stream.subscribe(maxsize=10000):
+            ...
+    """
+
+    def __init__(self, client, *, poll_interval=0.5, max_interval=5.0, seen_size=100000,
+                 batch_size=100, concurrency=4, typed=False):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.typed = typed
+        self._seen = RecentlySeen(seen_size)
+        self._subscriptions = []
+        self._task = None
+        # metrics
+        self.duplicates = 0
+        self.fetched = 0
+        self.mined = 0
+        self.missing = 0
+        self.errors = 0
+        self.last_error = None
+
+    def subscribe(self, *, maxsize=1000, overflow=DROP_OLDEST):
+        subscription = PendingSubscription(self, maxsize, overflow)
+        self._subscriptions.append(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return subscription
+
+    def _remove(self, subscription):
+        try:
+            self._subscriptions.remove(subscription)
+        except ValueError:
+            pass
+
+    async def _fetch(self, hashes):
+        results = await self.client._fetch_batch([("eth_getTransactionByHash", [tx_hash]) for tx_hash in hashes])
+        self.fetched += len(hashes)
+        for tx in results:
+            if isinstance(tx, JsonRPCError) or tx is None:
+                self.missing += 1
+                continue
+            if tx.get('blockNumber') is not None:
+                self.mined += 1
+                continue
+            if self.typed:
+                tx = Transaction(tx)
+            for subscription in list(self._subscriptions):
+                await subscription._put(tx)
+
+    async def _run(self):
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        fetches = set()
+
+        async def fetch(hashes):
+            try:
+                await self._fetch(hashes)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = e
+            finally:
+                semaphore.release()
+
+        filter_id = None
+        try:
+            while self._subscriptions:
+                try:
+                    if filter_id is None:
+                        filter_id = await self.client.eth_newPendingTransactionFilter()
+                        watch = self.client.watch(filter_id, min_interval=self.poll_interval,
+                                                  block_time=self.max_interval)
+                    hashes = await watch.__anext__()
+                except StopAsyncIteration:
+                    if fetches:
+                        await asyncio.wait(fetches)
+                    return
+                except Exception as e:
+                    if not (isinstance(e, JsonRPCError) and
+                            any(msg in str(e).lower() for msg in FILTER_NOT_FOUND_ERRORS)):
+                        # transient node errors shouldn't kill every subscription
+                        self.errors += 1
+                        self.last_error = e
+                        await asyncio.sleep(self.poll_interval)
+                        if filter_id is not None:
+                            await self._uninstall(filter_id)
+                    # start over with a new filter and watch
+                    filter_id = None
+                    continue
+
+                new = [tx_hash for tx_hash in hashes if self._seen.add(tx_hash)]
+                self.duplicates += len(hashes) - len(new)
+                for i in range(0, len(new), self.batch_size):
+                    await semaphore.acquire()
+                    task = asyncio.ensure_future(fetch(new[i:i + self.batch_size]))
+                    fetches.add(task)
+                    task.add_done_callback(fetches.discard)
+        finally:
+            for task in list(fetches):
+                task.cancel()
+            # however the stream ended, nobody should be left waiting on it
+            for subscription in self._subscriptions:
+                subscription._end()
+            self._subscriptions.clear()
+            if filter_id is not None:
+                await self._uninstall(filter_id)
+
+    async def _uninstall(self, filter_id):
+        try:
+            await self.client.eth_uninstallFilter(filter_id)
+        except Exception:
+            pass
+
+    async def stop(self):
+        """stops polling, ends every subscription and uninstalls the node filter"""
+
+        for subscription in self._subscriptions:
+            subscription._end()
+        self._subscriptions.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,336 @@
+import asyncio
+import heapq
+import json
+import os
+
+from collections import namedtuple
+
+from asyncbb.ethereum.client import JsonRPCError
+
+DEFAULT_STARTGAS = 21000
+DEFAULT_GASPRICE = 20000000000
+
+# error messages returned by nodes when a raw transaction has already been
+# seen, which is expected when resubmitting transactions from a journal
+KNOWN_TRANSACTION_ERRORS = ("known transaction", "already known", "already imported")
+# a resubmitted transaction that was mined before the crash gets rejected
+# with one of these, its receipt will be found when polling
+MINED_TRANSACTION_ERRORS = ("nonce too low", "transaction nonce is too low")
+
+TransactionResult = namedtuple('TransactionResult', ['index', 'nonce', 'tx_hash', 'receipt', 'error'])
+TransactionResult.__doc__ = """The outcome of a single intent given to TransactionPipeline.run.
+`index` is the position of the intent in the input iterable. Exactly one of
+`receipt` and `error` is set"""
+
+class NonceGapError(Exception):
+    """The node accepted the transaction but it is stuck behind a lower
+    nonce that was rejected, and the transaction sent to fill that nonce
+    was rejected too.
+
+    The transaction is still queued on the node and will be mined as soon
+    as anything uses the missing nonce, so it must not be sent again"""
+
+class PipelineJournal:
+    """Append only record of the progress of a TransactionPipeline run.
+
+    Every transaction is written (with its signed raw form) before it is
+    submitted, and again once it has been mined. Reopening a journal lets
+    a crashed run resume by resubmitting the exact same signed transactions
+    rather than signing new ones, so nothing can be sent twice.
+
+    When a rejected transaction's nonce is given to a later one, the later
+    record replaces the rejected one, which is signed again on resume"""
+
+    def __init__(self, path):
+        self.path = path
+        self.signed = {}
+        self.done = {}
+        self._by_nonce = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a partially written last line from a crash
+                        continue
+                    if entry.get('done'):
+                        self.done[entry['index']] = entry['hash']
+                    else:
+                        self._add_signed(entry['index'], entry['nonce'], entry['hash'], entry['raw'])
+        self._file = open(path, 'a')
+
+    def _add_signed(self, index, nonce, tx_hash, raw):
+        replaced = self._by_nonce.get(nonce)
+        if replaced is not None and replaced != index:
+            self.signed.pop(replaced, None)
+        self._by_nonce[nonce] = index
+        self.signed[index] = (nonce, tx_hash, raw)
+
+    @property
+    def next_nonce(self):
+        if not self.signed:
+            return None
+        return max(nonce for nonce, _, _ in self.signed.values()) + 1
+
+    def record_signed(self, entries):
+        """records a list of (index, nonce, tx_hash, raw_tx) tuples and makes
+        sure they hit the disk before returning"""
+        for index, nonce, tx_hash, raw in entries:
+            self._add_signed(index, nonce, tx_hash, raw)
+            self._file.write(json.dumps({'index': index, 'nonce': nonce, 'hash': tx_hash, 'raw': raw}))
+            self._file.write('\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record_done(self, index, tx_hash):
+        self.done[index] = tx_hash
+        self._file.write(json.dumps({'index': index, 'hash': tx_hash, 'done': True}))
+        self._file.write('\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class TransactionPipeline:
+    """Sends large numbers of simple transactions from a single account.
+
+    Nonces are assigned locally so transactions can be signed in bulk
+    (optionally in a SigningService process pool), submitted in jsonrpc
+    batches and confirmed by polling receipts in batches, with at most
+    `max_in_flight` unconfirmed transactions at any one time.
+
+    If the node rejects a transaction, its nonce is given to the next
+    intent so the transactions after it can still be mined. If the intents
+    run out first, the gap is filled with a zero value transfer to the
+    sending account. Transactions behind a gap that couldn't be filled
+    are reported with a NonceGapError.
+
+    e.g.
+
+        pipeline = TransactionPipeline(client, key, journal='payouts.journal')
+        async for result in pipeline.run((to, value, b'') for to, value in payouts):
+            ...
+    """
+
+    def __init__(self, client, private_key, *, signer=None, gasprice=DEFAULT_GASPRICE,
+                 startgas=DEFAULT_STARTGAS, batch_size=100, max_in_flight=1000,
+                 poll_interval=1.0, journal=None, network_id=None):
+
+        # imported here so the pipeline module doesn't pull in pyethereum
+        from ethutils import data_decoder, private_key_to_address
+        if isinstance(private_key, str):
+            private_key = data_decoder(private_key)
+        self.client = client
+        self.private_key = private_key
+        self.from_address = private_key_to_address(private_key)
+        self.signer = signer
+        self.gasprice = gasprice
+        self.startgas = startgas
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.network_id = network_id
+        if isinstance(journal, str):
+            journal = PipelineJournal(journal)
+        self.journal = journal
+
+    async def _sign(self, transactions):
+        if self.signer is not None:
+            return await self.signer.sign_batch(self.private_key, transactions, network_id=self.network_id)
+        from asyncbb.ethereum.signing import sign_transactions
+        return sign_transactions(self.private_key, transactions, network_id=self.network_id)
+
+    async def run(self, intents):
+        """Takes an iterable of (to, value, data) intents, where data may be
+        omitted, and yields a TransactionResult for each as it completes.
+
+        Results are yielded in the order transactions are mined, not the
+        input order. When resuming from a journal, intents that were already
+        confirmed are skipped and not yielded again"""
+
+        results = asyncio.Queue()
+        window = asyncio.Semaphore(self.max_in_flight)
+        in_flight = {}
+        submitting = asyncio.ensure_future(self._submit(intents, results, window, in_flight))
+        polling = asyncio.ensure_future(self._poll(submitting, results, window, in_flight))
+
+        try:
+            while True:
+                get = asyncio.ensure_future(results.get())
+                await asyncio.wait([get, polling], return_when=asyncio.FIRST_COMPLETED)
+                if get.done():
+                    yield get.result()
+                    continue
+                get.cancel()
+                # polling only finishes once submission is done and
+                # nothing is left in flight, so drain what is left
+                while not results.empty():
+                    yield results.get_nowait()
+                # raise any errors from the background tasks
+                submitting.result()
+                polling.result()
+                break
+        finally:
+            submitting.cancel()
+            polling.cancel()
+            if self.journal is not None:
+                self.journal.close()
+
+    async def _submit(self, intents, results, window, in_flight):
+
+        journal = self.journal
+        node_nonce = await self.client.eth_getTransactionCount(self.from_address, "pending")
+        journal_nonce = journal.next_nonce if journal else None
+        nonce = node_nonce if journal_nonce is None else max(node_nonce, journal_nonce)
+
+        # list of (index, nonce, tx_hash, raw, resubmit) that are signed but not submitted
+        pending = []
+        # list of (index, (nonce, gasprice, startgas, to, value, data)) to sign
+        unsigned = []
+        # heap of the nonces of transactions the node rejected. nothing
+        # after them can be mined until they're used again
+        gaps = []
+
+        async def flush_unsigned():
+            if unsigned:
+                signed = await self._sign([tx for _, tx in unsigned])
+                entries = [(index, tx[0], tx_hash, raw)
+                           for (index, tx), (tx_hash, raw, _) in zip(unsigned, signed)]
+                if journal is not None:
+                    journal.record_signed(entries)
+                pending.extend(entry + (False,) for entry in entries)
+                unsigned.clear()
+
+        async def acquire():
+            # nothing is confirmed before it's sent, so send a partial batch
+            # rather than wait on the window while holding it
+            if window.locked():
+                await flush_unsigned()
+                await self._send(pending, results, window, in_flight, gaps)
+            await window.acquire()
+
+        for index, intent in enumerate(intents):
+            if journal is not None:
+                if index in journal.done:
+                    continue
+                if index in journal.signed:
+                    # resubmit exactly what was signed before
+                    tx_nonce, tx_hash, raw = journal.signed[index]
+                    await acquire()
+                    pending.append((index, tx_nonce, tx_hash, raw, True))
+                    if len(pending) >= self.batch_size:
+                        await self._send(pending, results, window, in_flight, gaps)
+                    continue
+
+            to, value, *data = intent
+            data = data[0] if data else b''
+            await acquire()
+            if gaps:
+                tx_nonce = heapq.heappop(gaps)
+            else:
+                tx_nonce = nonce
+                nonce += 1
+            unsigned.append((index, (tx_nonce, self.gasprice, self.startgas, to, value, data)))
+
+            if len(unsigned) + len(pending) >= self.batch_size:
+                await flush_unsigned()
+                await self._send(pending, results, window, in_flight, gaps)
+
+        await flush_unsigned()
+        await self._send(pending, results, window, in_flight, gaps)
+
+        if gaps:
+            await self._fill_gaps(gaps, results, window, in_flight)
+
+    async def _fill_gaps(self, gaps, results, window, in_flight):
+        """sends a zero value transfer to ourselves with each rejected nonce
+        that transactions in flight are waiting on, so they can be mined"""
+
+        highest = max((tx_nonce for _, tx_nonce in in_flight.values()), default=-1)
+        nonces = sorted(nonce for nonce in gaps if nonce < highest)
+        if not nonces:
+            return
+        signed = await self._sign([(nonce, self.gasprice, self.startgas, self.from_address, 0, b'')
+                                   for nonce in nonces])
+        responses = await self.client._fetch_batch(
+            [("eth_sendRawTransaction", [raw]) for _, raw, _ in signed])
+        unfilled = [nonce for nonce, response in zip(nonces, responses)
+                    if isinstance(response, JsonRPCError)
+                    and not any(msg in str(response).lower() for msg in KNOWN_TRANSACTION_ERRORS)]
+        if not unfilled:
+            # the filled transactions are confirmed by polling as usual
+            return
+
+        # everything after the gap stays queued on the node, so it's
+        # reported as stuck rather than left for polling forever
+        lowest = unfilled[0]
+        stuck = [(tx_hash, index, tx_nonce) for tx_hash, (index, tx_nonce) in in_flight.items()
+                 if tx_nonce > lowest]
+        for tx_hash, index, tx_nonce in stuck:
+            del in_flight[tx_hash]
+            window.release()
+        for tx_hash, index, tx_nonce in stuck:
+            await results.put(TransactionResult(index, tx_nonce, tx_hash, None, NonceGapError(
+                "nonce {} is still queued behind the rejected nonce {}".format(tx_nonce, lowest))))
+
+    async def _send(self, pending, results, window, in_flight, gaps):
+
+        if not pending:
+            return
+
+        # the node must see lower nonces first
+        pending.sort(key=lambda entry: entry[1])
+        responses = await self.client._fetch_batch(
+            [("eth_sendRawTransaction", [raw]) for _, _, _, raw, _ in pending])
+
+        for (index, nonce, tx_hash, _, resubmit), response in zip(pending, responses):
+            if isinstance(response, JsonRPCError):
+                message = str(response).lower()
+                ignored = KNOWN_TRANSACTION_ERRORS + MINED_TRANSACTION_ERRORS if resubmit else KNOWN_TRANSACTION_ERRORS
+                failed = not any(msg in message for msg in ignored)
+            else:
+                failed = False
+            if failed:
+                # leave it as signed in the journal so a resumed run
+                # retries the same transaction, unless its nonce is reused
+                if not any(msg in message for msg in MINED_TRANSACTION_ERRORS):
+                    heapq.heappush(gaps, nonce)
+                window.release()
+                await results.put(TransactionResult(index, nonce, tx_hash, None, response))
+            else:
+                in_flight[tx_hash] = (index, nonce)
+        pending.clear()
+
+    async def _poll(self, submitting, results, window, in_flight):
+
+        while True:
+            if not in_flight:
+                if submitting.done():
+                    return
+                await asyncio.wait([submitting], timeout=self.poll_interval)
+                continue
+
+            hashes = list(in_flight.keys())
+            for i in range(0, len(hashes), self.batch_size):
+                chunk = hashes[i:i + self.batch_size]
+                receipts = await self.client._fetch_batch(
+                    [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in chunk])
+                for tx_hash, receipt in zip(chunk, receipts):
+                    if receipt is None or isinstance(receipt, JsonRPCError) or receipt.get('blockNumber') is None:
+                        continue
+                    if tx_hash not in in_flight:
+                        # given up on behind a nonce gap while polling
+                        continue
+                    index, nonce = in_flight.pop(tx_hash)
+                    if self.journal is not None:
+                        self.journal.record_done(index, tx_hash)
+                    window.release()
+                    await results.put(TransactionResult(index, nonce, tx_hash, receipt, None))
+
+            if submitting.done() and submitting.exception() is not None:
+                return
+            await asyncio.sleep(self.poll_interval)
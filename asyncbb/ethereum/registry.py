@@ -0,0 +1,102 @@
+import hashlib
+import json
+import weakref
+
+from collections import namedtuple
+from types import MappingProxyType
+from ethereum.abi import ContractTranslator
+
+from asyncbb.ethereum.abicodec import get_encoder, get_decoder
+from asyncbb.ethereum.events import get_event_table
+
+class FunctionSpec(namedtuple('FunctionSpec', ['name', 'selector', 'encode_types', 'decode_types', 'is_constant',
+                                               'encoder', 'decoder'])):
+    """Immutable description of a contract function, precomputed from the abi.
+    `encoder` and `decoder` are the abicodec functions for the argument and result types"""
+
+    __slots__ = ()
+
+# method tables are built once per translator
+_method_tables = weakref.WeakKeyDictionary()
+
+def get_method_table(translator):
+    """returns a read only mapping of function name to FunctionSpec for
+    all the functions known by the given translator"""
+
+    table = _method_tables.get(translator)
+    if table is None:
+        specs = {}
+        for name, data in translator.function_data.items():
+            selector = data['prefix']
+            if isinstance(selector, int):
+                selector = selector.to_bytes(4, 'big')
+            encode_types = tuple(data['encode_types'])
+            decode_types = tuple(data['decode_types'])
+            specs[name] = FunctionSpec(name, selector, encode_types, decode_types, data['is_constant'],
+                                       get_encoder(encode_types), get_decoder(decode_types))
+        table = _method_tables[translator] = MappingProxyType(specs)
+    return table
+
+class ABIEntry:
+    """Everything derived from a single abi, shared by all the contracts using it"""
+
+    __slots__ = ('key', 'abi', 'translator', 'methods', 'event_table')
+
+    def __init__(self, key, abi):
+        self.key = key
+        self.abi = abi
+        self.translator = ContractTranslator(abi)
+        self.methods = get_method_table(self.translator)
+        self.event_table = get_event_table(self.translator)
+
+def abi_key(abi):
+    """returns a hash of the canonical json form of the abi, so the
+    same abi gets the same key regardless of key order or whitespace"""
+
+    if isinstance(abi, (str, bytes)):
+        abi = json.loads(abi)
+    canonical = json.dumps(abi, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ABIRegistry:
+    """Parses each distinct abi once.
+
+    Entries are keyed by abi_key, with an extra lookup by object identity
+    so that contracts created repeatedly from the abi object that first
+    registered it (the common case) don't have to pay for hashing it"""
+
+    def __init__(self):
+        self._entries = {}
+        # id(abi) -> (abi, entry). only the abi object each entry was created
+        # from is stored, so this can't grow beyond the number of entries
+        self._by_id = {}
+
+    def get(self, abi):
+
+        cached = self._by_id.get(id(abi))
+        if cached is not None and cached[0] is abi:
+            return cached[1]
+
+        key = abi_key(abi)
+        entry = self._entries.get(key)
+        if entry is None:
+            if isinstance(abi, (str, bytes)):
+                parsed = json.loads(abi)
+            else:
+                parsed = abi
+            entry = self._entries[key] = ABIEntry(key, parsed)
+            self._by_id[id(abi)] = (abi, entry)
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_id.clear()
+
+registry = ABIRegistry()
+
+def get_abi_entry(abi):
+    """returns the shared ABIEntry for the given abi from the process wide registry"""
+    return registry.get(abi)
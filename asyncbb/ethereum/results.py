@@ -0,0 +1,148 @@
+"""Typed wrappers for jsonrpc results.
+
+Each wrapper keeps the raw json payload and only decodes a field the first
+time it's accessed, storing the decoded value in a slot so later accesses
+are plain attribute lookups. Addresses are lower cased and interned, so the
+many copies of the same few addresses share a single string.
+
+The raw payload is still available through `raw` and item access, so
+`receipt['gasUsed']` keeps working where a dict was expected before"""
+
+from asyncbb.ethereum.hexcodec import decode_int as _to_int, intern_address as _to_address
+
+def _identity(value):
+    return value
+
+class _LazyField:
+    """a field decoded from the raw payload on first access"""
+
+    __slots__ = ('key', 'convert')
+
+    def __init__(self, key, convert=_identity):
+        self.key = key
+        self.convert = convert
+
+class _ResultType(type):
+    """Replaces each _LazyField with a slot of the same name. Reading an
+    unset slot falls through to Result.__getattr__, which decodes the value
+    and fills in the slot, so later reads never reach python code"""
+
+    def __new__(mcs, name, bases, namespace):
+        fields = {}
+        for base in bases:
+            fields.update(getattr(base, '_fields', {}))
+        own = [key for key, value in namespace.items() if isinstance(value, _LazyField)]
+        for key in own:
+            fields[key] = namespace.pop(key)
+        namespace['_fields'] = fields
+        namespace['__slots__'] = tuple(namespace.get('__slots__', ())) + tuple(own)
+        return super().__new__(mcs, name, bases, namespace)
+
+class Result(metaclass=_ResultType):
+
+    __slots__ = ('_raw',)
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        try:
+            field = self._fields[name]
+        except KeyError:
+            raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, name))
+        value = self._raw.get(field.key)
+        if value is not None:
+            value = field.convert(value)
+        object.__setattr__(self, name, value)
+        return value
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def __getitem__(self, key):
+        return self._raw[key]
+
+    def get(self, key, default=None):
+        return self._raw.get(key, default)
+
+    def __eq__(self, other):
+        if isinstance(other, Result):
+            return type(self) is type(other) and self._raw == other._raw
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.hash)
+
+    def __repr__(self):
+        return '<{} {}>'.format(self.__class__.__name__, self.hash)
+
+class Log(Result):
+
+    address = _LazyField('address', _to_address)
+    topics = _LazyField('topics', tuple)
+    data = _LazyField('data')
+    block_number = _LazyField('blockNumber', _to_int)
+    block_hash = _LazyField('blockHash')
+    transaction_hash = _LazyField('transactionHash')
+    transaction_index = _LazyField('transactionIndex', _to_int)
+    log_index = _LazyField('logIndex', _to_int)
+    removed = _LazyField('removed', bool)
+
+    def __hash__(self):
+        return hash((self.transaction_hash, self.log_index))
+
+    def __repr__(self):
+        return '<Log {}:{}>'.format(self.transaction_hash, self.log_index)
+
+class Transaction(Result):
+
+    hash = _LazyField('hash')
+    nonce = _LazyField('nonce', _to_int)
+    block_hash = _LazyField('blockHash')
+    block_number = _LazyField('blockNumber', _to_int)
+    transaction_index = _LazyField('transactionIndex', _to_int)
+    from_address = _LazyField('from', _to_address)
+    to_address = _LazyField('to', _to_address)
+    value = _LazyField('value', _to_int)
+    gas = _LazyField('gas', _to_int)
+    gas_price = _LazyField('gasPrice', _to_int)
+    input = _LazyField('input')
+
+def _to_logs(logs):
+    return tuple(Log(log) for log in logs)
+
+class Receipt(Result):
+
+    transaction_hash = _LazyField('transactionHash')
+    transaction_index = _LazyField('transactionIndex', _to_int)
+    block_hash = _LazyField('blockHash')
+    block_number = _LazyField('blockNumber', _to_int)
+    from_address = _LazyField('from', _to_address)
+    to_address = _LazyField('to', _to_address)
+    cumulative_gas_used = _LazyField('cumulativeGasUsed', _to_int)
+    gas_used = _LazyField('gasUsed', _to_int)
+    contract_address = _LazyField('contractAddress', _to_address)
+    logs = _LazyField('logs', _to_logs)
+    status = _LazyField('status', _to_int)
+
+    @property
+    def hash(self):
+        return self.transaction_hash
+
+def _to_transactions(transactions):
+    # hashes only unless the block was fetched with transactions
+    return tuple(Transaction(tx) if isinstance(tx, dict) else tx for tx in transactions)
+
+class Block(Result):
+
+    number = _LazyField('number', _to_int)
+    hash = _LazyField('hash')
+    parent_hash = _LazyField('parentHash')
+    timestamp = _LazyField('timestamp', _to_int)
+    miner = _LazyField('miner', _to_address)
+    difficulty = _LazyField('difficulty', _to_int)
+    gas_limit = _LazyField('gasLimit', _to_int)
+    gas_used = _LazyField('gasUsed', _to_int)
+    size = _LazyField('size', _to_int)
+    transactions = _LazyField('transactions', _to_transactions)
@@ -0,0 +1,129 @@
+"""Retries for jsonrpc calls that failed for reasons that may go away.
+
+Errors are classified as:
+
+  TRANSPORT      the request may never have reached the node: dropped
+                 connections, timeouts, 502/503/504 from a proxy or a node
+                 busy importing a block
+  RATE_LIMITED   the node or provider asked us to slow down
+  NOT_SYNCED     the node doesn't have the block yet, e.g. a load balanced
+                 node behind the others
+  DETERMINISTIC  everything else: the same request would fail the same way
+
+Only the first three are retried, and only for methods where sending the
+request twice is harmless. Delays grow exponentially with full jitter, and
+retries spend from a budget that is refilled by successful requests, so
+when a node is down the retries stop instead of multiplying the load"""
+
+import asyncio
+import random
+
+import tornado.httpclient
+
+from asyncbb.jsonrpc import JsonRPCError
+
+TRANSPORT = 'transport'
+RATE_LIMITED = 'rate_limited'
+NOT_SYNCED = 'not_synced'
+DETERMINISTIC = 'deterministic'
+
+RETRYABLE = (TRANSPORT, RATE_LIMITED, NOT_SYNCED)
+
+TRANSPORT_STATUS_CODES = (502, 503, 504)
+
+RATE_LIMITED_ERRORS = ("rate limit", "too many requests", "limit exceeded", "request rate exceeded")
+NOT_SYNCED_ERRORS = ("header not found", "unknown block", "not synced", "is syncing", "block not found")
+
+# methods with side effects, or whose result depends on having been called
+# before (eth_getFilterChanges only returns each change once)
+NON_IDEMPOTENT_METHODS = frozenset([
+    "eth_sendRawTransaction", "eth_sendTransaction", "eth_getFilterChanges", "eth_newFilter",
+    "eth_newBlockFilter", "eth_newPendingTransactionFilter", "eth_submitWork", "eth_submitHashrate",
+    "personal_sendTransaction", "personal_newAccount", "personal_unlockAccount"])
+
+def classify(error):
+    """returns the kind of error, one of TRANSPORT, RATE_LIMITED, NOT_SYNCED or DETERMINISTIC"""
+
+    if isinstance(error, JsonRPCError):
+        message = str(error).lower()
+        if any(msg in message for msg in RATE_LIMITED_ERRORS):
+            return RATE_LIMITED
+        if any(msg in message for msg in NOT_SYNCED_ERRORS):
+            return NOT_SYNCED
+        return DETERMINISTIC
+    if isinstance(error, tornado.httpclient.HTTPClientError):
+        if error.code == 429:
+            return RATE_LIMITED
+        # 599 is tornado's code for timeouts and connection errors
+        if error.code == 599 or error.code in TRANSPORT_STATUS_CODES:
+            return TRANSPORT
+        return DETERMINISTIC
+    # includes tornado.iostream.StreamClosedError
+    if isinstance(error, (OSError, asyncio.TimeoutError)):
+        return TRANSPORT
+    return DETERMINISTIC
+
+def _retry_after(error):
+    """the delay asked for by a Retry-After header, if any"""
+
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """Decides whether and when to retry a failed request.
+
+    A request is tried at most `max_attempts` times. The delay before
+    retry n is random between 0 and min(max_delay, base_delay * 2 ** n),
+    or what a Retry-After header asked for when rate limited.
+
+    Every retry spends one token from a budget holding at most `budget`
+    tokens, and every successful request adds `budget_ratio` tokens back,
+    so in the long run retries add at most that fraction to the load"""
+
+    def __init__(self, *, max_attempts=3, base_delay=0.1, max_delay=5.0, budget=10.0, budget_ratio=0.1):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.budget_ratio = budget_ratio
+        self.tokens = budget
+        # metrics
+        self.retries = 0
+        self.exhausted = 0
+
+    def is_idempotent(self, method):
+        return method not in NON_IDEMPOTENT_METHODS
+
+    def record_success(self):
+        self.tokens = min(self.budget, self.tokens + self.budget_ratio)
+
+    def is_retryable(self, error, methods, attempt):
+        """whether the request for the given methods may be retried after
+        `attempt` failed attempts, ignoring the budget"""
+
+        if attempt >= self.max_attempts or classify(error) not in RETRYABLE:
+            return False
+        return all(self.is_idempotent(method) for method in methods)
+
+    def retry_delay(self, error, methods, attempt):
+        """returns how long to wait before retrying, or None if the request
+        shouldn't be retried. Returning a delay spends from the budget"""
+
+        if not self.is_retryable(error, methods, attempt):
+            return None
+        if self.tokens < 1:
+            self.exhausted += 1
+            return None
+        self.tokens -= 1
+        self.retries += 1
+
+        if classify(error) == RATE_LIMITED:
+            delay = _retry_after(error)
+            if delay is not None:
+                return min(delay, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
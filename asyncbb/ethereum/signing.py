@@ -0,0 +1,98 @@
+import asyncio
+import concurrent.futures
+import os
+import rlp
+
+from ethereum.transactions import Transaction
+from ethutils import data_decoder, data_encoder
+
+def sign_transaction(private_key, nonce, gasprice, startgas, to, value, data=b'', network_id=None):
+    """builds, signs and rlp encodes a transaction.
+
+    returns a tuple of (tx_hash, encoded_tx, created_contract_address), all as
+    0x prefixed hex strings. created_contract_address is None unless `to` is
+    empty.
+
+    This is a plain module level function so it can be pickled and run in
+    a worker process"""
+
+    if isinstance(private_key, str):
+        private_key = data_decoder(private_key)
+    if isinstance(to, str):
+        to = data_decoder(to) if to else b''
+    if isinstance(data, str):
+        data = data_decoder(data)
+
+    tx = Transaction(nonce, gasprice, startgas, to, value, data, 0, 0, 0)
+    if network_id is None:
+        tx.sign(private_key)
+    else:
+        tx.sign(private_key, network_id=network_id)
+
+    tx_encoded = data_encoder(rlp.encode(tx, Transaction))
+    tx_hash = data_encoder(tx.hash)
+    if to == b'':
+        creates = data_encoder(tx.creates)
+    else:
+        creates = None
+
+    return tx_hash, tx_encoded, creates
+
+def sign_transactions(private_key, transactions, network_id=None):
+    """signs a list of (nonce, gasprice, startgas, to, value, data) tuples
+    with the same key. Used to sign a whole chunk in one worker round trip"""
+
+    if isinstance(private_key, str):
+        private_key = data_decoder(private_key)
+    return [sign_transaction(private_key, *tx, network_id=network_id) for tx in transactions]
+
+class SigningService:
+    """Signs transactions in a process pool so that the cpu heavy ecdsa
+    signing and rlp encoding don't block the event loop.
+
+    Batches are split into chunks of `chunk_size` transactions so each
+    worker round trip does enough work to outweigh the cost of pickling
+    the arguments and results"""
+
+    def __init__(self, max_workers=None, *, chunk_size=50, executor=None):
+
+        if executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or os.cpu_count())
+            self._owns_executor = True
+        else:
+            self._owns_executor = False
+        self._executor = executor
+        self.chunk_size = chunk_size
+
+    async def sign(self, private_key, nonce, gasprice, startgas, to, value, data=b'', *, network_id=None):
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor, sign_transaction,
+            private_key, nonce, gasprice, startgas, to, value, data, network_id)
+
+    async def sign_batch(self, private_key, transactions, *, network_id=None):
+        """signs a list of (nonce, gasprice, startgas, to, value, data) tuples,
+        returning a list of (tx_hash, encoded_tx, created_contract_address)
+        tuples in the same order"""
+
+        if isinstance(private_key, str):
+            private_key = data_decoder(private_key)
+        transactions = list(transactions)
+        if not transactions:
+            return []
+
+        loop = asyncio.get_event_loop()
+        futures = [
+            loop.run_in_executor(self._executor, sign_transactions, private_key,
+                                 transactions[i:i + self.chunk_size], network_id)
+            for i in range(0, len(transactions), self.chunk_size)
+        ]
+        rval = []
+        for chunk in await asyncio.gather(*futures):
+            rval.extend(chunk)
+        return rval
+
+    def shutdown(self, wait=True):
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
@@ -0,0 +1,177 @@
+import tornado.escape
+import tornado.web
+
+from ethereum.utils import sha3
+from ethutils import data_decoder, data_encoder
+
+class FakeNode:
+    """A minimal in memory stand in for an ethereum jsonrpc node, for tests
+    and benchmarks that exercise request patterns rather than the chain.
+
+    Methods are looked up by their jsonrpc name, so subclasses can add
+    or override behaviour by defining more of them"""
+
+    def __init__(self, block_number=100):
+        self.block_number = block_number
+        self.balances = {}
+        self.nonces = {}
+        self.code = {}
+        self.transactions = {}
+        self.receipts = {}
+        self.blocks = {}
+        self.logs = []
+        self.pending = []
+        self.filters = {}
+        self._next_filter_id = 1
+        self.requests = []
+        self.http_requests = 0
+
+    def dispatch(self, request):
+        self.requests.append(request['method'])
+        fn = getattr(self, request['method'], None)
+        if fn is None:
+            return {"jsonrpc": "2.0", "id": request['id'],
+                    "error": {"code": -32601, "message": "Method not found"}}
+        try:
+            result = fn(*request.get('params', []))
+        except FakeNodeError as e:
+            return {"jsonrpc": "2.0", "id": request['id'],
+                    "error": {"code": e.code, "message": e.message}}
+        return {"jsonrpc": "2.0", "id": request['id'], "result": result}
+
+    def web3_clientVersion(self):
+        return "FakeNode/v0.0.1"
+
+    def eth_blockNumber(self):
+        return hex(self.block_number)
+
+    def eth_getBlockByNumber(self, number, with_transactions):
+        number = self.block_number if number == "latest" else int(number, 16)
+        if number > self.block_number:
+            return None
+        block = self.blocks.get(number)
+        if block is None:
+            # blocks not given explicitly are empty, 15 seconds apart
+            block = {"number": hex(number), "hash": "0x{:064x}".format(number),
+                     "timestamp": hex(1500000000 + number * 15), "gasUsed": "0x0", "transactions": []}
+        if not with_transactions:
+            block = dict(block, transactions=[tx['hash'] if isinstance(tx, dict) else tx
+                                              for tx in block['transactions']])
+        return block
+
+    def eth_getBalance(self, address, block):
+        return hex(self.balances.get(address.lower(), 0))
+
+    def eth_getTransactionCount(self, address, block):
+        return hex(self.nonces.get(address.lower(), 0))
+
+    def eth_getCode(self, address, block):
+        return self.code.get(address.lower(), "0x")
+
+    def eth_sendRawTransaction(self, raw):
+        tx_hash = data_encoder(sha3(data_decoder(raw)))
+        if tx_hash in self.transactions:
+            raise FakeNodeError(-32010, "Transaction with the same hash was already imported.")
+        self.transactions[tx_hash] = raw
+        self.receipts[tx_hash] = {"transactionHash": tx_hash, "blockNumber": hex(self.block_number),
+                                  "gasUsed": "0x5208", "logs": []}
+        return tx_hash
+
+    def eth_getTransactionReceipt(self, tx_hash):
+        return self.receipts.get(tx_hash)
+
+    def mine(self, logs=()):
+        """advances to a new block containing the given logs"""
+        self.block_number += 1
+        for log in logs:
+            self.logs.append(dict(log, blockNumber=hex(self.block_number), logIndex=hex(len(self.logs)),
+                                  transactionHash="0x{:064x}".format(len(self.logs))))
+
+    def _new_filter_id(self):
+        filter_id = hex(self._next_filter_id)
+        self._next_filter_id += 1
+        return filter_id
+
+    def _get_filter(self, filter_id):
+        try:
+            return self.filters[filter_id]
+        except KeyError:
+            raise FakeNodeError(-32000, "Filter not found")
+
+    @staticmethod
+    def _log_matches(params, log):
+        address = params.get('address')
+        if address is not None:
+            if isinstance(address, str):
+                address = [address]
+            if log['address'].lower() not in [a.lower() for a in address]:
+                return False
+        for i, allowed in enumerate(params.get('topics') or ()):
+            if allowed is None:
+                continue
+            if isinstance(allowed, str):
+                allowed = [allowed]
+            if i >= len(log['topics']) or log['topics'][i] not in allowed:
+                return False
+        return True
+
+    def eth_newFilter(self, params):
+        filter_id = self._new_filter_id()
+        self.filters[filter_id] = {'kind': 'logs', 'params': params, 'seen': len(self.logs)}
+        return filter_id
+
+    def eth_newBlockFilter(self):
+        filter_id = self._new_filter_id()
+        self.filters[filter_id] = {'kind': 'blocks', 'seen': self.block_number}
+        return filter_id
+
+    def eth_newPendingTransactionFilter(self):
+        filter_id = self._new_filter_id()
+        self.filters[filter_id] = {'kind': 'pending', 'seen': len(self.pending)}
+        return filter_id
+
+    def eth_getFilterChanges(self, filter_id):
+        node_filter = self._get_filter(filter_id)
+        if node_filter['kind'] == 'pending':
+            changes = self.pending[node_filter['seen']:]
+            node_filter['seen'] = len(self.pending)
+            return changes
+        if node_filter['kind'] == 'blocks':
+            changes = ["0x{:064x}".format(n) for n in range(node_filter['seen'] + 1, self.block_number + 1)]
+            node_filter['seen'] = self.block_number
+            return changes
+        changes = [log for log in self.logs[node_filter['seen']:] if self._log_matches(node_filter['params'], log)]
+        node_filter['seen'] = len(self.logs)
+        return changes
+
+    def eth_getFilterLogs(self, filter_id):
+        params = self._get_filter(filter_id)['params']
+        from_block = params.get('fromBlock', 'latest')
+        from_block = self.block_number if from_block == 'latest' else int(from_block, 16)
+        return [log for log in self.logs
+                if int(log['blockNumber'], 16) >= from_block and self._log_matches(params, log)]
+
+    def eth_uninstallFilter(self, filter_id):
+        return self.filters.pop(filter_id, None) is not None
+
+class FakeNodeError(Exception):
+
+    def __init__(self, code, message):
+        super().__init__(code, message)
+        self.code = code
+        self.message = message
+
+class FakeNodeHandler(tornado.web.RequestHandler):
+
+    def initialize(self, node):
+        self.node = node
+
+    def post(self):
+        self.node.http_requests += 1
+        data = tornado.escape.json_decode(self.request.body)
+        if isinstance(data, list):
+            result = [self.node.dispatch(request) for request in data]
+        else:
+            result = self.node.dispatch(data)
+        self.set_header('Content-Type', 'application/json')
+        self.write(tornado.escape.json_encode(result))
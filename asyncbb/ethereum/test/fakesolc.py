@@ -0,0 +1,49 @@
+import os
+import sys
+
+# Stands in for solc in tests. Every `contract Name` or `library Name` is
+# output, with an address argument to its constructor if written as
+# `contract Name(address)`. Linked library addresses are appended to the
+# bytecode, and each run is recorded in a `runs` file next to the script
+FAKE_SOLC = """#!{python}
+import json, os, re, sys
+if '--version' in sys.argv:
+    print('solc, the solidity compiler commandline interface\\nVersion: 0.4.21+fake')
+    sys.exit(0)
+with open(os.path.join(os.path.dirname(__file__), 'runs'), 'a') as f:
+    f.write('run\\n')
+source = sys.stdin.read()
+if 'error' in source:
+    sys.stderr.write('Error: bad source')
+    sys.exit(1)
+linked = ''
+if '--libraries' in sys.argv:
+    libraries = sys.argv[sys.argv.index('--libraries') + 1]
+    linked = ''.join(library.split(':')[1][2:] for library in libraries.split(','))
+contracts = {{}}
+for name, args in re.findall(r'(?:contract|library) (\\w+)(\\(address\\))?', source):
+    abi = []
+    if args:
+        abi.append({{'type': 'constructor', 'inputs': [{{'name': 'a', 'type': 'address'}}],
+                     'payable': False, 'stateMutability': 'nonpayable'}})
+    contracts['<stdin>:' + name] = {{'abi': json.dumps(abi), 'bin': '6060' + linked}}
+print(json.dumps({{'contracts': contracts, 'version': '0.4.21'}}))
+"""
+
+def write_fake_solc(directory):
+    """writes the fake solc script into the given directory, returning its path"""
+
+    path = os.path.join(directory, 'solc')
+    with open(path, 'w') as f:
+        f.write(FAKE_SOLC.format(python=sys.executable))
+    os.chmod(path, 0o755)
+    return path
+
+def solc_runs(directory):
+    """returns the number of times the fake solc in directory compiled something"""
+
+    try:
+        with open(os.path.join(directory, 'runs')) as f:
+            return len(f.readlines())
+    except FileNotFoundError:
+        return 0
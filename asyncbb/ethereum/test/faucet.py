@@ -1,8 +1,7 @@
 import asyncio
-import rlp
-from ethereum.transactions import Transaction
 from asyncbb.ethereum.client import JsonRPCClient
-from ethutils import data_decoder, data_encoder, private_key_to_address
+from asyncbb.ethereum.signing import sign_transaction
+from ethutils import data_decoder, private_key_to_address
 
 FAUCET_PRIVATE_KEY = "0x0164f7c7399f4bb1eafeaae699ebbb12050bc6a50b2836b9ca766068a9d000c0"
 FAUCET_ADDRESS = "0xde3d2d9dd52ea80f7799ef4791063a5458d13913"
@@ -13,7 +12,8 @@ DEFAULT_GASPRICE = 20000000000
 class FaucetMixin:
 
     async def faucet(self, to, value, *, from_private_key=FAUCET_PRIVATE_KEY, startgas=None,
-                     gasprice=DEFAULT_GASPRICE, nonce=None, data=b"", wait_on_confirmation=True):
+                     gasprice=DEFAULT_GASPRICE, nonce=None, data=b"", wait_on_confirmation=True,
+                     signer=None):
 
         if isinstance(from_private_key, str):
             from_private_key = data_decoder(from_private_key)
@@ -32,14 +32,13 @@ class FaucetMixin:
         if startgas is None:
             startgas = await ethclient.eth_estimateGas(from_address, to, data=data, nonce=nonce, value=value, gasprice=gasprice)
 
-        tx = Transaction(nonce, gasprice, startgas, to, value, data, 0, 0, 0)
-
-        if balance < (tx.value + (tx.startgas * tx.gasprice)):
+        if balance < (value + (startgas * gasprice)):
             raise Exception("Faucet doesn't have enough funds")
 
-        tx.sign(from_private_key)
-
-        tx_encoded = data_encoder(rlp.encode(tx, Transaction))
+        if signer is not None:
+            _, tx_encoded, creates = await signer.sign(from_private_key, nonce, gasprice, startgas, to, value, data)
+        else:
+            _, tx_encoded, creates = sign_transaction(from_private_key, nonce, gasprice, startgas, to, value, data)
 
         tx_hash = await ethclient.eth_sendRawTransaction(tx_encoded)
 
@@ -51,7 +50,7 @@ class FaucetMixin:
                 break
 
         if to == b'':
-            print("contract address: {}".format(data_encoder(tx.creates)))
+            print("contract address: {}".format(creates))
 
         return tx_hash
 
@@ -74,19 +73,13 @@ class FaucetMixin:
         elif gasestimate > startgas:
             raise Exception("Estimated gas usage is larger than the provided gas")
 
-        tx = Transaction(nonce, gasprice, startgas, '', 0, bytecode, 0, 0, 0)
-
-        if balance < (tx.value + (tx.startgas * tx.gasprice)):
+        if balance < (startgas * gasprice):
             raise Exception("Faucet doesn't have enough funds")
 
-        tx.sign(from_private_key)
-
-        tx_encoded = data_encoder(rlp.encode(tx, Transaction))
+        _, tx_encoded, contract_address = sign_transaction(from_private_key, nonce, gasprice, startgas, '', 0, bytecode)
 
         tx_hash = await ethclient.eth_sendRawTransaction(tx_encoded)
 
-        contract_address = data_encoder(tx.creates)
-
         while wait_on_confirmation:
             resp = await ethclient.eth_getTransactionByHash(tx_hash)
             if resp is None or resp['blockNumber'] is None:
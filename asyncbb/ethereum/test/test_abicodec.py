@@ -0,0 +1,87 @@
+import os
+import random
+import unittest
+
+from ethereum.abi import encode_abi, decode_abi
+
+from asyncbb.ethereum.abicodec import get_encoder, get_decoder, fix_address_decoding
+
+SIGNATURES = [
+    [],
+    ['uint256'],
+    ['address'],
+    ['bool'],
+    ['string'],
+    ['address', 'uint256'],
+    ['address', 'address', 'uint256'],
+    ['uint8', 'int8', 'int64', 'int256', 'uint128'],
+    ['bytes32', 'bytes4', 'bytes1'],
+    ['bytes', 'uint256', 'string', 'address'],
+    # not handled by the generated code, so should fall back
+    ['uint256[]'],
+    ['address[]', 'bool'],
+]
+
+def random_value(typ, rand):
+    if typ.endswith('[]'):
+        return [random_value(typ[:-2], rand) for _ in range(rand.randint(0, 4))]
+    if typ.startswith('uint'):
+        bits = int(typ[4:] or 256)
+        return rand.choice([0, 1, (1 << bits) - 1, rand.getrandbits(bits)])
+    if typ.startswith('int'):
+        bits = int(typ[3:] or 256)
+        return rand.choice([0, -1, -(1 << (bits - 1)), (1 << (bits - 1)) - 1,
+                            rand.getrandbits(bits) - (1 << (bits - 1))])
+    if typ == 'address':
+        return '0x' + os.urandom(20).hex()
+    if typ == 'bool':
+        return rand.choice([True, False])
+    if typ == 'bytes':
+        return os.urandom(rand.randint(0, 100))
+    if typ == 'string':
+        return ''.join(chr(rand.randint(32, 0x2000)) for _ in range(rand.randint(0, 50))).encode('utf-8')
+    if typ.startswith('bytes'):
+        return os.urandom(int(typ[5:]))
+    raise Exception("unexpected type {}".format(typ))
+
+class ABICodecTest(unittest.TestCase):
+
+    def test_against_ethereum_abi(self):
+
+        rand = random.Random(1234)
+
+        for types in SIGNATURES:
+            encoder = get_encoder(types)
+            decoder = get_decoder(types)
+            for _ in range(200):
+                args = [random_value(typ, rand) for typ in types]
+                expected = encode_abi(types, args)
+                encoded = encoder(args)
+                self.assertEqual(encoded, expected, "encoding {} {}".format(types, args))
+                self.assertEqual(decoder(encoded),
+                                 fix_address_decoding(decode_abi(types, encoded), types),
+                                 "decoding {} {}".format(types, args))
+
+    def test_address_decoding(self):
+
+        address = '0x39bf9e501e61440b4b268d7b2e9aa2458dd201bb'
+        types = ['address', 'uint256']
+        self.assertEqual(get_decoder(types)(get_encoder(types)([address, 10])), [address, 10])
+        # addresses can be given without the 0x prefix or as bytes
+        self.assertEqual(get_encoder(types)([address[2:], 10]), get_encoder(types)([address, 10]))
+        self.assertEqual(get_encoder(types)([bytes.fromhex(address[2:]), 10]), get_encoder(types)([address, 10]))
+
+    def test_errors_match(self):
+
+        for types, args in ((['uint8'], [256]), (['uint256'], [-1]), (['int8'], [128]),
+                            (['address'], ['0x1234']), (['string'], [b'\xff'])):
+            with self.assertRaises(Exception) as expected:
+                encode_abi(types, args)
+            with self.assertRaises(expected.exception.__class__):
+                get_encoder(types)(args)
+
+        # not enough data
+        with self.assertRaises(Exception) as expected:
+            decode_abi(['uint256', 'uint256'], b'\x00' * 32)
+        with self.assertRaises(expected.exception.__class__):
+            get_decoder(['uint256', 'uint256'])(b'\x00' * 32)
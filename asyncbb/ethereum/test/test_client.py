@@ -0,0 +1,341 @@
+import asyncio
+import gzip
+import tornado.escape
+import zlib
+
+from asyncbb.test.base import AsyncHandlerTest
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient, JsonRPCError
+
+from .fakenode import FakeNode, FakeNodeError, FakeNodeHandler
+
+def make_address(i):
+    return '0x{:040x}'.format(i + 1)
+
+class CompressingNodeHandler(FakeNodeHandler):
+    """accepts gzip request bodies and compresses responses with the
+    node's `response_encoding`"""
+
+    def post(self):
+        self.node.request_encodings.append(self.request.headers.get('Content-Encoding'))
+        self.node.accept_encodings.append(self.request.headers.get('Accept-Encoding'))
+        if self.request.headers.get('Content-Encoding') == 'gzip':
+            self.request.body = gzip.decompress(self.request.body)
+        super().post()
+
+    def finish(self, chunk=None):
+        encoding = self.node.response_encoding
+        if encoding and encoding in (self.request.headers.get('Accept-Encoding') or ''):
+            body = b''.join(self._write_buffer)
+            self._write_buffer = [gzip.compress(body) if encoding == 'gzip' else zlib.compress(body)]
+            self.set_header('Content-Encoding', encoding)
+        return super().finish(chunk)
+
+class TraceNode(FakeNode):
+    # tracing more blocks than this in one call times out
+    max_range = 8
+    # a block that can only be traced on its own, and is slow to fail
+    expensive_block = None
+
+    def _traces(self, number):
+        return [{"blockNumber": number, "transactionPosition": i,
+                 "action": {"from": make_address(i), "to": make_address(i + 1), "value": hex(number)}}
+                for i in range(number % 3)]
+
+    def _too_expensive(self, start, end):
+        return end - start + 1 > (1 if start <= (self.expensive_block or -1) <= end else self.max_range)
+
+    def delay(self, request):
+        if isinstance(request, dict) and request['method'] == "trace_filter":
+            params = request['params'][0]
+            if self._too_expensive(int(params['fromBlock'], 16), int(params['toBlock'], 16)):
+                return 0.2
+        return 0
+
+    def trace_filter(self, params):
+        start, end = int(params['fromBlock'], 16), int(params['toBlock'], 16)
+        if self._too_expensive(start, end):
+            raise FakeNodeError(-32000, "Query timeout")
+        traces = [trace for number in range(start, end + 1) for trace in self._traces(number)]
+        if 'fromAddress' in params:
+            traces = [trace for trace in traces if trace['action']['from'] in params['fromAddress']]
+        return traces
+
+    def trace_block(self, number):
+        return self._traces(int(number, 16))
+
+    def debug_traceBlockByNumber(self, number, options):
+        return [{"result": {"type": options['tracer']}} for _ in self._traces(int(number, 16))]
+
+class DelayingNodeHandler(FakeNodeHandler):
+    """waits as long as the node's `delay` says before answering"""
+
+    async def post(self):
+        delay = self.node.delay(tornado.escape.json_decode(self.request.body))
+        if delay:
+            await asyncio.sleep(delay)
+        super().post()
+
+class ClientTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = FakeNode(block_number=500)
+        self.node.request_encodings = []
+        self.node.accept_encodings = []
+        self.node.response_encoding = None
+        return [(r'^/$', FakeNodeHandler, {'node': self.node}),
+                (r'^/compressed$', CompressingNodeHandler, {'node': self.node}),
+                (r'^/delayed$', DelayingNodeHandler, {'node': self.node})]
+
+    @gen_test
+    async def test_get_accounts(self):
+
+        addresses = [make_address(i) for i in range(250)]
+        for i, address in enumerate(addresses):
+            self.node.balances[address] = i * 10 ** 18
+            self.node.nonces[address] = i
+        self.node.code[addresses[3]] = "0x6060"
+
+        client = JsonRPCClient(self.get_url('/'))
+        snapshot = await client.get_accounts(addresses, batch_size=100, include_code=True)
+
+        self.assertEqual(snapshot.block_number, 500)
+        self.assertEqual(snapshot.addresses, addresses)
+        self.assertEqual(list(snapshot.balances), [i * 10 ** 18 for i in range(250)])
+        self.assertEqual(list(snapshot.nonces), list(range(250)))
+        self.assertEqual(snapshot.account(3), (addresses[3], 3 * 10 ** 18, 3, "0x6060"))
+        self.assertEqual(snapshot.codes.count("0x"), 249)
+        # one eth_blockNumber plus batches of 33 addresses
+        self.assertEqual(self.node.http_requests, 1 + 8)
+
+        snapshot = await client.get_accounts(addresses[:10], block=400)
+        self.assertEqual(snapshot.block_number, 400)
+        self.assertIsNone(snapshot.codes)
+
+    @gen_test
+    async def test_get_accounts_error(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        # makes eth_getCode respond with "Method not found"
+        self.node.eth_getCode = None
+        with self.assertRaises(JsonRPCError):
+            await client.get_accounts([make_address(0)], include_code=True)
+
+    @gen_test
+    async def test_sample(self):
+
+        class HistoryNode(FakeNode):
+            def eth_getBalance(self, address, block):
+                return hex(int(block, 16) * 10)
+        self.node.__class__ = HistoryNode
+
+        client = JsonRPCClient(self.get_url('/'))
+        call = ("eth_getBalance", [make_address(0)])
+        series = await client.sample(call, range(300, 500), step=2, decode=lambda r: int(r, 16), batch_size=50)
+
+        self.assertEqual(list(series.blocks), list(range(300, 500, 2)))
+        self.assertEqual(series.values, [block * 10 for block in range(300, 500, 2)])
+        self.assertEqual(list(series.timestamps), [1500000000 + block * 15 for block in range(300, 500, 2)])
+        # eth_blockNumber plus 200 calls in batches of 50
+        self.assertEqual(self.node.http_requests, 5)
+
+        # results more than 12 blocks below the head (500) were cached, so only
+        # the recent blocks and the odd ones not sampled before are fetched
+        self.node.http_requests = 0
+        self.node.requests = []
+        series = await client.sample(call, range(480, 500), decode=lambda r: int(r, 16))
+        self.assertEqual(series.values, [block * 10 for block in range(480, 500)])
+        self.assertEqual(self.node.http_requests, 2)
+        self.assertEqual(self.node.requests.count("eth_getBalance"), 15)
+
+    @gen_test(timeout=30)
+    async def test_watch(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        filter_id = await client.eth_newBlockFilter()
+        watch = client.watch(filter_id, min_interval=0.01, block_time=0.08)
+
+        async def mine():
+            for delay in (0.01, 0.3, 0.01):
+                await asyncio.sleep(delay)
+                self.node.mine()
+
+        miner = asyncio.ensure_future(mine())
+        changes = []
+        async for hashes in watch:
+            # empty polls aren't yielded
+            self.assertTrue(hashes)
+            changes.extend(hashes)
+            if len(changes) == 3:
+                break
+        await miner
+
+        self.assertEqual(changes, ["0x{:064x}".format(n) for n in range(501, 504)])
+        self.assertGreater(watch.empty_polls, 0)
+        # the interval backed off while idle
+        self.assertGreater(watch.avoided_polls, 0)
+        # and is back to the minimum after changes arrived
+        self.assertEqual(watch.interval, 0.01)
+
+    def add_block_with_receipts(self, number, count):
+        block_hash = "0x{:064x}".format(number)
+        txs = ["0x{:062x}{:02x}".format(number, i) for i in range(count)]
+        self.node.blocks[number] = {"number": hex(number), "hash": block_hash, "timestamp": hex(number),
+                                    "gasUsed": "0x0", "transactions": txs}
+        for i, tx in enumerate(txs):
+            self.node.receipts[tx] = {"transactionHash": tx, "transactionIndex": hex(i), "blockHash": block_hash,
+                                      "blockNumber": hex(number), "gasUsed": "0x5208", "logs": []}
+        return block_hash, txs
+
+    @gen_test
+    async def test_get_block_receipts_fallback(self):
+
+        block_hash, txs = self.add_block_with_receipts(7, 120)
+        client = JsonRPCClient(self.get_url('/'))
+
+        receipts = await client.get_block_receipts(7)
+        self.assertEqual([r['transactionHash'] for r in receipts], txs)
+        # web3_clientVersion, the block, then one batch of receipts
+        self.assertEqual(self.node.http_requests, 3)
+
+        # cached by block hash
+        self.node.http_requests = 0
+        receipts = await client.get_block_receipts(block_hash, typed=True)
+        self.assertEqual(receipts[5].gas_used, 21000)
+        self.assertEqual(self.node.http_requests, 0)
+
+        self.assertEqual(await client.get_block_receipts(8), [])
+
+    @gen_test
+    async def test_get_block_receipts_not_indexed(self):
+
+        _, txs = self.add_block_with_receipts(7, 5)
+        receipt = self.node.receipts.pop(txs[3])
+        client = JsonRPCClient(self.get_url('/'))
+
+        for typed in (False, True):
+            with self.assertRaises(JsonRPCError):
+                await client.get_block_receipts(7, typed=typed)
+
+        # nothing incomplete was cached
+        self.node.receipts[txs[3]] = receipt
+        receipts = await client.get_block_receipts(7, typed=True)
+        self.assertEqual([r.transaction_hash for r in receipts], txs)
+
+    @gen_test
+    async def test_get_block_receipts_pending(self):
+
+        _, txs = self.add_block_with_receipts(7, 3)
+        for receipt in self.node.receipts.values():
+            receipt.update(blockHash=None, blockNumber=None)
+
+        class PendingNode(FakeNode):
+            def eth_getBlockByNumber(self, number, with_transactions):
+                if number != "pending":
+                    return super().eth_getBlockByNumber(number, with_transactions)
+                return dict(self.blocks[7], number=None, hash=None)
+        self.node.__class__ = PendingNode
+
+        client = JsonRPCClient(self.get_url('/'))
+        for _ in range(2):
+            receipts = await client.get_block_receipts("pending")
+            self.assertEqual([r['transactionHash'] for r in receipts], txs)
+        # nothing was cached for a block without a hash
+        self.assertEqual(self.node.requests.count("eth_getTransactionReceipt"), 6)
+
+    @gen_test
+    async def test_get_block_receipts_native(self):
+
+        block_hash, txs = self.add_block_with_receipts(7, 5)
+
+        class ParityNode(FakeNode):
+            def web3_clientVersion(self):
+                return "Parity//v1.11.8-stable/x86_64-linux-gnu/rustc1.27.2"
+
+            def parity_getBlockReceipts(self, block):
+                block = self.blocks[int(block, 16)]
+                return [self.receipts[tx] for tx in block['transactions']]
+        self.node.__class__ = ParityNode
+
+        client = JsonRPCClient(self.get_url('/'))
+        receipts = await client.get_block_receipts(7)
+        self.assertEqual([r['transactionHash'] for r in receipts], txs)
+        self.assertEqual(self.node.requests, ["web3_clientVersion", "parity_getBlockReceipts"])
+
+        # falls back if the method turns out to be disabled
+        del ParityNode.parity_getBlockReceipts
+        self.node.receipts.clear()
+        block_hash, txs = self.add_block_with_receipts(9, 5)
+        receipts = await client.get_block_receipts(9)
+        self.assertEqual([r['transactionHash'] for r in receipts], txs)
+        self.assertEqual(client._block_receipts_method, False)
+
+    @gen_test
+    async def test_iter_traces(self):
+
+        self.node.__class__ = TraceNode
+
+        client = JsonRPCClient(self.get_url('/'))
+        expected = [(number, i) for number in range(10, 110) for i in range(number % 3)]
+
+        traces = [(t['blockNumber'], t['transactionPosition'])
+                  async for t in client.iter_traces(10, 109, chunk_size=30, concurrency=3)]
+        self.assertEqual(traces, expected)
+        # chunks of 30 were halved until they were small enough
+        self.assertGreater(self.node.requests.count("trace_filter"), 4)
+
+        traces = [t async for t in client.iter_traces(10, 109, fromAddress=make_address(1), chunk_size=5)]
+        self.assertEqual([t['blockNumber'] for t in traces], [number for number in range(10, 110) if number % 3 == 2])
+
+        traces = [(t['blockNumber'], t['transactionPosition'])
+                  async for t in client.iter_traces(10, 109, method="trace_block", chunk_size=20)]
+        self.assertEqual(traces, expected)
+
+        traces = [t async for t in client.iter_traces(10, 20, method="debug_traceBlockByNumber",
+                                                      tracer="callTracer", chunk_size=4)]
+        self.assertEqual(len(traces), len([1 for number in range(10, 21) for _ in range(number % 3)]))
+        self.assertEqual(traces[0], {"result": {"type": "callTracer"}})
+
+        # a single block that still fails is raised
+        self.node.max_range = 0
+        with self.assertRaises(JsonRPCError):
+            async for _ in client.iter_traces(10, 20):
+                pass
+
+    @gen_test(timeout=10)
+    async def test_iter_traces_slow_failure(self):
+
+        # the first chunk fails slowly, after every chunk that can be held
+        # waiting on it has finished
+        self.node.__class__ = TraceNode
+        self.node.expensive_block = 10
+        client = JsonRPCClient(self.get_url('/delayed'))
+        expected = [(number, i) for number in range(10, 60) for i in range(number % 3)]
+
+        traces = [(t['blockNumber'], t['transactionPosition'])
+                  async for t in client.iter_traces(10, 59, chunk_size=2, concurrency=2)]
+        self.assertEqual(traces, expected)
+
+    @gen_test
+    async def test_compression(self):
+
+        for encoding in ('gzip', 'deflate'):
+            self.node.response_encoding = encoding
+            client = JsonRPCClient(self.get_url('/compressed'), compress_requests=1000)
+            block = await client.eth_getBlockByNumber(1)
+            self.assertEqual(block['number'], "0x1")
+            results = await client._fetch_batch([("eth_getBalance", [make_address(i), "latest"]) for i in range(100)])
+            self.assertEqual(results, ["0x0"] * 100)
+            # small requests are sent as is and big batches compressed
+            self.assertEqual(self.node.request_encodings[-2:], [None, "gzip"])
+            self.assertEqual(self.node.accept_encodings[-1], "gzip, deflate")
+            self.assertLess(client.bytes_sent, len(tornado.escape.json_encode(
+                [{"jsonrpc": "2.0", "id": 0, "method": "eth_getBalance", "params": [make_address(i), "latest"]}
+                 for i in range(100)])))
+
+        client = JsonRPCClient(self.get_url('/compressed'), accept_encoding=False)
+        self.node.response_encoding = 'gzip'
+        await client.eth_blockNumber()
+        self.assertIsNone(self.node.accept_encodings[-1])
+        self.assertIsNone(self.node.request_encodings[-1])
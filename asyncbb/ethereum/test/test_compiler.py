@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from unittest import mock
+
+from asyncbb.ethereum.compiler import (CompilationCache, CompilerError, compile_cache_key, compile_many,
+                                       compile_source, get_default_cache, source_digest)
+
+from .fakesolc import write_fake_solc, solc_runs
+
+class TestCompilationCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = self._tmpdir.name
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def write(self, name, data):
+        filename = os.path.join(self.path, name)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'wb') as f:
+            f.write(data)
+        return filename
+
+    def test_digest_covers_imports(self):
+
+        main = self.write('src/Main.sol', b'import "./Lib.sol";\nimport {A} from "lib/Other.sol";\ncontract Main {}')
+        self.write('src/Lib.sol', b'library Lib {}')
+        self.write('vendor/Other.sol', b'contract A {}')
+        mappings = [('lib/', os.path.join(self.path, 'vendor') + '/')]
+
+        digest = source_digest(None, main, import_mappings=mappings)
+        self.assertEqual(digest, source_digest(None, main, import_mappings=mappings))
+
+        self.write('src/Lib.sol', b'library Lib { }')
+        changed = source_digest(None, main, import_mappings=mappings)
+        self.assertNotEqual(digest, changed)
+
+        self.write('vendor/Other.sol', b'contract A { }')
+        self.assertNotEqual(changed, source_digest(None, main, import_mappings=mappings))
+
+    def test_key_covers_options(self):
+
+        digest = source_digest(b'contract A {}', '<stdin>')
+        key = compile_cache_key(digest, filename='<stdin>', version='0.4.21')
+        self.assertEqual(key, compile_cache_key(digest, filename='<stdin>', version='0.4.21'))
+        self.assertNotEqual(key, compile_cache_key(digest, filename='<stdin>', optimize=True, version='0.4.21'))
+        self.assertNotEqual(key, compile_cache_key(digest, filename='<stdin>', version='0.4.24'))
+        self.assertNotEqual(key, compile_cache_key(digest, filename='<stdin>', version='0.4.21',
+                                                   libraries=[('Lib', '0x' + '00' * 20)]))
+
+    def test_get_put_and_evict(self):
+
+        contracts = {'<stdin>:A': {'abi': '[]', 'bin': '00' * 100}}
+        # room for three entries
+        cache = CompilationCache(os.path.join(self.path, 'cache'), max_size=3 * len(json.dumps(contracts)))
+        self.assertIsNone(cache.get('a'))
+
+        cache.put('a', contracts)
+        self.assertEqual(cache.get('a'), contracts)
+
+        # make 'a' the oldest entry, then use it so 'b' becomes the oldest
+        os.utime(cache._entry_path('a'), (time.time() - 20, time.time() - 20))
+        cache.put('b', contracts)
+        os.utime(cache._entry_path('b'), (time.time() - 10, time.time() - 10))
+        cache.get('a')
+        cache.put('c', contracts)
+        cache.put('d', contracts)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), contracts)
+        self.assertEqual(cache.get('d'), contracts)
+        self.assertFalse([name for name in os.listdir(cache.path) if name.startswith('.tmp-')])
+
+class TestCompileMany(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.solc = write_fake_solc(self._tmpdir.name)
+        self.cache = CompilationCache(os.path.join(self._tmpdir.name, 'cache'))
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        self._tmpdir.cleanup()
+
+    def test_compile_many(self):
+
+        sources = [b'contract A {} contract B {}', b'contract C {}', b'contract A {} contract B {}']
+        results = self.loop.run_until_complete(
+            compile_many(sources, max_workers=2, solc=self.solc, cache=self.cache))
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(sorted(results[0].names()), ['A', 'B'])
+        self.assertEqual(results[0].get('B'), ([], '6060'))
+        self.assertEqual(results[1].names(), ['C'])
+        # duplicate sources are only compiled once
+        self.assertEqual(solc_runs(self._tmpdir.name), 2)
+
+        # and are read from the cache afterwards
+        compiled = self.loop.run_until_complete(compile_source(b'contract C {}', solc=self.solc, cache=self.cache))
+        self.assertEqual(compiled.names(), ['C'])
+        self.assertEqual(solc_runs(self._tmpdir.name), 2)
+
+    def test_compile_error(self):
+
+        with self.assertRaises(CompilerError):
+            self.loop.run_until_complete(compile_source(b'error', solc=self.solc, cache=self.cache))
+
+    def test_unwritable_cache(self):
+
+        # a file where the cache directory should be, which fails to be
+        # created or written to even when running as root
+        blocked = os.path.join(self._tmpdir.name, 'blocked')
+        with open(blocked, 'w'):
+            pass
+
+        with mock.patch.dict(os.environ, {'SOLC_CACHE_DIR': os.path.join(blocked, 'solc')}):
+            self.assertIsNone(get_default_cache())
+            compiled = self.loop.run_until_complete(compile_source(b'contract A {}', solc=self.solc))
+        self.assertEqual(compiled.names(), ['A'])
+
+        cache = CompilationCache(os.path.join(self._tmpdir.name, 'removed'))
+        os.rmdir(cache.path)
+        with open(cache.path, 'w'):
+            pass
+        compiled = self.loop.run_until_complete(compile_source(b'contract B {}', solc=self.solc, cache=cache))
+        self.assertEqual(compiled.names(), ['B'])
+        self.assertIsNone(cache.get(compile_cache_key('x', filename='<stdin>')))
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import unittest
+
+from unittest import mock
+
+from ethutils import data_decoder
+
+from asyncbb.ethereum.contract import BoundContract, Contract, ContractMethod, get_default_client
+
+from .faucet import FAUCET_PRIVATE_KEY
+from .test_events import TOKEN_ABI, TOKEN_ADDRESS
+
+NODE_URL = "http://localhost:8545"
+OTHER_NODE_URL = "http://localhost:8546"
+
+class ContractTest(unittest.TestCase):
+
+    def test_methods_cached(self):
+
+        contract = Contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS)
+        with mock.patch.object(contract, '_make_method', wraps=contract._make_method) as make_method:
+            method = contract.balanceOf
+            self.assertIsInstance(method, ContractMethod)
+            self.assertIs(contract.__dict__['balanceOf'], method)
+            self.assertIs(contract.balanceOf, method)
+            self.assertEqual(make_method.call_count, 1)
+        self.assertIsNone(method.from_address)
+
+        with self.assertRaises(AttributeError):
+            contract.transfer
+        self.assertNotIn('transfer', contract.__dict__)
+
+    def test_bound_contract(self):
+
+        contract = BoundContract(sender=FAUCET_PRIVATE_KEY, abi=TOKEN_ABI, address=TOKEN_ADDRESS)
+        method = contract.balanceOf
+        expected = Contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS).balanceOf.set_sender(FAUCET_PRIVATE_KEY)
+        self.assertEqual(method.from_key, data_decoder(FAUCET_PRIVATE_KEY))
+        self.assertEqual(method.from_address, expected.from_address)
+        self.assertIs(contract.balanceOf, method)
+
+        # the address is derived once for the contract, not per method
+        self.assertEqual(contract.sender_address, expected.from_address)
+        with mock.patch('asyncbb.ethereum.contract._private_key_to_address') as derive:
+            self.assertEqual(contract._make_method('balanceOf').from_address, expected.from_address)
+            self.assertFalse(derive.called)
+
+        unbound = BoundContract(sender=None, abi=TOKEN_ABI, address=TOKEN_ADDRESS)
+        self.assertIsNone(unbound.balanceOf.from_key)
+
+    def test_default_client(self):
+
+        async def clients():
+            first, second = get_default_client(), get_default_client()
+            with mock.patch.dict(os.environ, {'ETHEREUM_NODE_URL': OTHER_NODE_URL}):
+                return first, second, get_default_client()
+
+        with mock.patch.dict(os.environ, {'ETHEREUM_NODE_URL': NODE_URL}):
+            first, second, other_url = asyncio.run(clients())
+            self.assertIs(first, second)
+            self.assertEqual(first._url, NODE_URL)
+            self.assertEqual(other_url._url, OTHER_NODE_URL)
+            # every ioloop gets its own client
+            other_loop, _, _ = asyncio.run(clients())
+            self.assertIsNot(other_loop, first)
+            self.assertEqual(other_loop._url, NODE_URL)
+
+        with mock.patch.dict(os.environ, {'ETHEREUM_NODE_URL': ''}):
+            with self.assertRaises(Exception):
+                get_default_client()
@@ -0,0 +1,96 @@
+import os
+import rlp
+import tempfile
+
+from asyncbb.test.base import AsyncHandlerTest
+from ethereum.transactions import Transaction
+from ethereum.utils import mk_contract_address
+from ethutils import data_decoder, data_encoder
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum.compiler import CompilationCache
+from asyncbb.ethereum.deploy import DeploymentPlanner, DeploymentError
+
+from .fakenode import FakeNode, FakeNodeHandler
+from .fakesolc import write_fake_solc, solc_runs
+from .faucet import FAUCET_PRIVATE_KEY, FAUCET_ADDRESS
+
+SOURCECODE = b"""
+library Math {}
+contract Token(address) {}
+"""
+SALE_SOURCECODE = b"contract Sale(address) {}"
+
+class DeployNode(FakeNode):
+    """creates contracts with the deployed bytecode as their code. Only the
+    faucet deploys anything in these tests"""
+
+    def eth_estimateGas(self, tx):
+        return hex(100000)
+
+    def eth_sendRawTransaction(self, raw):
+        tx_hash = super().eth_sendRawTransaction(raw)
+        tx = rlp.decode(data_decoder(raw), Transaction)
+        if tx.to == b'':
+            address = data_encoder(mk_contract_address(data_decoder(FAUCET_ADDRESS), tx.nonce))
+            self.code[address] = data_encoder(tx.data)
+            self.receipts[tx_hash]['contractAddress'] = address
+        return tx_hash
+
+class DeployTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = DeployNode()
+        self.node.balances[FAUCET_ADDRESS.lower()] = 10 ** 18
+        self.node.nonces[FAUCET_ADDRESS.lower()] = 7
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    def setUp(self):
+        super().setUp()
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.solc = write_fake_solc(self._tmpdir.name)
+        self.cache = CompilationCache(os.path.join(self._tmpdir.name, 'cache'))
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+        super().tearDown()
+
+    @gen_test(timeout=30)
+    async def test_deploy(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        planner = DeploymentPlanner(client, FAUCET_PRIVATE_KEY, poll_interval=0.01, solc=self.solc, cache=self.cache)
+        # added before its dependencies
+        planner.add('sale', SALE_SOURCECODE, 'Sale', constructor_data=[planner.address_of('token')])
+        planner.add('token', SOURCECODE, 'Token', constructor_data=[planner.address_of('math')],
+                    libraries=['math'])
+        planner.add('math', SOURCECODE, 'Math')
+
+        self.assertEqual(planner.order(), ['math', 'token', 'sale'])
+        contracts = await planner.deploy()
+
+        math, token, sale = contracts['math'], contracts['token'], contracts['sale']
+        self.assertEqual(len(self.node.transactions), 3)
+        self.assertEqual(set(self.node.code), {math.address, token.address, sale.address})
+        # token is linked against math and constructed with its address
+        self.assertEqual(self.node.code[token.address],
+                         '0x6060' + math.address[2:] + '00' * 12 + math.address[2:])
+        self.assertEqual(self.node.code[sale.address], '0x6060' + '00' * 12 + token.address[2:])
+        # one solc run per distinct source and set of linked libraries
+        self.assertEqual(solc_runs(self._tmpdir.name), 3)
+        # nonce and balance, gas estimates, sends, receipts and code checks
+        # are each a single batch
+        self.assertEqual(self.node.http_requests, 5)
+
+    def test_cycle(self):
+
+        planner = DeploymentPlanner(None, FAUCET_PRIVATE_KEY)
+        planner.add('a', SOURCECODE, depends=['b'])
+        planner.add('b', SOURCECODE, constructor_data=[planner.address_of('a')])
+        with self.assertRaises(DeploymentError):
+            planner.order()
+        planner = DeploymentPlanner(None, FAUCET_PRIVATE_KEY)
+        planner.add('a', SOURCECODE, libraries=['missing'])
+        with self.assertRaises(DeploymentError):
+            planner.order()
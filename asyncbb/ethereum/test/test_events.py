@@ -0,0 +1,172 @@
+import unittest
+
+from asyncbb.test.base import AsyncHandlerTest
+from ethereum.abi import encode_abi
+from ethereum.utils import sha3
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum.contract import Contract
+from asyncbb.ethereum.events import EventRegistry, decode_log
+
+from .fakenode import FakeNode, FakeNodeHandler
+
+TOKEN_ABI = [
+    {"constant": True, "inputs": [{"name": "_owner", "type": "address"}], "name": "balanceOf",
+     "outputs": [{"name": "balance", "type": "uint256"}], "payable": False, "type": "function"},
+    {"anonymous": False, "inputs": [{"indexed": True, "name": "_from", "type": "address"},
+                                    {"indexed": True, "name": "_to", "type": "address"},
+                                    {"indexed": False, "name": "_value", "type": "uint256"}],
+     "name": "Transfer", "type": "event"},
+    {"anonymous": False, "inputs": [{"indexed": False, "name": "note", "type": "string"},
+                                    {"indexed": True, "name": "id", "type": "int64"},
+                                    {"indexed": False, "name": "flag", "type": "bool"}],
+     "name": "Noted", "type": "event"},
+]
+
+NFT_ABI = [
+    {"anonymous": False, "inputs": [{"indexed": True, "name": "_from", "type": "address"},
+                                    {"indexed": True, "name": "_to", "type": "address"},
+                                    {"indexed": True, "name": "_tokenId", "type": "uint256"}],
+     "name": "Transfer", "type": "event"},
+]
+
+TOKEN_ADDRESS = "0x39bf9e501e61440b4b268d7b2e9aa2458dd201bb"
+OTHER_TOKEN_ADDRESS = "0x0100267048677a95cf91b487d9b65708c105dfe6"
+FROM_ADDRESS = "0xde3d2d9dd52ea80f7799ef4791063a5458d13913"
+TO_ADDRESS = "0x0200d3013d64c48d1948f0bc8631056df5fc1e7e"
+
+def topic(signature):
+    return '0x' + sha3(signature).hex()
+
+def address_topic(address):
+    return '0x' + address[2:].rjust(64, '0')
+
+def transfer_log(address, from_address, to_address, value):
+    return {"address": address,
+            "topics": [topic("Transfer(address,address,uint256)"),
+                       address_topic(from_address), address_topic(to_address)],
+            "data": '0x' + encode_abi(['uint256'], [value]).hex()}
+
+def noted_log(address, note, id, flag):
+    return {"address": address,
+            "topics": [topic("Noted(string,int64,bool)"), '0x' + (id % 2 ** 256).to_bytes(32, 'big').hex()],
+            "data": '0x' + encode_abi(['string', 'bool'], [note, flag]).hex()}
+
+class EventsTest(unittest.TestCase):
+
+    def test_decode_logs(self):
+
+        contract = Contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS)
+
+        noted = {"address": TOKEN_ADDRESS,
+                 "topics": [topic("Noted(string,int64,bool)"), '0x' + (-5 % 2 ** 256).to_bytes(32, 'big').hex()],
+                 "data": '0x' + encode_abi(['string', 'bool'], [b'hello', True]).hex()}
+        unknown = {"address": TOKEN_ADDRESS, "topics": [topic("Other()")], "data": "0x"}
+        logs = [transfer_log(TOKEN_ADDRESS, FROM_ADDRESS, TO_ADDRESS, 10 ** 18),
+                # from another contract, so should be skipped
+                transfer_log(OTHER_TOKEN_ADDRESS, FROM_ADDRESS, TO_ADDRESS, 1),
+                unknown,
+                noted]
+
+        decoded = contract.decode_logs(logs)
+
+        self.assertEqual(len(decoded), 2)
+        self.assertEqual(decoded[0].event, 'Transfer')
+        self.assertEqual(decoded[0].args, {'_from': FROM_ADDRESS, '_to': TO_ADDRESS, '_value': 10 ** 18})
+        self.assertIs(decoded[0].log, logs[0])
+        self.assertEqual(decoded[1].event, 'Noted')
+        self.assertEqual(decoded[1].args, {'note': b'hello', 'id': -5, 'flag': True})
+
+    def test_registry(self):
+
+        token1 = Contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS)
+        token2 = Contract(abi=TOKEN_ABI, address=OTHER_TOKEN_ADDRESS.upper().replace('0X', '0x'))
+
+        registry = EventRegistry()
+        registry.add(token1)
+
+        logs = [transfer_log(TOKEN_ADDRESS, FROM_ADDRESS, TO_ADDRESS, 1),
+                transfer_log(OTHER_TOKEN_ADDRESS, FROM_ADDRESS, TO_ADDRESS, 2)]
+        self.assertEqual([d.args['_value'] for d in registry.decode_logs(logs)], [1])
+
+        registry.add(token2)
+        self.assertEqual([d.args['_value'] for d in registry.decode_logs(logs)], [1, 2])
+
+        registry.remove(token1)
+        self.assertEqual([d.args['_value'] for d in registry.decode_logs(logs)], [2])
+
+        # events registered without an address match any contract
+        registry = EventRegistry()
+        registry.add_events(token1.event_table)
+        self.assertEqual([d.args['_value'] for d in registry.decode_logs(logs)], [1, 2])
+
+class MismatchedEventsTest(unittest.TestCase):
+
+    def test_same_topic_different_layout(self):
+
+        # ERC721's Transfer has the same event id as ERC20's, but the token id is indexed
+        nft = Contract(abi=NFT_ABI, address=OTHER_TOKEN_ADDRESS)
+        token = Contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS)
+        nft_log = {"address": OTHER_TOKEN_ADDRESS,
+                   "topics": [topic("Transfer(address,address,uint256)"), address_topic(FROM_ADDRESS),
+                              address_topic(TO_ADDRESS), '0x' + (7).to_bytes(32, 'big').hex()],
+                   "data": "0x"}
+        token_log = transfer_log(TOKEN_ADDRESS, FROM_ADDRESS, TO_ADDRESS, 10)
+        # right number of topics but no data
+        truncated_log = dict(token_log, data="0x")
+
+        registry = EventRegistry()
+        registry.add_events(token.event_table)
+        decoded = registry.decode_logs([nft_log, token_log, truncated_log])
+        self.assertEqual([d.log for d in decoded], [token_log])
+
+        registry = EventRegistry()
+        registry.add_events(nft.event_table)
+        decoded = registry.decode_logs([nft_log, token_log])
+        self.assertEqual([d.log for d in decoded], [nft_log])
+        self.assertEqual(decoded[0].args['_tokenId'], 7)
+
+        self.assertIsNone(decode_log(token.event_table, nft_log))
+        self.assertIsNone(decode_log(nft.event_table, token_log))
+
+class ContractEventsTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = FakeNode()
+        self.node.mine([transfer_log(TOKEN_ADDRESS, FROM_ADDRESS, TO_ADDRESS, 1),
+                        noted_log(TOKEN_ADDRESS, b'first', 1, True)])
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    async def check_events(self, contract):
+
+        events = contract.events('Noted', from_block=1, poll_interval=0.01)
+        try:
+            decoded = await events.__anext__()
+            self.assertEqual((decoded.event, decoded.args['note']), ('Noted', b'first'))
+
+            self.node.mine([transfer_log(TOKEN_ADDRESS, FROM_ADDRESS, TO_ADDRESS, 2),
+                            noted_log(TOKEN_ADDRESS, b'second', 2, False),
+                            transfer_log(TOKEN_ADDRESS, FROM_ADDRESS, TO_ADDRESS, 3)])
+            decoded = await events.__anext__()
+            self.assertEqual((decoded.event, decoded.args['note']), ('Noted', b'second'))
+        finally:
+            await events.aclose()
+
+    @gen_test(timeout=10)
+    async def test_events(self):
+
+        contract = Contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS, client=JsonRPCClient(self.get_url('/')))
+        await self.check_events(contract)
+        # the filter installed for the stream is removed again
+        self.assertEqual(self.node.filters, {})
+
+    @gen_test(timeout=10)
+    async def test_events_given_filter(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        # matches every event from the contract
+        filter_id = await client.eth_newFilter(fromBlock=1, address=TOKEN_ADDRESS)
+        contract = Contract(abi=TOKEN_ABI, address=TOKEN_ADDRESS, log_filter_id=filter_id, client=client)
+        await self.check_events(contract)
+        self.assertIn(filter_id, self.node.filters)
@@ -0,0 +1,99 @@
+import os
+import tempfile
+
+from asyncbb.test.base import AsyncHandlerTest
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum.export import BlockExporter, read_chunk, read_column
+
+from .fakenode import FakeNode, FakeNodeHandler
+
+def make_transaction(number, index):
+    return {"hash": "0x{:064x}".format(number * 1000 + index),
+            "transactionIndex": hex(index),
+            "from": "0x{:040x}".format(index + 1),
+            "to": None if index == 0 else "0x{:040x}".format(number),
+            "value": hex(10 ** 20 + index),
+            "gas": hex(21000),
+            "gasPrice": hex(20000000000),
+            "nonce": hex(number)}
+
+class ExportTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = FakeNode(block_number=200)
+        for number in range(0, 200, 3):
+            self.node.blocks[number] = {
+                "number": hex(number), "hash": "0x{:064x}".format(number), "timestamp": hex(1500000000 + number),
+                "gasUsed": hex(21000 * (number % 4)), "miner": "0x{:040x}".format(number),
+                "transactions": [make_transaction(number, i) for i in range(number % 4)]}
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    @gen_test
+    async def test_export(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        with tempfile.TemporaryDirectory() as path:
+            exporter = BlockExporter(client, path, chunk_size=40, batch_size=15)
+            chunks = await exporter.export(10, 110)
+            self.assertEqual([os.path.basename(chunk) for chunk in chunks],
+                             ['000000000010-000000000049', '000000000050-000000000089', '000000000090-000000000109'])
+
+            blocks = read_chunk(chunks[1])
+            self.assertEqual(list(blocks['number']), list(range(50, 90)))
+            self.assertEqual(blocks['timestamp'][1], 1500000000 + 51)
+            self.assertEqual(blocks['timestamp'][0], 1500000000 + 50 * 15)
+            self.assertEqual(blocks['hash'][-1], (89).to_bytes(32, 'big'))
+            self.assertEqual(blocks['miner'][0], b'\x00' * 20)
+            self.assertEqual(sum(blocks['tx_count']), sum(n % 4 for n in range(51, 90, 3)))
+
+            txs = read_chunk(chunks[1], 'transactions')
+            self.assertEqual(len(txs['hash']), sum(n % 4 for n in range(51, 90, 3)))
+            self.assertEqual(txs['block_number'][0], 51)
+            self.assertEqual(txs['to'][0], b'\x00' * 20)
+            self.assertEqual(txs['to'][1], (51).to_bytes(20, 'big'))
+            self.assertEqual(int.from_bytes(txs['value'][1], 'big'), 10 ** 20 + 1)
+            self.assertEqual(txs['nonce'][-1], 87)
+
+            # the data starts on a 64 byte boundary as numpy expects
+            column = read_column(os.path.join(chunks[0], 'blocks.number.npy'))
+            with open(os.path.join(chunks[0], 'blocks.number.npy'), 'rb') as f:
+                self.assertEqual((os.fstat(f.fileno()).st_size - 40 * 8) % 64, 0)
+            self.assertEqual(column[-1], 49)
+            column.close()
+
+            for chunk in (blocks, txs):
+                for column in chunk.values():
+                    column.close()
+
+    @gen_test
+    async def test_bounded_blocks(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        with tempfile.TemporaryDirectory() as path:
+            exporter = BlockExporter(client, path, chunk_size=100, batch_size=5, concurrency=3)
+            fetch_batch, append_blocks = exporter._fetch_batch, exporter._append_blocks
+            held = []
+            peak = 0
+
+            async def tracked_fetch(first, last):
+                nonlocal peak
+                blocks = await fetch_batch(first, last)
+                held.append(len(blocks))
+                peak = max(peak, sum(held))
+                return blocks
+
+            def tracked_append(block_columns, tx_columns, blocks):
+                held.remove(len(blocks))
+                append_blocks(block_columns, tx_columns, blocks)
+
+            exporter._fetch_batch, exporter._append_blocks = tracked_fetch, tracked_append
+            chunks = await exporter.export(0, 100)
+
+            self.assertLessEqual(peak, 15)
+            self.assertEqual(held, [])
+            blocks = read_chunk(chunks[0])
+            self.assertEqual(list(blocks['number']), list(range(100)))
+            for column in blocks.values():
+                column.close()
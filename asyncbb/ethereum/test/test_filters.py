@@ -0,0 +1,106 @@
+import asyncio
+
+from asyncbb.test.base import AsyncHandlerTest
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum.filters import FilterManager
+
+from .fakenode import FakeNode, FakeNodeHandler
+
+X = "0x" + "11" * 20
+Y = "0x" + "22" * 20
+T1 = "0x" + "a1" * 32
+T2 = "0x" + "a2" * 32
+Z = "0x" + "ff" * 32
+
+def make_log(address, *topics):
+    return {"address": address, "topics": list(topics), "data": "0x"}
+
+class FilterManagerTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = FakeNode(block_number=100)
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    async def drain(self, subscription, count):
+        return [await asyncio.wait_for(subscription.get(), 5) for _ in range(count)]
+
+    @gen_test(timeout=30)
+    async def test_shared_filters(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        manager = FilterManager(client, poll_interval=0.01)
+
+        sub_a = manager.subscribe_logs(address=X, topics=[T1])
+        sub_b = manager.subscribe_logs(address=[Y], topics=[[T1, T2], None, Z])
+        others = [manager.subscribe_logs(address=X, topics=[T1]) for _ in range(20)]
+        blocks = manager.subscribe_blocks()
+        await asyncio.sleep(0.05)
+
+        # one merged log filter and one block filter for all 23 subscriptions
+        self.assertEqual(len(self.node.filters), 2)
+        self.assertEqual(manager.node_filters, 2)
+
+        self.node.mine([make_log(X, T1), make_log(Y, T2, T1, Z), make_log(X, T2), make_log(Y, T1)])
+        log_a, = await self.drain(sub_a, 1)
+        self.assertEqual(log_a['address'], X)
+        log_b, = await self.drain(sub_b, 1)
+        self.assertEqual(log_b['topics'], [T2, T1, Z])
+        self.assertEqual(await self.drain(blocks, 1), ["0x{:064x}".format(101)])
+        for sub in others:
+            self.assertEqual(await self.drain(sub, 1), [log_a])
+
+        await asyncio.sleep(0.05)
+        # the logs matching the merged filter but no subscription were dropped
+        self.assertTrue(sub_a.queue.empty() and sub_b.queue.empty())
+
+        # one batched request per poll, no matter how many subscriptions.
+        # the background loop is parked so it can't poll in between
+        manager.poll_interval = 30
+        await asyncio.sleep(0.05)
+        self.node.requests = []
+        polls = manager.polls
+        for _ in range(3):
+            await manager.poll()
+        self.assertEqual(manager.polls - polls, 3)
+        self.assertEqual(self.node.requests.count("eth_getFilterChanges"), 6)
+
+        await manager.stop()
+        self.assertEqual(self.node.filters, {})
+
+    @gen_test(timeout=30)
+    async def test_reinstall(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        manager = FilterManager(client, poll_interval=0.01)
+        sub = manager.subscribe_logs(address=X)
+        await asyncio.sleep(0.05)
+
+        # the node forgets the filter, and a log arrives before the next poll
+        self.node.filters.clear()
+        self.node.mine([make_log(X, T1)])
+        self.node.mine([make_log(X, T2)])
+
+        logs = await self.drain(sub, 2)
+        self.assertEqual([log['topics'] for log in logs], [[T1], [T2]])
+        self.assertEqual(manager.installs, 2)
+
+        # nothing is delivered twice
+        self.node.mine([make_log(X, Z)])
+        log, = await self.drain(sub, 1)
+        self.assertEqual(log['topics'], [Z])
+        await asyncio.sleep(0.05)
+        self.assertTrue(sub.queue.empty())
+
+        # a subscription widening the filter gets logs since the last poll
+        sub_y = manager.subscribe_logs(address=Y)
+        self.node.mine([make_log(Y, T1)])
+        log, = await self.drain(sub_y, 1)
+        self.assertEqual(log['address'], Y)
+
+        sub.close()
+        sub_y.close()
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.node.filters, {})
+        await manager.stop()
@@ -0,0 +1,83 @@
+import binascii
+import random
+import regex
+import unittest
+
+from asyncbb.ethereum import hexcodec
+from asyncbb.ethereum.hexcodec import validate_hex
+
+HEX_RE = regex.compile("(0x)?([0-9a-fA-F]+)")
+
+def reference_validate_hex(value, length=None):
+    """validate_hex as it was before the fast paths"""
+    if isinstance(value, int):
+        value = hex(value)[2:]
+    if isinstance(value, bytes):
+        value = binascii.b2a_hex(value).decode('ascii')
+    else:
+        m = HEX_RE.match(value)
+        if m:
+            value = m.group(2)
+        else:
+            raise ValueError("Unable to convert value to valid hex string")
+    if length:
+        if len(value) > length * 2:
+            raise ValueError("Value is too long")
+        return '0x' + value.rjust(length * 2, '0')
+    return '0x' + value
+
+def outcome(fn, value, length):
+    try:
+        return ('ok', fn(value, length))
+    except Exception as e:
+        return (type(e), str(e))
+
+def random_value(rng):
+    kind = rng.randrange(4)
+    if kind == 0:
+        return rng.choice([0, 1, -1, rng.getrandbits(rng.randrange(1, 300)), -rng.getrandbits(64)])
+    if kind == 1:
+        return bytes(rng.getrandbits(8) for _ in range(rng.randrange(0, 40)))
+    if kind == 2:
+        # mostly normalized strings, of the sizes of addresses and hashes
+        digits = ''.join(rng.choice("0123456789abcdefABCDEF") for _ in range(rng.choice([0, 1, 39, 40, 63, 64, 65])))
+        return rng.choice(['0x', '', '0X']) + digits
+    return ''.join(rng.choice("0123456789abcdefxXg -") for _ in range(rng.randrange(0, 12)))
+
+class HexCodecTest(unittest.TestCase):
+
+    def test_matches_reference(self):
+
+        rng = random.Random(4)
+        for _ in range(50000):
+            value = random_value(rng)
+            length = rng.choice([None, 0, 1, 20, 32])
+            self.assertEqual(outcome(validate_hex, value, length), outcome(reference_validate_hex, value, length),
+                             (value, length))
+
+    def test_edge_cases(self):
+
+        for value in ["0x", "0x0", "0xzz", "0x12zz", "0X12", "12", "", "x", "0x-1", "0x 1", "0x1_0", True, 10 ** 80]:
+            for length in (None, 1, 32):
+                self.assertEqual(outcome(validate_hex, value, length), outcome(reference_validate_hex, value, length),
+                                 (value, length))
+
+    def test_normalized_strings_are_not_copied(self):
+
+        address = "0x" + "ab" * 20
+        self.assertIs(validate_hex(address), address)
+        self.assertIs(validate_hex(address, 20), address)
+
+    def test_bulk(self):
+
+        self.assertEqual(hexcodec.validate_hex_list([1, b'\x02', "0x3"], 1), ["0x01", "0x02", "0x03"])
+        self.assertEqual(hexcodec.decode_ints(["0x0", "0xff", "0x10"]), [0, 255, 16])
+        self.assertEqual(hexcodec.encode_ints([0, 255]), ["0x0", "0xff"])
+        self.assertEqual(hexcodec.decode_int(hexcodec.encode_int(10 ** 30)), 10 ** 30)
+
+    def test_intern_address(self):
+
+        address = hexcodec.intern_address("0x" + "AB" * 20)
+        self.assertEqual(address, "0x" + "ab" * 20)
+        self.assertIs(hexcodec.intern_address("0x" + "AB" * 20), address)
+        self.assertIs(hexcodec.intern_address("0x" + "aB" * 20), address)
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+import unittest
+
+HEAVY_PACKAGES = ("ethereum", "rlp", "ethutils", "regex")
+
+CLIENT_MODULES = ["asyncbb.ethereum", "asyncbb.ethereum.client", "asyncbb.ethereum.contract",
+                  "asyncbb.ethereum.filters", "asyncbb.ethereum.pending", "asyncbb.ethereum.pipeline",
+                  "asyncbb.ethereum.export", "asyncbb.ethereum.tracers", "asyncbb.ethereum.compiler"]
+
+class ImportTest(unittest.TestCase):
+
+    def test_client_path_is_light(self):
+
+        # in a fresh interpreter, since the other tests have loaded everything
+        code = "import sys\n{}\nprint(' '.join(sorted(m for m in sys.modules if m.split('.')[0] in {!r})))".format(
+            "\n".join("import {}".format(module) for module in CLIENT_MODULES), HEAVY_PACKAGES)
+        output = subprocess.check_output([sys.executable, "-c", code], universal_newlines=True)
+        self.assertEqual(output.strip(), "")
+
+    def test_lazy_names(self):
+
+        from asyncbb.ethereum.abicodec import fix_address_decoding
+        from asyncbb.ethereum import contract
+        self.assertIs(contract.fix_address_decoding, fix_address_decoding)
+        with self.assertRaises(AttributeError):
+            contract.does_not_exist
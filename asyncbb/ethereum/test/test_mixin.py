@@ -0,0 +1,61 @@
+import asyncio
+
+from asyncbb.test.base import AsyncHandlerTest
+from asyncbb.handlers import BaseHandler
+from tornado.testing import gen_test
+
+from asyncbb.ethereum import EthereumMixin, start_ethereum_client, stop_ethereum_client
+
+from .fakenode import FakeNode, FakeNodeHandler
+
+ADDRESS = "0x39bf9e501e61440b4b268d7b2e9aa2458dd201bb"
+
+class Handler(EthereumMixin, BaseHandler):
+
+    clients = []
+
+    async def get(self):
+
+        self.clients.append(self.eth)
+        balance = await self.eth.eth_getBalance(ADDRESS)
+        self.write(str(balance))
+
+class MixinTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = FakeNode(block_number=1234)
+        self.node.balances[ADDRESS] = 100
+        return [(r'^/$', Handler), (r'^/node$', FakeNodeHandler, {'node': self.node})]
+
+    def setUp(self):
+        super().setUp()
+        self._app.config['ethereum'] = {'url': self.get_url('/node')}
+        Handler.clients = []
+
+    @gen_test
+    async def test_shared_client(self):
+
+        client = await start_ethereum_client(self._app)
+        self.assertEqual(self._app.eth_client_version, "FakeNode/v0.0.1")
+        self.assertEqual(self._app.eth_block_number, 1234)
+
+        for _ in range(3):
+            resp = await self.fetch('/')
+            self.assertEqual(resp.body, b'100')
+        self.assertEqual(Handler.clients, [client] * 3)
+
+        # replacing the config creates a new client
+        self._app.config['ethereum'] = {'url': self.get_url('/node')}
+        await self.fetch('/')
+        self.assertIsNot(Handler.clients[-1], client)
+
+    @gen_test
+    async def test_drain(self):
+
+        client = await start_ethereum_client(self._app)
+        calls = [asyncio.ensure_future(client.eth_getBalance(ADDRESS)) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.assertEqual(client.in_flight, 5)
+        self.assertTrue(await stop_ethereum_client(self._app))
+        self.assertEqual(client.in_flight, 0)
+        self.assertTrue(all(call.done() for call in calls))
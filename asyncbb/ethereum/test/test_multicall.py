@@ -0,0 +1,154 @@
+import os
+import rlp
+import tempfile
+
+from unittest import mock
+
+from asyncbb.test.base import AsyncHandlerTest
+from tornado.testing import gen_test
+
+from ethereum.abi import encode_abi, decode_abi
+from ethereum.transactions import Transaction
+from ethereum.utils import sha3
+from ethutils import data_decoder, data_encoder
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum.contract import Contract
+from asyncbb.ethereum.multicall import Multicall
+
+from .fakenode import FakeNode, FakeNodeHandler, FakeNodeError
+from .fakesolc import write_fake_solc
+from .faucet import FAUCET_PRIVATE_KEY
+from .test_events import TOKEN_ABI
+
+MULTICALL_ADDRESS = "0x00000000000000000000000000000000000000ca"
+TOKEN1 = "0x39bf9e501e61440b4b268d7b2e9aa2458dd201bb"
+TOKEN2 = "0x0100267048677a95cf91b487d9b65708c105dfe6"
+# an address that reverts everything
+BROKEN = "0x0200d3013d64c48d1948f0bc8631056df5fc1e7e"
+# an address with no code
+EMPTY = "0x030086615f23c951306728d8cc0a9004b47de00b"
+OWNER = "0xde3d2d9dd52ea80f7799ef4791063a5458d13913"
+
+BALANCE_OF = sha3("balanceOf(address)")[:4]
+
+class TokenNode(FakeNode):
+    """Fakes eth_call for balanceOf on a couple of token addresses and for
+    the Multicall contract aggregating them"""
+
+    token_balances = {TOKEN1: 100, TOKEN2: 200}
+
+    def call(self, to, data):
+        if to == BROKEN:
+            return False, b''
+        if to not in self.token_balances:
+            return True, b''
+        assert data[:4] == BALANCE_OF
+        return True, encode_abi(['uint256'], [self.token_balances[to]])
+
+    def eth_call(self, callobj, block):
+        to = callobj['to'].lower()
+        data = bytes.fromhex(callobj['data'][2:])
+        if to == MULTICALL_ADDRESS:
+            calls, = decode_abi(['bytes'], data[4:])
+            results = []
+            pos = 0
+            while pos < len(calls):
+                target = '0x' + calls[pos:pos + 20].hex()
+                length = int.from_bytes(calls[pos + 20:pos + 24], 'big')
+                success, result = self.call(target, calls[pos + 24:pos + 24 + length])
+                results.append(bytes([success]) + len(result).to_bytes(4, 'big') + result)
+                pos += 24 + length
+            return '0x' + encode_abi(['uint256', 'bytes'], [int(block, 16), b''.join(results)]).hex()
+        success, result = self.call(to, data)
+        if not success:
+            raise FakeNodeError(-32015, "VM execution error.")
+        return '0x' + result.hex()
+
+class DeployNode(FakeNode):
+    """mines every transaction immediately, and reports the code of the
+    last contract created at any address"""
+
+    deployed = None
+
+    def eth_getBalance(self, address, block):
+        return hex(10 ** 18)
+
+    def eth_estimateGas(self, tx):
+        return hex(100000)
+
+    def eth_sendRawTransaction(self, raw):
+        tx_hash = super().eth_sendRawTransaction(raw)
+        tx = rlp.decode(data_decoder(raw), Transaction)
+        if tx.to == b'':
+            self.deployed = data_encoder(tx.data)
+        return tx_hash
+
+    def eth_getTransactionByHash(self, tx_hash):
+        if tx_hash in self.transactions:
+            return {"hash": tx_hash, "blockNumber": hex(self.block_number)}
+        return None
+
+    def eth_getCode(self, address, block):
+        return self.deployed or "0x"
+
+class MulticallDeployTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = DeployNode()
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    @gen_test(timeout=30)
+    async def test_deploy(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write_fake_solc(tmpdir)
+            with mock.patch.dict(os.environ, {'PATH': tmpdir + os.pathsep + os.environ.get('PATH', '')}):
+                address = await Multicall.deploy(client, FAUCET_PRIVATE_KEY, cache=None)
+
+        self.assertEqual(len(address), 42)
+        # the fake solc's bytecode, with no constructor arguments appended
+        self.assertEqual(self.node.deployed, "0x6060")
+        self.assertEqual(len(self.node.transactions), 1)
+
+class MulticallTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = TokenNode()
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    async def run_multicall(self, **kwargs):
+
+        client = JsonRPCClient(self.get_url('/'))
+        multicall = Multicall(client, **kwargs)
+        for address in (TOKEN1, BROKEN, TOKEN2, EMPTY):
+            contract = Contract(abi=TOKEN_ABI, address=address, client=client)
+            multicall.add(contract.balanceOf, OWNER)
+
+        results = await multicall.execute()
+        self.assertEqual(multicall.block_number, self.node.block_number)
+        return results
+
+    @gen_test
+    async def test_aggregated(self):
+
+        results = await self.run_multicall(address=MULTICALL_ADDRESS)
+        self.assertEqual(results, [(True, 100), (False, None), (True, 200), (False, None)])
+        self.assertEqual(self.node.requests.count('eth_call'), 1)
+
+    @gen_test
+    async def test_batched_fallback(self):
+
+        results = await self.run_multicall(batch_size=3)
+        self.assertEqual(results, [(True, 100), (False, None), (True, 200), (False, None)])
+        self.assertEqual(self.node.requests.count('eth_call'), 4)
+        # eth_blockNumber plus two batches
+        self.assertEqual(self.node.http_requests, 3)
+
+    @gen_test
+    async def test_missing_aggregator(self):
+
+        # no code at the address, so the calls are made individually
+        results = await self.run_multicall(address=EMPTY)
+        self.assertEqual(results, [(True, 100), (False, None), (True, 200), (False, None)])
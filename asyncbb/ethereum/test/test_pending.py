@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+
+from asyncbb.test.base import AsyncHandlerTest
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum.pending import PendingTxStream, RecentlySeen, DROP_NEWEST
+
+from .fakenode import FakeNode, FakeNodeHandler
+
+def tx_hash(i):
+    return "0x{:064x}".format(i)
+
+class MempoolNode(FakeNode):
+
+    def __init__(self):
+        super().__init__()
+        self.bodies = {}
+
+    def eth_getTransactionByHash(self, tx_hash):
+        return self.bodies.get(tx_hash)
+
+    def broadcast(self, start, end, mined=()):
+        for i in range(start, end):
+            self.bodies[tx_hash(i)] = {"hash": tx_hash(i), "value": hex(i),
+                                       "blockNumber": hex(self.block_number) if i in mined else None}
+            self.pending.append(tx_hash(i))
+
+class EndingClient(JsonRPCClient):
+    """its filter watches end after the first changes"""
+
+    def watch(self, filter_id, **kwargs):
+        watch = super().watch(filter_id, **kwargs)
+
+        async def changes():
+            yield await watch.__anext__()
+
+        return changes()
+
+class FailingClient(JsonRPCClient):
+    """its first filter poll fails as if the node went away"""
+
+    failures = 1
+
+    async def eth_getFilterChanges(self, filter_id):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("connection reset")
+        return await super().eth_getFilterChanges(filter_id)
+
+class TestRecentlySeen(unittest.TestCase):
+
+    def test_bounded(self):
+
+        seen = RecentlySeen(3)
+        self.assertTrue(seen.add('a'))
+        self.assertFalse(seen.add('a'))
+        for key in 'bcd':
+            seen.add(key)
+        self.assertEqual(len(seen), 3)
+        self.assertNotIn('a', seen)
+        self.assertTrue(seen.add('a'))
+
+class PendingTxStreamTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = MempoolNode()
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    @gen_test(timeout=30)
+    async def test_stream(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        stream = PendingTxStream(client, poll_interval=0.01, batch_size=10)
+        first = stream.subscribe()
+        second = stream.subscribe(maxsize=5, overflow=DROP_NEWEST)
+        await asyncio.sleep(0.05)
+
+        # duplicates, already mined and vanished transactions are skipped
+        self.node.broadcast(0, 30, mined={3, 4})
+        self.node.pending.extend([tx_hash(1), tx_hash(2), tx_hash(99)])
+
+        txs = [await asyncio.wait_for(first.get(), 5) for _ in range(28)]
+        self.assertEqual(sorted(int(tx['value'], 16) for tx in txs), [i for i in range(30) if i not in (3, 4)])
+        self.assertEqual(stream.duplicates, 2)
+        self.assertEqual(stream.mined, 2)
+        self.assertEqual(stream.missing, 1)
+        # every distinct hash is looked up exactly once
+        self.assertEqual(self.node.requests.count("eth_getTransactionByHash"), 31)
+
+        # the bounded subscription kept the first 5 and dropped the rest
+        self.assertEqual(second.queue.qsize(), 5)
+        self.assertEqual(second.dropped, 23)
+
+        await stream.stop()
+        self.assertEqual(self.node.filters, {})
+
+    @gen_test(timeout=30)
+    async def test_watch_ends(self):
+
+        stream = PendingTxStream(EndingClient(self.get_url('/')), poll_interval=0.01, batch_size=2)
+        first = stream.subscribe()
+        second = stream.subscribe()
+        await asyncio.sleep(0.05)
+        self.node.broadcast(0, 5)
+
+        txs = await asyncio.wait_for(self.collect(first), 5)
+        self.assertEqual(sorted(int(tx['value'], 16) for tx in txs), list(range(5)))
+        self.assertEqual(len(await asyncio.wait_for(self.collect(second), 5)), 5)
+        self.assertTrue(first.ended)
+        with self.assertRaises(StopAsyncIteration):
+            await first.get()
+
+        await stream._task
+        self.assertEqual(stream.errors, 0)
+        self.assertEqual(self.node.filters, {})
+
+    async def collect(self, subscription):
+        return [tx async for tx in subscription]
+
+    @gen_test(timeout=30)
+    async def test_recovers_from_errors(self):
+
+        stream = PendingTxStream(FailingClient(self.get_url('/')), poll_interval=0.01)
+        subscription = stream.subscribe()
+        self.node.broadcast(0, 3)
+        # wait for the filter to be replaced after the failed poll
+        while self.node.requests.count("eth_newPendingTransactionFilter") < 2:
+            await asyncio.sleep(0.01)
+        self.node.broadcast(3, 5)
+
+        txs = [await asyncio.wait_for(subscription.get(), 5) for _ in range(2)]
+        self.assertEqual(sorted(int(tx['value'], 16) for tx in txs), [3, 4])
+        self.assertEqual(stream.errors, 1)
+        self.assertIsInstance(stream.last_error, OSError)
+        self.assertEqual(self.node.requests.count("eth_newPendingTransactionFilter"), 2)
+        # the failed filter was uninstalled when it was replaced
+        self.assertEqual(len(self.node.filters), 1)
+
+        await stream.stop()
+        self.assertTrue(subscription.ended)
+        self.assertEqual(self.node.filters, {})
@@ -0,0 +1,163 @@
+import os
+import rlp
+import tempfile
+
+from asyncbb.test.base import AsyncHandlerTest
+from ethereum.transactions import Transaction
+from ethutils import data_decoder
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient, JsonRPCError
+from asyncbb.ethereum.pipeline import NonceGapError, PipelineJournal, TransactionPipeline
+
+from .fakenode import FakeNode, FakeNodeError, FakeNodeHandler
+from .faucet import FAUCET_PRIVATE_KEY
+
+TO_ADDRESS = "0x39bf9e501e61440b4b268d7b2e9aa2458dd201bb"
+
+class NonceNode(FakeNode):
+    """mines transactions in nonce order, holding back any after a gap, and
+    rejects those sending any of `rejected_values` wei"""
+
+    def __init__(self):
+        super().__init__()
+        self.rejected_values = ()
+        self.next_nonce = 0
+        self.queued = {}
+
+    def eth_getTransactionCount(self, address, block):
+        return hex(self.next_nonce)
+
+    def eth_sendRawTransaction(self, raw):
+        tx = rlp.decode(data_decoder(raw), Transaction)
+        if tx.value in self.rejected_values:
+            raise FakeNodeError(-32000, "insufficient funds for gas * price + value")
+        tx_hash = super().eth_sendRawTransaction(raw)
+        self.queued[tx.nonce] = (tx_hash, self.receipts.pop(tx_hash))
+        while self.next_nonce in self.queued:
+            mined, receipt = self.queued.pop(self.next_nonce)
+            self.receipts[mined] = receipt
+            self.next_nonce += 1
+        return tx_hash
+
+class PipelineTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = NonceNode()
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    @gen_test(timeout=30)
+    async def test_pipeline(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        pipeline = TransactionPipeline(client, FAUCET_PRIVATE_KEY, batch_size=20,
+                                       max_in_flight=50, poll_interval=0.01)
+
+        results = [result async for result in pipeline.run((TO_ADDRESS, i) for i in range(110))]
+
+        self.assertEqual(len(results), 110)
+        self.assertEqual(sorted(r.index for r in results), list(range(110)))
+        self.assertEqual(sorted(r.nonce for r in results), list(range(110)))
+        self.assertTrue(all(r.error is None and r.receipt is not None for r in results))
+        self.assertEqual(len(self.node.transactions), 110)
+        # sends and receipt polls are batched
+        self.assertLess(self.node.http_requests, 40)
+
+    @gen_test(timeout=30)
+    async def test_pipeline_resume(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        intents = [(TO_ADDRESS, i) for i in range(60)]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            journal = os.path.join(tmpdir, 'journal')
+
+            pipeline = TransactionPipeline(client, FAUCET_PRIVATE_KEY, batch_size=20,
+                                           poll_interval=0.01, journal=journal)
+            first = []
+            run = pipeline.run(intents)
+            async for result in run:
+                first.append(result)
+                if len(first) == 5:
+                    # simulate a crash part way through the run
+                    break
+            await run.aclose()
+
+            pipeline = TransactionPipeline(client, FAUCET_PRIVATE_KEY, batch_size=20,
+                                           poll_interval=0.01, journal=journal)
+            second = [result async for result in pipeline.run(intents)]
+
+        # nothing was sent twice, and nothing reported twice
+        self.assertEqual(len(self.node.transactions), 60)
+        self.assertFalse({r.index for r in first} & {r.index for r in second})
+        self.assertTrue(all(r.error is None for r in second))
+
+    @gen_test(timeout=10)
+    async def test_batch_larger_than_window(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        pipeline = TransactionPipeline(client, FAUCET_PRIVATE_KEY, batch_size=20,
+                                       max_in_flight=5, poll_interval=0.01)
+
+        results = [result async for result in pipeline.run((TO_ADDRESS, i) for i in range(30))]
+
+        self.assertEqual(sorted(r.index for r in results), list(range(30)))
+        self.assertTrue(all(r.error is None for r in results))
+
+    @gen_test(timeout=10)
+    async def test_rejected_nonce_reused(self):
+
+        self.node.rejected_values = {7}
+        client = JsonRPCClient(self.get_url('/'))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            journal = os.path.join(tmpdir, 'journal')
+            pipeline = TransactionPipeline(client, FAUCET_PRIVATE_KEY, batch_size=10,
+                                           poll_interval=0.01, journal=journal)
+            results = {r.index: r async for r in pipeline.run((TO_ADDRESS, i) for i in range(30))}
+
+            # the rejected transaction is signed again on resume
+            self.assertNotIn(7, PipelineJournal(journal).signed)
+
+        self.assertEqual(sorted(results), list(range(30)))
+        self.assertIsInstance(results[7].error, JsonRPCError)
+        # the next intent took over nonce 7, so everything after it was mined
+        self.assertEqual(results[10].nonce, 7)
+        self.assertEqual(sorted(r.nonce for i, r in results.items() if i != 7), list(range(29)))
+        self.assertTrue(all(r.receipt is not None for i, r in results.items() if i != 7))
+        self.assertEqual(self.node.next_nonce, 29)
+
+    @gen_test(timeout=10)
+    async def test_rejected_nonce_gap(self):
+
+        self.node.rejected_values = {7}
+        client = JsonRPCClient(self.get_url('/'))
+        pipeline = TransactionPipeline(client, FAUCET_PRIVATE_KEY, batch_size=10, poll_interval=0.01)
+
+        results = {r.index: r async for r in pipeline.run((TO_ADDRESS, i) for i in range(10))}
+
+        self.assertEqual(sorted(results), list(range(10)))
+        self.assertIsInstance(results[7].error, JsonRPCError)
+        # nothing was left to take nonce 7, so it was filled with a zero value
+        # transfer and the transactions behind it were still mined
+        self.assertTrue(all(results[i].receipt is not None for i in range(10) if i != 7))
+        self.assertEqual(self.node.next_nonce, 10)
+        self.assertEqual(len(self.node.transactions), 10)
+
+    @gen_test(timeout=10)
+    async def test_unfilled_nonce_gap(self):
+
+        # rejects the transfer used to fill the gap as well
+        self.node.rejected_values = {0, 8}
+        client = JsonRPCClient(self.get_url('/'))
+        pipeline = TransactionPipeline(client, FAUCET_PRIVATE_KEY, batch_size=10, poll_interval=0.01)
+
+        results = {r.index: r async for r in pipeline.run((TO_ADDRESS, i) for i in range(1, 11))}
+
+        self.assertEqual(sorted(results), list(range(10)))
+        self.assertTrue(all(results[i].receipt is not None for i in range(7)))
+        self.assertIsInstance(results[7].error, JsonRPCError)
+        # still queued on the node behind nonce 7
+        self.assertIsInstance(results[8].error, NonceGapError)
+        self.assertIsInstance(results[9].error, NonceGapError)
+        self.assertEqual(sorted(self.node.queued), [8, 9])
@@ -0,0 +1,76 @@
+import json
+import unittest
+
+from unittest import mock
+
+from ethereum.abi import ContractTranslator
+
+from asyncbb.ethereum import registry
+from asyncbb.ethereum.registry import ABIRegistry, abi_key, get_method_table
+
+from .test_events import TOKEN_ABI
+
+def reordered(value):
+    """a copy of a json value with every object's keys in reverse order"""
+    if isinstance(value, dict):
+        return {key: reordered(value[key]) for key in reversed(list(value))}
+    if isinstance(value, list):
+        return [reordered(item) for item in value]
+    return value
+
+class ABIRegistryTest(unittest.TestCase):
+
+    def test_abi_key(self):
+
+        key = abi_key(TOKEN_ABI)
+        self.assertEqual(abi_key(reordered(TOKEN_ABI)), key)
+        self.assertEqual(abi_key(json.dumps(TOKEN_ABI, indent=4)), key)
+        self.assertEqual(abi_key(json.dumps(reordered(TOKEN_ABI)).encode('utf-8')), key)
+        self.assertNotEqual(abi_key(TOKEN_ABI[:1]), key)
+
+    def test_identical_abis_share_entry(self):
+
+        abis = ABIRegistry()
+        entry = abis.get(TOKEN_ABI)
+        self.assertIs(abis.get(reordered(TOKEN_ABI)), entry)
+        self.assertIs(abis.get(json.dumps(TOKEN_ABI, indent=2)), entry)
+        self.assertEqual(len(abis), 1)
+        self.assertEqual(entry.key, abi_key(TOKEN_ABI))
+
+        other = abis.get(TOKEN_ABI[:1])
+        self.assertIsNot(other, entry)
+        self.assertEqual(len(abis), 2)
+
+        abis.clear()
+        self.assertEqual(len(abis), 0)
+        self.assertIsNot(abis.get(TOKEN_ABI), entry)
+
+    def test_identity_fast_path(self):
+
+        abis = ABIRegistry()
+        entry = abis.get(TOKEN_ABI)
+        with mock.patch.object(registry, 'abi_key', wraps=abi_key) as key:
+            self.assertIs(abis.get(TOKEN_ABI), entry)
+            self.assertEqual(key.call_count, 0)
+            # an equal abi that isn't the same object is hashed
+            self.assertIs(abis.get(reordered(TOKEN_ABI)), entry)
+            self.assertEqual(key.call_count, 1)
+
+    def test_method_table_once_per_translator(self):
+
+        translator = ContractTranslator(TOKEN_ABI)
+        with mock.patch.object(registry, 'get_encoder', wraps=registry.get_encoder) as get_encoder:
+            table = get_method_table(translator)
+            built = get_encoder.call_count
+            self.assertEqual(built, len(table))
+            self.assertIs(get_method_table(translator), table)
+            self.assertEqual(get_encoder.call_count, built)
+            # another translator for the same abi gets its own table
+            self.assertIsNot(get_method_table(ContractTranslator(TOKEN_ABI)), table)
+
+        with self.assertRaises(TypeError):
+            table['balanceOf'] = None
+
+        # entries use the shared table for their translator
+        entry = ABIRegistry().get(TOKEN_ABI)
+        self.assertIs(entry.methods, get_method_table(entry.translator))
@@ -0,0 +1,88 @@
+import unittest
+
+from asyncbb.test.base import AsyncHandlerTest
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum.results import Block, Receipt, Transaction
+
+from .fakenode import FakeNode, FakeNodeHandler
+
+RAW_RECEIPT = {
+    "transactionHash": "0x" + "11" * 32,
+    "transactionIndex": "0x2",
+    "blockHash": "0x" + "22" * 32,
+    "blockNumber": "0x1b4",
+    "cumulativeGasUsed": "0x33bc",
+    "gasUsed": "0x5208",
+    "contractAddress": None,
+    "status": "0x1",
+    "logs": [{
+        "address": "0xDE3D2D9DD52EA80F7799EF4791063A5458D13913",
+        "topics": ["0x" + "aa" * 32],
+        "data": "0x",
+        "blockNumber": "0x1b4",
+        "transactionHash": "0x" + "11" * 32,
+        "transactionIndex": "0x2",
+        "logIndex": "0x0",
+        "removed": False
+    }]
+}
+
+class TestResults(unittest.TestCase):
+
+    def test_receipt(self):
+
+        receipt = Receipt(RAW_RECEIPT)
+        self.assertEqual(receipt.gas_used, 21000)
+        self.assertEqual(receipt.block_number, 436)
+        self.assertEqual(receipt.status, 1)
+        self.assertIsNone(receipt.contract_address)
+        self.assertIsNone(receipt.to_address)
+        # the raw payload is still available
+        self.assertEqual(receipt['gasUsed'], "0x5208")
+        self.assertIs(receipt.raw, RAW_RECEIPT)
+
+        log, = receipt.logs
+        self.assertIs(receipt.logs, receipt.logs)
+        self.assertEqual(log.address, "0xde3d2d9dd52ea80f7799ef4791063a5458d13913")
+        self.assertEqual(log.topics, ("0x" + "aa" * 32,))
+        self.assertEqual(log.log_index, 0)
+        self.assertFalse(log.removed)
+
+    def test_interned_addresses(self):
+
+        txs = [Transaction({"hash": "0x{:064x}".format(i), "from": "0x" + "ab" * 20}) for i in range(2)]
+        self.assertIs(txs[0].from_address, txs[1].from_address)
+
+    def test_no_instance_dict(self):
+
+        block = Block({"number": "0x1"})
+        with self.assertRaises(AttributeError):
+            block.extra = 1
+
+class TypedClientTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = FakeNode(block_number=10)
+        self.node.blocks[5] = {"number": "0x5", "hash": "0x" + "05" * 32, "timestamp": "0x10", "gasUsed": "0x0",
+                               "transactions": [{"hash": "0x" + "01" * 32, "value": "0xde0b6b3a7640000",
+                                                 "from": "0x" + "ab" * 20, "to": None}]}
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    @gen_test
+    async def test_typed_block(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        block = await client.eth_getBlockByNumber(5, typed=True)
+        self.assertIsInstance(block, Block)
+        self.assertEqual(block.number, 5)
+        tx, = block.transactions
+        self.assertEqual(tx.value, 10 ** 18)
+        self.assertIsNone(tx.to_address)
+
+        block = await client.eth_getBlockByNumber(5, with_transactions=False, typed=True)
+        self.assertEqual(block.transactions, ("0x" + "01" * 32,))
+
+        self.assertIsNone(await client.eth_getBlockByNumber(50, typed=True))
+        self.assertIsInstance(await client.eth_getBlockByNumber(5), dict)
@@ -0,0 +1,117 @@
+import tornado.httpclient
+import unittest
+
+from asyncbb.test.base import AsyncHandlerTest
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient, JsonRPCError
+from asyncbb.ethereum import retry
+from asyncbb.ethereum.retry import RetryPolicy
+
+from .fakenode import FakeNode, FakeNodeError, FakeNodeHandler
+
+class ClassifyTest(unittest.TestCase):
+
+    def test_classify(self):
+
+        self.assertEqual(retry.classify(tornado.httpclient.HTTPClientError(599, "Timeout")), retry.TRANSPORT)
+        self.assertEqual(retry.classify(tornado.httpclient.HTTPClientError(503)), retry.TRANSPORT)
+        self.assertEqual(retry.classify(ConnectionResetError()), retry.TRANSPORT)
+        self.assertEqual(retry.classify(tornado.httpclient.HTTPClientError(429)), retry.RATE_LIMITED)
+        self.assertEqual(retry.classify(JsonRPCError(1, -32005, "daily request rate exceeded")), retry.RATE_LIMITED)
+        self.assertEqual(retry.classify(JsonRPCError(1, -32000, "header not found")), retry.NOT_SYNCED)
+        self.assertEqual(retry.classify(JsonRPCError(1, -32000, "execution reverted")), retry.DETERMINISTIC)
+        self.assertEqual(retry.classify(tornado.httpclient.HTTPClientError(400)), retry.DETERMINISTIC)
+        self.assertEqual(retry.classify(ValueError()), retry.DETERMINISTIC)
+
+    def test_policy(self):
+
+        policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=3, budget=2, budget_ratio=0.5)
+        error = tornado.httpclient.HTTPClientError(503)
+
+        delay = policy.retry_delay(error, ["eth_getBalance"], 2)
+        self.assertTrue(0 <= delay <= 3)
+        self.assertIsNone(policy.retry_delay(error, ["eth_getBalance"], 3))
+        self.assertIsNone(policy.retry_delay(error, ["eth_getBalance", "eth_sendRawTransaction"], 1))
+        self.assertIsNone(policy.retry_delay(JsonRPCError(1, -32000, "execution reverted"), ["eth_call"], 1))
+
+        # the budget runs out, and refills with successes
+        self.assertIsNotNone(policy.retry_delay(error, ["eth_getBalance"], 1))
+        self.assertIsNone(policy.retry_delay(error, ["eth_getBalance"], 1))
+        self.assertEqual((policy.retries, policy.exhausted), (2, 1))
+        policy.record_success()
+        policy.record_success()
+        self.assertIsNotNone(policy.retry_delay(error, ["eth_getBalance"], 1))
+
+class FlakyNodeHandler(FakeNodeHandler):
+
+    def post(self):
+        if self.node.unavailable > 0:
+            self.node.unavailable -= 1
+            self.node.http_requests += 1
+            self.set_status(503)
+            return
+        super().post()
+
+class FlakyNode(FakeNode):
+
+    def __init__(self):
+        super().__init__()
+        self.unavailable = 0
+        self.lagging = set()
+        self.behind = False
+
+    def eth_getBalance(self, address, block):
+        # a node behind the others the first time each block is asked for
+        if self.behind or block not in self.lagging:
+            self.lagging.add(block)
+            raise FakeNodeError(-32000, "header not found")
+        return "0x1"
+
+class RetryTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = FlakyNode()
+        return [(r'^/$', FlakyNodeHandler, {'node': self.node})]
+
+    @gen_test
+    async def test_transport_retry(self):
+
+        client = JsonRPCClient(self.get_url('/'), retry=RetryPolicy(base_delay=0.001))
+        self.node.unavailable = 2
+        self.assertEqual(await client.eth_blockNumber(), 100)
+        self.assertEqual(self.node.http_requests, 3)
+        self.assertEqual(client.retry.retries, 2)
+
+        # not retried for methods that aren't safe to send twice
+        self.node.unavailable = 1
+        with self.assertRaises(tornado.httpclient.HTTPClientError):
+            await client.eth_getFilterChanges("0x1")
+
+        # or without a policy
+        client = JsonRPCClient(self.get_url('/'), retry=False)
+        self.node.unavailable = 1
+        with self.assertRaises(tornado.httpclient.HTTPClientError):
+            await client.eth_blockNumber()
+
+    @gen_test
+    async def test_batch_retry(self):
+
+        client = JsonRPCClient(self.get_url('/'), retry=RetryPolicy(base_delay=0.001))
+        self.node.lagging.update(hex(n) for n in range(0, 10, 2))
+        results = await client._fetch_batch([("eth_getBalance", ["0x" + "00" * 20, hex(n)]) for n in range(10)]
+                                            + [("eth_call", [{}, "latest"])])
+        self.assertEqual(results[:10], ["0x1"] * 10)
+        # deterministic errors are returned as before
+        self.assertIsInstance(results[10], JsonRPCError)
+        # only the 5 lagging calls were sent again, in a single batch
+        self.assertEqual(self.node.http_requests, 2)
+        self.assertEqual(self.node.requests.count("eth_getBalance"), 15)
+
+        # gives up after max_attempts
+        client.retry.max_attempts = 2
+        self.node.behind = True
+        self.node.requests = []
+        with self.assertRaises(JsonRPCError):
+            await client.eth_getBalance("0x" + "00" * 20, 5)
+        self.assertEqual(self.node.requests, ["eth_getBalance"] * 2)
@@ -0,0 +1,69 @@
+import concurrent.futures
+import rlp
+import unittest
+
+from ethereum.transactions import Transaction
+from ethutils import data_decoder, data_encoder
+from tornado.testing import AsyncTestCase, gen_test
+
+from asyncbb.ethereum.signing import SigningService, sign_transaction, sign_transactions
+
+from .faucet import FAUCET_PRIVATE_KEY
+
+TO_ADDRESS = "0x39bf9e501e61440b4b268d7b2e9aa2458dd201bb"
+
+def inline_sign(private_key, nonce, gasprice, startgas, to, value, data=b''):
+    """the signing code that sign_transaction replaced"""
+    tx = Transaction(nonce, gasprice, startgas, to, value, data, 0, 0, 0)
+    tx.sign(data_decoder(private_key))
+    return data_encoder(tx.hash), data_encoder(rlp.encode(tx, Transaction))
+
+class SignTransactionTest(unittest.TestCase):
+
+    def test_matches_inline_signing(self):
+
+        for nonce, to, value, data in [(0, TO_ADDRESS, 10 ** 18, b''),
+                                       (7, TO_ADDRESS, 0, b'\xa9\x05\x9c\xbb' + b'\x00' * 64),
+                                       (3, '', 0, b'\x60\x60\x60\x40')]:
+            tx_hash, tx_encoded, creates = sign_transaction(FAUCET_PRIVATE_KEY, nonce, 20000000000, 100000,
+                                                            to, value, data)
+            expected_hash, expected_encoded = inline_sign(FAUCET_PRIVATE_KEY, nonce, 20000000000, 100000,
+                                                          data_decoder(to) if to else b'', value, data)
+            self.assertEqual(tx_encoded, expected_encoded)
+            self.assertEqual(tx_hash, expected_hash)
+            if to:
+                self.assertIsNone(creates)
+            else:
+                self.assertIsNotNone(creates)
+
+    def test_hex_arguments(self):
+
+        self.assertEqual(sign_transaction(FAUCET_PRIVATE_KEY, 1, 1, 21000, TO_ADDRESS, 5, '0x6060'),
+                         sign_transaction(data_decoder(FAUCET_PRIVATE_KEY), 1, 1, 21000,
+                                          data_decoder(TO_ADDRESS), 5, b'\x60\x60'))
+
+class SigningServiceTest(AsyncTestCase):
+
+    @gen_test
+    async def test_sign_batch_order(self):
+
+        transactions = [(nonce, 20000000000, 21000, TO_ADDRESS, nonce, b'') for nonce in range(23)]
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        service = SigningService(executor=executor, chunk_size=5)
+        try:
+            results = await service.sign_batch(FAUCET_PRIVATE_KEY, transactions)
+            self.assertEqual(results, sign_transactions(FAUCET_PRIVATE_KEY, transactions))
+            self.assertEqual(await service.sign(FAUCET_PRIVATE_KEY, *transactions[3]), results[3])
+            self.assertEqual(await service.sign_batch(FAUCET_PRIVATE_KEY, []), [])
+        finally:
+            service.shutdown()
+            # a given executor is left for its owner to shut down
+            executor.submit(int).result()
+            executor.shutdown()
+
+    def test_shutdown(self):
+
+        service = SigningService(max_workers=1)
+        service.shutdown()
+        with self.assertRaises(RuntimeError):
+            service._executor.submit(int)
@@ -0,0 +1,139 @@
+import json
+import shutil
+import subprocess
+import unittest
+
+from asyncbb.test.base import AsyncHandlerTest
+from tornado.testing import gen_test
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum import tracers
+from asyncbb.ethereum.tracers import CallFrame, OpcodeGas, SelectorCalls, StorageAccess, ValueTransfer
+
+from .fakenode import FakeNode, FakeNodeHandler
+
+A = "0x" + "aa" * 20
+B = "0x" + "BB" * 20
+C = "0x" + "cc" * 20
+
+CALL_TREE_RESULT = {
+    "type": "CALL", "from": A, "to": B, "value": "0xde0b6b3a7640000", "gas": "0x7530", "gasUsed": "0x5208",
+    "input": "0xa9059cbb", "output": "0x",
+    "calls": [
+        {"type": "DELEGATECALL", "from": B, "to": C, "gas": "0x100", "gasUsed": "0x10", "input": "0x", "output": "0x"},
+        {"type": "CALL", "from": B, "to": A, "value": "0x1", "gas": "0x100", "gasUsed": "0x10", "input": "0x",
+         "error": "execution reverted",
+         "calls": [{"type": "STATICCALL", "from": A, "to": C, "gas": "0x10", "gasUsed": "0x1", "input": "0x"}]}
+    ]
+}
+
+# evaluates each tracer read from stdin as a javascript expression and
+# prints the names of its functions, or the error it failed with
+PARSE_TRACERS_JS = """
+const sources = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const parsed = {};
+for (const name in sources) {
+    try {
+        const tracer = (0, eval)('(' + sources[name] + ')');
+        parsed[name] = Object.keys(tracer).filter(key => typeof tracer[key] === 'function');
+    } catch (e) {
+        parsed[name] = String(e);
+    }
+}
+process.stdout.write(JSON.stringify(parsed));
+"""
+
+class TracerSourceTest(unittest.TestCase):
+
+    @unittest.skipUnless(shutil.which('node'), "requires node")
+    def test_tracers_parse(self):
+
+        presets = [tracers.VALUE_TRANSFERS, tracers.STORAGE_SLOTS, tracers.OPCODE_GAS, tracers.SELECTOR_PROFILE]
+        proc = subprocess.run(['node', '-e', PARSE_TRACERS_JS],
+                              input=json.dumps({preset.name: preset.tracer for preset in presets}),
+                              stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        parsed = json.loads(proc.stdout)
+        for preset in presets:
+            functions = parsed[preset.name]
+            self.assertIsInstance(functions, list, "{}: {}".format(preset.name, functions))
+            # what geth requires of a javascript tracer
+            self.assertIn('result', functions, preset.name)
+            self.assertIn('fault', functions, preset.name)
+            self.assertTrue('step' in functions or 'enter' in functions, preset.name)
+
+class TracerDecoderTest(unittest.TestCase):
+
+    def test_call_tree(self):
+
+        root = tracers.decode_call_tree(CALL_TREE_RESULT)
+        self.assertEqual(root.type, "CALL")
+        self.assertEqual(root.from_address, A)
+        self.assertEqual(root.to_address, B.lower())
+        self.assertEqual(root.value, 10 ** 18)
+        self.assertEqual(root.gas_used, 21000)
+        self.assertEqual(root.calls[0].value, 0)
+        self.assertIsNone(root.calls[0].error)
+        self.assertEqual(root.calls[1].error, "execution reverted")
+        self.assertEqual([frame.type for frame in root.walk()], ["CALL", "DELEGATECALL", "CALL", "STATICCALL"])
+        self.assertIsInstance(root.calls[1].calls[0], CallFrame)
+
+    def test_value_transfers(self):
+
+        transfers = tracers.decode_value_transfers([
+            {"type": "CALL", "from": A, "to": B, "value": "0x9"},
+            {"type": "SELFDESTRUCT", "from": B, "to": C, "value": "0x5"}])
+        self.assertEqual(transfers, [ValueTransfer("CALL", A, B.lower(), 9),
+                                     ValueTransfer("SELFDESTRUCT", B.lower(), C, 5)])
+
+    def test_storage_slots(self):
+
+        slots = tracers.decode_storage_slots({B: {"0x1": 3, "0x12c": 2}, C: {"0x0": 1}})
+        self.assertEqual(slots, {
+            B.lower(): {"0x" + "0" * 63 + "1": StorageAccess(True, True),
+                        "0x" + "0" * 61 + "12c": StorageAccess(False, True)},
+            C: {"0x" + "0" * 64: StorageAccess(True, False)}})
+
+    def test_opcode_gas(self):
+
+        ops = tracers.decode_opcode_gas({"ADD": [2, 6], "SSTORE": [1, 20000], "PUSH1": [10, 30]})
+        self.assertEqual(list(ops), ["SSTORE", "PUSH1", "ADD"])
+        self.assertEqual(ops["ADD"], OpcodeGas(2, 6))
+
+    def test_selector_profile(self):
+
+        profile = tracers.decode_selector_profile({
+            B + ":0xa9059cbb": [2, 100], C + ":0x": [1, 10]})
+        self.assertEqual(profile, {(B.lower(), "0xa9059cbb"): SelectorCalls(2, 100),
+                                   (C, "0x"): SelectorCalls(1, 10)})
+
+class TracerNode(FakeNode):
+
+    def debug_traceTransaction(self, tx_hash, options):
+        self.options = options
+        if options['tracer'] == tracers.CALL_TREE_TRACER:
+            return CALL_TREE_RESULT
+        if options['tracer'] == tracers.OPCODE_GAS_TRACER:
+            return {"ADD": [2, 6]}
+        return {}
+
+class TracerClientTest(AsyncHandlerTest):
+
+    def get_urls(self):
+        self.node = TracerNode()
+        return [(r'^/$', FakeNodeHandler, {'node': self.node})]
+
+    @gen_test
+    async def test_presets(self):
+
+        client = JsonRPCClient(self.get_url('/'))
+        tx_hash = "0x" + "11" * 32
+
+        root = await client.get_call_tree(tx_hash, timeout="10s")
+        self.assertEqual(root, tracers.decode_call_tree(CALL_TREE_RESULT))
+        self.assertEqual(self.node.options, {"tracer": "callTracer", "timeout": "10s"})
+
+        self.assertEqual(await client.get_opcode_gas(tx_hash), {"ADD": OpcodeGas(2, 6)})
+        self.assertEqual(self.node.options, {"tracer": tracers.OPCODE_GAS_TRACER})
+
+        self.assertEqual(await client.get_storage_slots(tx_hash), {})
+        self.assertEqual(self.node.options['tracer'], tracers.STORAGE_SLOTS_TRACER)
@@ -0,0 +1,197 @@
+"""Tracer presets for debug_traceTransaction.
+
+Each preset pairs a tracer that geth runs next to the EVM with a decoder for
+the result it returns. The aggregation happens on the node, so only the
+summary is sent back rather than the full structLogs of every step.
+
+The tests check that the javascript tracers parse (when node is installed)
+and that the decoders handle their results, but what the tracers compute
+can only be checked by running them on a geth node.
+
+e.g.
+
+    transfers = await client.run_tracer(tx_hash, VALUE_TRANSFERS)
+
+or through the matching JsonRPCClient method, e.g. get_value_transfers"""
+
+from collections import namedtuple
+
+from asyncbb.ethereum.hexcodec import intern_address
+
+class TracerPreset(namedtuple('TracerPreset', ['name', 'tracer', 'decode'])):
+    """`tracer` is passed as debug_traceTransaction's tracer option and
+    `decode` turns the result into python values"""
+
+    __slots__ = ()
+
+class CallFrame(namedtuple('CallFrame', ['type', 'from_address', 'to_address', 'value', 'gas', 'gas_used',
+                                         'input', 'output', 'error', 'calls'])):
+    """A call made during a transaction, and the calls it made in turn"""
+
+    __slots__ = ()
+
+    def walk(self):
+        """yields this frame and every frame below it, depth first"""
+        yield self
+        for call in self.calls:
+            yield from call.walk()
+
+ValueTransfer = namedtuple('ValueTransfer', ['type', 'from_address', 'to_address', 'value'])
+
+StorageAccess = namedtuple('StorageAccess', ['read', 'written'])
+
+OpcodeGas = namedtuple('OpcodeGas', ['count', 'gas'])
+
+SelectorCalls = namedtuple('SelectorCalls', ['count', 'gas_used'])
+
+def _int(value):
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return value
+    return int(value, 16)
+
+def _address(value):
+    return None if value is None else intern_address(value)
+
+def _slot(value):
+    return '0x' + value[2:].rjust(64, '0')
+
+# geth's builtin call tracer
+CALL_TREE_TRACER = "callTracer"
+
+def decode_call_tree(result):
+    """returns the root CallFrame of a callTracer result"""
+
+    return CallFrame(result['type'], _address(result.get('from')), _address(result.get('to')),
+                     _int(result.get('value')), _int(result.get('gas')), _int(result.get('gasUsed')),
+                     result.get('input'), result.get('output'), result.get('error'),
+                     tuple(decode_call_tree(call) for call in result.get('calls') or ()))
+
+# ether moved by the transaction and its internal calls. transfers made in
+# calls that reverted are discarded along with the call
+VALUE_TRANSFERS_TRACER = """{
+    frames: [[]],
+    enter: function(frame) {
+        var transfers = [];
+        var value = frame.getValue();
+        if (value !== undefined && value.compare(0) > 0) {
+            transfers.push({type: frame.getType(), from: toHex(frame.getFrom()),
+                            to: toHex(frame.getTo()), value: '0x' + value.toString(16)});
+        }
+        this.frames.push(transfers);
+    },
+    exit: function(result) {
+        var transfers = this.frames.pop();
+        if (result.getError() === undefined) {
+            var parent = this.frames[this.frames.length - 1];
+            for (var i = 0; i < transfers.length; i++) {
+                parent.push(transfers[i]);
+            }
+        }
+    },
+    fault: function(log, db) {},
+    result: function(ctx, db) {
+        if (ctx.error !== undefined) {
+            return [];
+        }
+        var transfers = this.frames[0];
+        if (ctx.value.compare(0) > 0) {
+            transfers.unshift({type: ctx.type, from: toHex(ctx.from), to: toHex(ctx.to),
+                               value: '0x' + ctx.value.toString(16)});
+        }
+        return transfers;
+    }
+}"""
+
+def decode_value_transfers(result):
+    """returns a list of ValueTransfers, in the order they were made"""
+    return [ValueTransfer(t['type'], _address(t['from']), _address(t['to']), _int(t['value'])) for t in result]
+
+# the storage slots each contract read (1) and wrote (2)
+STORAGE_SLOTS_TRACER = """{
+    slots: {},
+    step: function(log, db) {
+        var op = log.op.toString();
+        if (op !== 'SLOAD' && op !== 'SSTORE') {
+            return;
+        }
+        var address = toHex(log.contract.getAddress());
+        var slot = '0x' + log.stack.peek(0).toString(16);
+        var slots = this.slots[address] || (this.slots[address] = {});
+        slots[slot] = (slots[slot] || 0) | (op === 'SLOAD' ? 1 : 2);
+    },
+    fault: function(log, db) {},
+    result: function(ctx, db) {
+        return this.slots;
+    }
+}"""
+
+def decode_storage_slots(result):
+    """returns {address: {slot: StorageAccess}}, with slots as 32 byte hex strings"""
+    return {_address(address): {_slot(slot): StorageAccess(bool(flags & 1), bool(flags & 2))
+                                for slot, flags in slots.items()}
+            for address, slots in result.items()}
+
+# how many times each opcode ran and the gas it cost in total
+OPCODE_GAS_TRACER = """{
+    ops: {},
+    step: function(log, db) {
+        var op = log.op.toString();
+        var stats = this.ops[op] || (this.ops[op] = [0, 0]);
+        stats[0] += 1;
+        stats[1] += log.getCost();
+    },
+    fault: function(log, db) {},
+    result: function(ctx, db) {
+        return this.ops;
+    }
+}"""
+
+def decode_opcode_gas(result):
+    """returns {opcode: OpcodeGas}, most expensive first"""
+    stats = sorted(result.items(), key=lambda item: item[1][1], reverse=True)
+    return {op: OpcodeGas(count, gas) for op, (count, gas) in stats}
+
+# calls per contract and 4 byte function selector, with the gas they used
+SELECTOR_PROFILE_TRACER = """{
+    calls: {},
+    frames: [],
+    add: function(to, input, gasUsed) {
+        var selector = input.length >= 4 ? toHex(input.slice(0, 4)) : '0x';
+        var key = toHex(to) + ':' + selector;
+        var stats = this.calls[key] || (this.calls[key] = [0, 0]);
+        stats[0] += 1;
+        stats[1] += gasUsed;
+    },
+    enter: function(frame) {
+        this.frames.push([frame.getTo(), frame.getInput()]);
+    },
+    exit: function(result) {
+        var frame = this.frames.pop();
+        this.add(frame[0], frame[1], result.getGasUsed());
+    },
+    fault: function(log, db) {},
+    result: function(ctx, db) {
+        if (ctx.to !== undefined) {
+            this.add(ctx.to, ctx.input, ctx.gasUsed);
+        }
+        return this.calls;
+    }
+}"""
+
+def decode_selector_profile(result):
+    """returns {(address, selector): SelectorCalls}, where selector is '0x'
+    for calls without call data"""
+
+    profile = {}
+    for key, (count, gas_used) in result.items():
+        address, selector = key.split(':')
+        profile[(_address(address), selector)] = SelectorCalls(count, gas_used)
+    return profile
+
+CALL_TREE = TracerPreset('call_tree', CALL_TREE_TRACER, decode_call_tree)
+VALUE_TRANSFERS = TracerPreset('value_transfers', VALUE_TRANSFERS_TRACER, decode_value_transfers)
+STORAGE_SLOTS = TracerPreset('storage_slots', STORAGE_SLOTS_TRACER, decode_storage_slots)
+OPCODE_GAS = TracerPreset('opcode_gas', OPCODE_GAS_TRACER, decode_opcode_gas)
+SELECTOR_PROFILE = TracerPreset('selector_profile', SELECTOR_PROFILE_TRACER, decode_selector_profile)
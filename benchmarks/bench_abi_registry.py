@@ -0,0 +1,62 @@
+"""Reports construction time and memory for creating many Contract objects
+for the same token abi, with the shared abi registry and with a new
+ContractTranslator per contract (the previous behaviour).
+
+usage: python benchmarks/bench_abi_registry.py [count]
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from ethereum.abi import ContractTranslator
+
+from asyncbb.ethereum.contract import Contract
+from asyncbb.ethereum.registry import registry
+
+from abis import ERC20_ABI
+
+def addresses(count):
+    return ["0x{:040x}".format(i + 1) for i in range(count)]
+
+def per_contract_translator(abi, address):
+    return Contract(abi=abi, address=address, translator=ContractTranslator(abi))
+
+def shared_registry(abi, address):
+    return Contract(abi=abi, address=address)
+
+def fresh_abi_objects(abi, address):
+    # as if every contract's abi was loaded separately, so it has to be hashed
+    return Contract(abi=json.loads(abi), address=address)
+
+def measure(factory, abi, addrs):
+    registry.clear()
+    gc.collect()
+    start = time.perf_counter()
+    contracts = [factory(abi, address) for address in addrs]
+    elapsed = time.perf_counter() - start
+    del contracts
+
+    # tracemalloc slows down allocation a lot, so memory is measured separately
+    registry.clear()
+    gc.collect()
+    tracemalloc.start()
+    contracts = [factory(abi, address) for address in addrs]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del contracts
+    return elapsed, current
+
+def main(count):
+    addrs = addresses(count)
+    abi_json = json.dumps(ERC20_ABI)
+    for name, factory, abi in (("translator per contract", per_contract_translator, ERC20_ABI),
+                               ("shared registry", shared_registry, ERC20_ABI),
+                               ("registry, abi per contract", fresh_abi_objects, abi_json)):
+        elapsed, memory = measure(factory, abi, addrs)
+        print("{:<28} {:>7} contracts {:>8.3f}s {:>8.1f}us each {:>10.1f}KiB".format(
+            name, count, elapsed, elapsed / count * 1e6, memory / 1024))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
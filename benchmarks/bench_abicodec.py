@@ -0,0 +1,44 @@
+"""Compares the generated abicodec encoders/decoders with the generic
+ethereum.abi functions on common function signatures.
+
+usage: python benchmarks/bench_abicodec.py [iterations]
+"""
+import sys
+import timeit
+
+from ethereum.abi import encode_abi, decode_abi
+
+from asyncbb.ethereum.abicodec import get_encoder, get_decoder, fix_address_decoding
+
+ADDRESS = "0x39bf9e501e61440b4b268d7b2e9aa2458dd201bb"
+OTHER = "0xde3d2d9dd52ea80f7799ef4791063a5458d13913"
+
+# (description, argument types, arguments, result types, result values)
+SIGNATURES = [
+    ("balanceOf(address)", ['address'], [ADDRESS], ['uint256'], [10 ** 21]),
+    ("allowance(address,address)", ['address', 'address'], [ADDRESS, OTHER], ['uint256'], [2 ** 255]),
+    ("transfer(address,uint256)", ['address', 'uint256'], [ADDRESS, 10 ** 18], ['bool'], [True]),
+    ("name()", [], [], ['string'], [b'Some Token Name']),
+    ("getReserves()", [], [], ['uint112', 'uint112', 'uint32'], [10 ** 24, 3 * 10 ** 22, 1500000000]),
+    ("owner()", [], [], ['address'], [OTHER]),
+]
+
+def main(iterations):
+    print("{:<28} {:>14} {:>14} {:>14} {:>14}".format(
+        "signature", "generic enc", "compiled enc", "generic dec", "compiled dec"))
+    for name, arg_types, args, result_types, results in SIGNATURES:
+        encoder = get_encoder(arg_types)
+        decoder = get_decoder(result_types)
+        encoded_result = encode_abi(result_types, results)
+
+        timings = [
+            min(timeit.repeat(lambda: encode_abi(arg_types, args), number=iterations, repeat=3)),
+            min(timeit.repeat(lambda: encoder(args), number=iterations, repeat=3)),
+            min(timeit.repeat(lambda: fix_address_decoding(decode_abi(result_types, encoded_result), result_types),
+                              number=iterations, repeat=3)),
+            min(timeit.repeat(lambda: decoder(encoded_result), number=iterations, repeat=3)),
+        ]
+        print("{:<28} {}".format(name, " ".join("{:>12.2f}us".format(t / iterations * 1e6) for t in timings)))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
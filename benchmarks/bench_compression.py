@@ -0,0 +1,90 @@
+"""Measures how much gzip and deflate shrink representative jsonrpc
+responses and what compressing and decompressing them costs.
+
+For each payload (a block with full transactions, its receipts with logs,
+and trace_block results) reports the bytes on the wire and the
+milliseconds per compress and decompress at each codec and level.
+
+usage: python benchmarks/bench_compression.py [transactions per block]
+"""
+import json
+import random
+import sys
+import time
+import zlib
+
+from asyncbb.ethereum.client import _decompress
+
+def address(rng):
+    return "0x{:040x}".format(rng.getrandbits(160))
+
+def word(rng):
+    return "0x{:064x}".format(rng.getrandbits(256))
+
+def make_payloads(tx_count):
+    rng = random.Random(1)
+    # real traffic reuses a few popular contracts and many senders
+    contracts = [address(rng) for _ in range(20)]
+    senders = [address(rng) for _ in range(tx_count)]
+    block_hash = word(rng)
+    txs = [{"hash": word(rng), "nonce": hex(rng.randrange(10000)), "blockHash": block_hash,
+            "blockNumber": "0x5b8d80", "transactionIndex": hex(i), "from": senders[i],
+            "to": rng.choice(contracts), "value": hex(rng.randrange(10 ** 18)), "gas": hex(rng.randrange(21000, 500000)),
+            "gasPrice": hex(rng.randrange(10 ** 9, 10 ** 11)),
+            "input": "0xa9059cbb" + "{:064x}".format(rng.getrandbits(160)) + "{:064x}".format(rng.getrandbits(64)),
+            "v": "0x25", "r": word(rng), "s": word(rng)} for i in range(tx_count)]
+    block = {"jsonrpc": "2.0", "id": 1, "result": {
+        "number": "0x5b8d80", "hash": block_hash, "parentHash": word(rng), "miner": rng.choice(contracts),
+        "timestamp": "0x5b4e3c1a", "gasUsed": "0x7a1200", "gasLimit": "0x7a121d", "transactions": txs}}
+    receipts = {"jsonrpc": "2.0", "id": 1, "result": [{
+        "transactionHash": tx['hash'], "transactionIndex": tx['transactionIndex'], "blockHash": block_hash,
+        "blockNumber": "0x5b8d80", "from": tx['from'], "to": tx['to'], "gasUsed": hex(rng.randrange(21000, 100000)),
+        "cumulativeGasUsed": hex(rng.randrange(10 ** 6)), "contractAddress": None, "status": "0x1",
+        "logs": [{"address": tx['to'], "topics": [
+            "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef", word(rng), word(rng)],
+            "data": word(rng), "blockNumber": "0x5b8d80", "transactionHash": tx['hash'],
+            "logIndex": hex(i)}]} for i, tx in enumerate(txs)]}
+    traces = {"jsonrpc": "2.0", "id": 1, "result": [{
+        "action": {"callType": "call", "from": tx['from'], "to": tx['to'], "gas": tx['gas'], "input": tx['input'],
+                   "value": tx['value']},
+        "blockHash": block_hash, "blockNumber": 6000000, "result": {"gasUsed": hex(rng.randrange(21000, 100000)),
+                                                                    "output": word(rng)},
+        "subtraces": 0, "traceAddress": [], "transactionHash": tx['hash'], "transactionPosition": i,
+        "type": "call"} for i, tx in enumerate(txs)]}
+    return [(name, json.dumps(payload).encode('utf-8'))
+            for name, payload in (("block", block), ("receipts", receipts), ("traces", traces))]
+
+def gzip_codec(level):
+    def compress(data):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    return compress
+
+def deflate_codec(level):
+    def compress(data):
+        return zlib.compress(data, level)
+    return compress
+
+CODECS = [("gzip -1", gzip_codec(1)), ("gzip -6", gzip_codec(6)), ("gzip -9", gzip_codec(9)),
+          ("deflate -6", deflate_codec(6))]
+
+def timed(fn, data, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(data)
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+def main(tx_count, repeat=20):
+    print("{:<10} {:<11} {:>10} {:>7} {:>12} {:>14}".format(
+        "payload", "codec", "bytes", "ratio", "compress ms", "decompress ms"))
+    for name, data in make_payloads(tx_count):
+        print("{:<10} {:<11} {:>10} {:>7} {:>12} {:>14}".format(name, "none", len(data), "1.00", "-", "-"))
+        for codec, compress in CODECS:
+            compressed, compress_ms = timed(compress, data, repeat)
+            decompressed, decompress_ms = timed(_decompress, compressed, repeat)
+            assert decompressed == data
+            print("{:<10} {:<11} {:>10} {:>7.2f} {:>12.3f} {:>14.3f}".format(
+                "", codec, len(compressed), len(data) / len(compressed), compress_ms, decompress_ms))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
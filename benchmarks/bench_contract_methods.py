@@ -0,0 +1,72 @@
+"""Measures the per call overhead of looking up and preparing a contract
+method call (everything short of the jsonrpc request itself), comparing
+the precomputed method table with the previous per access construction.
+
+usage: python benchmarks/bench_contract_methods.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+from ethereum.abi import ContractTranslator
+from ethutils import private_key_to_address
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum.contract import BoundContract
+
+from abis import ERC20_ABI
+
+PRIVATE_KEY = "0x0164f7c7399f4bb1eafeaae699ebbb12050bc6a50b2836b9ca766068a9d000c0"
+TOKEN_ADDRESS = "0x39bf9e501e61440b4b268d7b2e9aa2458dd201bb"
+OWNER = "0xde3d2d9dd52ea80f7799ef4791063a5458d13913"
+
+class LegacyMethod:
+    """what each access to a method on a BoundContract used to do"""
+
+    def __init__(self, name, contract, from_key=None):
+        self.name = name
+        self.contract = contract
+        self.is_constant = contract.translator.function_data[name]['is_constant']
+        self.from_address = private_key_to_address(from_key) if from_key else None
+
+    def set_sender(self, key):
+        return LegacyMethod(self.name, self.contract, from_key=key)
+
+    def prepare(self, *args):
+        ethclient = JsonRPCClient(os.environ['ETHEREUM_NODE_URL'])
+        return ethclient, self.contract.translator.encode_function_call(self.name, args)
+
+class LegacyContract:
+
+    def __init__(self, abi, address, sender):
+        self.abi = abi
+        self.valid_funcs = [part['name'] for part in abi if part['type'] == 'function']
+        self.translator = ContractTranslator(abi)
+        self.address = address
+        self.sender = sender
+
+    def __getattr__(self, name):
+        if name in self.valid_funcs:
+            return LegacyMethod(name, self).set_sender(self.sender)
+        raise AttributeError(name)
+
+def main(iterations):
+    os.environ.setdefault('ETHEREUM_NODE_URL', 'http://localhost:8545')
+
+    legacy = LegacyContract(ERC20_ABI, TOKEN_ADDRESS, PRIVATE_KEY)
+    contract = BoundContract(abi=ERC20_ABI, address=TOKEN_ADDRESS, sender=PRIVATE_KEY,
+                             client=JsonRPCClient(os.environ['ETHEREUM_NODE_URL']))
+
+    def legacy_call():
+        legacy.allowance.prepare(OWNER, TOKEN_ADDRESS)
+
+    def table_call():
+        method = contract.allowance
+        method.contract.client, method.encode(OWNER, TOKEN_ADDRESS)
+
+    for name, fn in (("legacy", legacy_call), ("method table", table_call)):
+        elapsed = min(timeit.repeat(fn, number=iterations, repeat=3))
+        print("{:<14} {:>10.2f}us per call".format(name, elapsed / iterations * 1e6))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
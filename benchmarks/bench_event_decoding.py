@@ -0,0 +1,75 @@
+"""Measures log decoding throughput on a synthetic stream of Transfer
+logs spread over many token contracts, comparing the EventRegistry topic
+index with hand rolled ContractTranslator.decode_event calls.
+
+The stream is generated in chunks so the full set of logs never has to
+be held in memory at once.
+
+usage: python benchmarks/bench_event_decoding.py [count] [baseline_count]
+"""
+import os
+import sys
+import time
+
+from ethereum.abi import ContractTranslator
+from ethereum.utils import sha3
+
+from asyncbb.ethereum.contract import Contract
+from asyncbb.ethereum.events import EventRegistry
+
+from abis import ERC20_ABI
+
+TOKENS = ["0x{:040x}".format(0x1000 + i) for i in range(100)]
+TRANSFER_TOPIC = '0x' + sha3("Transfer(address,address,uint256)").hex()
+CHUNK_SIZE = 10000
+
+def log_stream(count):
+    holders = ['0x' + '0' * 24 + os.urandom(20).hex() for _ in range(1000)]
+    for start in range(0, count, CHUNK_SIZE):
+        chunk = []
+        for i in range(start, min(count, start + CHUNK_SIZE)):
+            chunk.append({
+                "address": TOKENS[i % len(TOKENS)],
+                "topics": [TRANSFER_TOPIC, holders[i % 1000], holders[(i * 7) % 1000]],
+                "data": '0x{:064x}'.format(i * 10 ** 12),
+                "blockNumber": hex(i // 200),
+                "logIndex": hex(i % 200),
+            })
+        yield chunk
+
+def bench_registry(count):
+    registry = EventRegistry()
+    for address in TOKENS:
+        registry.add(Contract(abi=ERC20_ABI, address=address))
+    decoded = 0
+    elapsed = 0
+    for chunk in log_stream(count):
+        start = time.perf_counter()
+        decoded += len(registry.decode_logs(chunk))
+        elapsed += time.perf_counter() - start
+    return decoded, elapsed
+
+def bench_translator(count):
+    translators = {address: ContractTranslator(ERC20_ABI) for address in TOKENS}
+    decoded = 0
+    elapsed = 0
+    for chunk in log_stream(count):
+        start = time.perf_counter()
+        for log in chunk:
+            translator = translators.get(log['address'])
+            topics = [int(t, 16) for t in log['topics']]
+            translator.decode_event(topics, bytes.fromhex(log['data'][2:]))
+            decoded += 1
+        elapsed += time.perf_counter() - start
+    return decoded, elapsed
+
+def main(count, baseline_count):
+    for name, fn, n in (("decode_event", bench_translator, baseline_count),
+                        ("EventRegistry", bench_registry, count)):
+        decoded, elapsed = fn(n)
+        print("{:<14} {:>9} logs {:>8.2f}s {:>12.0f} logs/s".format(name, decoded, elapsed, decoded / elapsed))
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    baseline_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    main(count, baseline_count)
@@ -0,0 +1,64 @@
+"""Compares fetching the balance and nonce of many addresses one rpc call
+at a time with JsonRPCClient.get_accounts, against a local FakeNode
+server so the results reflect request overhead rather than node work.
+
+The sequential approach is only run over the first 1000 addresses, its
+rate is what matters.
+
+usage: python benchmarks/bench_get_accounts.py [count]
+"""
+import asyncio
+import sys
+import time
+
+import tornado.httpserver
+import tornado.web
+from tornado.testing import bind_unused_port
+
+from asyncbb.ethereum.client import JsonRPCClient
+from asyncbb.ethereum.test.fakenode import FakeNode, FakeNodeHandler
+
+def start_node(count):
+    node = FakeNode()
+    addresses = ['0x{:040x}'.format(i + 1) for i in range(count)]
+    for i, address in enumerate(addresses):
+        node.balances[address] = i * 10 ** 15
+        node.nonces[address] = i
+    sock, port = bind_unused_port()
+    server = tornado.httpserver.HTTPServer(tornado.web.Application([(r'^/$', FakeNodeHandler, {'node': node})]))
+    server.add_sockets([sock])
+    return node, server, "http://127.0.0.1:{}/".format(port), addresses
+
+async def bench_sequential(client, addresses):
+    start = time.perf_counter()
+    for address in addresses:
+        await client.eth_getBalance(address)
+        await client.eth_getTransactionCount(address)
+    return time.perf_counter() - start
+
+async def bench_get_accounts(client, addresses, **kwargs):
+    start = time.perf_counter()
+    await client.get_accounts(addresses, **kwargs)
+    return time.perf_counter() - start
+
+async def main(count):
+    node, server, url, addresses = start_node(count)
+    client = JsonRPCClient(url)
+    try:
+        runs = [("sequential", bench_sequential(client, addresses[:1000]), min(count, 1000))]
+        for batch_size in (100, 500):
+            for concurrency in (1, 4):
+                runs.append(("get_accounts batch={} concurrency={}".format(batch_size, concurrency),
+                             bench_get_accounts(client, addresses, batch_size=batch_size, concurrency=concurrency),
+                             count))
+        for name, coro, n in runs:
+            node.http_requests = 0
+            elapsed = await coro
+            print("{:<40} {:>6} addresses {:>8.3f}s {:>10.1f} addresses/s {:>6} http requests".format(
+                name, n, elapsed, n / elapsed, node.http_requests))
+    finally:
+        server.stop()
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    asyncio.get_event_loop().run_until_complete(main(count))
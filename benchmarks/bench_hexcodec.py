@@ -0,0 +1,56 @@
+"""Compares the regex based validate_hex (and the old int decoding) with
+the fast paths in asyncbb.ethereum.hexcodec, on the values seen in bulk
+calls: normalized addresses, topics padded to 32 bytes, int and bytes
+params, quantity results and mixed case addresses from results.
+
+usage: python benchmarks/bench_hexcodec.py [values]
+"""
+import sys
+import time
+
+from asyncbb.ethereum import hexcodec
+from asyncbb.ethereum.test.test_hexcodec import reference_validate_hex
+
+def old_decode_int(result):
+    if result.startswith("0x"):
+        result = result[2:]
+    return int(result, 16)
+
+def old_to_address(value):
+    return sys.intern(value.lower())
+
+def timed(fn, values, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in values:
+            fn(value)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(values) * 1e9
+
+def main(count):
+    # a few hundred popular addresses repeated, as in real results
+    addresses = ["0x{:040x}".format(i % 300 + 1) for i in range(count)]
+    checksummed = ["0x{:040X}".format(i % 300 + 1) for i in range(count)]
+    topics = ["0x{:x}".format(i) for i in range(count)]
+    ints = list(range(10 ** 18, 10 ** 18 + count))
+    raw = [i.to_bytes(20, 'big') for i in range(count)]
+    quantities = [hex(i) for i in ints]
+
+    cases = [
+        ("address", lambda v: reference_validate_hex(v), hexcodec.validate_hex, addresses),
+        ("topic (32 bytes)", lambda v: reference_validate_hex(v, 32), lambda v: hexcodec.validate_hex(v, 32), topics),
+        ("int param", reference_validate_hex, hexcodec.validate_hex, ints),
+        ("bytes param", reference_validate_hex, hexcodec.validate_hex, raw),
+        ("decode quantity", old_decode_int, hexcodec.decode_int, quantities),
+        ("address result", old_to_address, hexcodec.intern_address, checksummed),
+    ]
+    print("{:<18} {:>10} {:>10} {:>8}".format("ns per value", "before", "after", "speedup"))
+    for name, before, after, values in cases:
+        old = timed(before, values)
+        new = timed(after, values)
+        print("{:<18} {:>10.1f} {:>10.1f} {:>7.1f}x".format(name, old, new, old / new))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,68 @@
+"""Measures how long the client side modules take to import, using
+`python -X importtime` in a fresh interpreter for each run, and checks
+they don't pull in pyethereum, rlp or ethutils.
+
+Times are the best of several runs of the module's cumulative import time,
+after `asyncbb` itself (a pkg_resources namespace package, which is slow
+to set up on its own), asyncio and tornado have been imported, since any
+application using the client has those already. Bytecode is written on
+the first run so later runs don't include compiling. So the threshold
+doesn't depend on the machine it's compared against the import of
+ethereum.transactions on the same machine.
+
+Exits with status 1 if a module loads one of the heavy packages or takes
+more than `max_ratio` times as long as ethereum.transactions.
+
+usage: python benchmarks/bench_import_time.py [runs] [max_ratio]
+"""
+import os
+import subprocess
+import sys
+
+MODULES = ["asyncbb.ethereum", "asyncbb.ethereum.client", "asyncbb.ethereum.contract",
+           "asyncbb.ethereum.filters", "asyncbb.ethereum.pending", "asyncbb.ethereum.pipeline"]
+REFERENCE = "ethereum.transactions"
+HEAVY_PACKAGES = ("ethereum", "rlp", "ethutils")
+PREAMBLE = "import asyncbb, asyncio, tornado.web, tornado.httpclient"
+
+def import_time(module):
+    """returns (cumulative microseconds, names of all modules imported)"""
+
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "{}; import {}".format(PREAMBLE, module)],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True, env=env)
+    cumulative = None
+    imported = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        imported.append(name)
+        if name == module:
+            cumulative = int(cumulative_us)
+    return cumulative, imported
+
+def best_time(module, runs):
+    results = [import_time(module) for _ in range(runs)]
+    return min(cumulative for cumulative, _ in results), results[-1][1]
+
+def main(runs, max_ratio):
+    reference, _ = best_time(REFERENCE, runs)
+    print("{:<28} {:>10} {:>7}  {}".format("module", "ms", "ratio", "heavy packages loaded"))
+    print("{:<28} {:>10.1f} {:>7.2f}".format(REFERENCE, reference / 1000, 1.0))
+    failed = False
+    for module in MODULES:
+        cumulative, imported = best_time(module, runs)
+        heavy = sorted({name for name in imported if name.split('.')[0] in HEAVY_PACKAGES})
+        ratio = cumulative / reference
+        failed = failed or bool(heavy) or ratio > max_ratio
+        print("{:<28} {:>10.1f} {:>7.2f}  {}".format(module, cumulative / 1000, ratio, ', '.join(heavy) or '-'))
+    if failed:
+        print("FAILED: a module loads a heavy package or is slower than {:.2f}x {}".format(max_ratio, REFERENCE))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+                  float(sys.argv[2]) if len(sys.argv) > 2 else 0.5))
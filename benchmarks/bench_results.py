@@ -0,0 +1,110 @@
+"""Compares keeping blocks as the raw json dicts, converting every field of
+every transaction into a new dict by hand, and wrapping them in the typed
+result classes.
+
+For each, reports the time to load the blocks, to read the value and
+sender of every transaction the first time and on later passes, and the
+memory held after the first pass.
+
+usage: python benchmarks/bench_results.py [blocks] [transactions per block]
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from asyncbb.ethereum.results import Block
+
+def make_blocks(count, tx_count):
+    senders = ["0x{:040X}".format(i + 1) for i in range(50)]
+    return json.dumps([{
+        "number": hex(number), "hash": "0x{:064x}".format(number), "timestamp": hex(1500000000 + number * 15),
+        "gasUsed": hex(21000 * tx_count), "miner": senders[number % 50],
+        "transactions": [{
+            "hash": "0x{:064x}".format(number * tx_count + i), "nonce": hex(i), "blockNumber": hex(number),
+            "blockHash": "0x{:064x}".format(number), "transactionIndex": hex(i), "from": senders[i % 50],
+            "to": senders[(i + 1) % 50], "value": hex(10 ** 18 + i), "gas": hex(21000),
+            "gasPrice": hex(20000000000), "input": "0x"} for i in range(tx_count)]
+    } for number in range(count)])
+
+def raw_dicts(data):
+    blocks = json.loads(data)
+
+    def read():
+        total = 0
+        for block in blocks:
+            for tx in block['transactions']:
+                total += int(tx['value'], 16)
+                tx['from'].lower()
+        return total
+    return blocks, read
+
+def convert_tx(tx):
+    return {"hash": tx['hash'], "nonce": int(tx['nonce'], 16), "block_number": int(tx['blockNumber'], 16),
+            "block_hash": tx['blockHash'], "transaction_index": int(tx['transactionIndex'], 16),
+            "from": tx['from'].lower(), "to": tx['to'].lower() if tx['to'] else None,
+            "value": int(tx['value'], 16), "gas": int(tx['gas'], 16), "gas_price": int(tx['gasPrice'], 16),
+            "input": tx['input']}
+
+def converted_dicts(data):
+    blocks = [{"number": int(block['number'], 16), "hash": block['hash'],
+               "timestamp": int(block['timestamp'], 16), "gas_used": int(block['gasUsed'], 16),
+               "miner": block['miner'].lower(),
+               "transactions": [convert_tx(tx) for tx in block['transactions']]}
+              for block in json.loads(data)]
+
+    def read():
+        total = 0
+        for block in blocks:
+            for tx in block['transactions']:
+                total += tx['value']
+                tx['from']
+        return total
+    return blocks, read
+
+def typed(data):
+    blocks = [Block(block) for block in json.loads(data)]
+
+    def read():
+        total = 0
+        for block in blocks:
+            for tx in block.transactions:
+                total += tx.value
+                tx.from_address
+        return total
+    return blocks, read
+
+def main(count, tx_count, passes=5):
+    data = make_blocks(count, tx_count)
+    print("{:<18} {:>10} {:>10} {:>12} {:>12}".format("", "load", "first read", "later reads", "memory"))
+    for name, approach in (("raw dicts", raw_dicts), ("converted dicts", converted_dicts), ("typed", typed)):
+        gc.collect()
+        # the cyclic gc repeatedly scanning the growing heap would dominate the timings
+        gc.disable()
+        start = time.perf_counter()
+        blocks, read = approach(data)
+        loaded = time.perf_counter()
+        read()
+        first = time.perf_counter()
+        for _ in range(passes):
+            read()
+        later = (time.perf_counter() - first) / passes
+        gc.enable()
+        del blocks, read
+
+        # tracemalloc slows down allocation a lot, so memory is measured separately
+        gc.collect()
+        tracemalloc.start()
+        blocks, read = approach(data)
+        read()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del blocks, read
+        print("{:<18} {:>9.3f}s {:>9.3f}s {:>11.3f}s {:>9.1f}KiB".format(
+            name, loaded - start, first - loaded, later, current / 1024))
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    tx_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    main(count, tx_count)
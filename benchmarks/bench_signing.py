@@ -0,0 +1,71 @@
+"""Compares signing transactions inline on the event loop with signing
+them through the SigningService process pool.
+
+Reports throughput for each along with the worst event loop stall seen
+by a ticker coroutine running alongside the signing.
+
+usage: python benchmarks/bench_signing.py [count]
+"""
+import asyncio
+import os
+import sys
+import time
+
+from asyncbb.ethereum.signing import SigningService, sign_transaction
+
+PRIVATE_KEY = "0x0164f7c7399f4bb1eafeaae699ebbb12050bc6a50b2836b9ca766068a9d000c0"
+TO_ADDRESS = "0x39bf9e501e61440b4b268d7b2e9aa2458dd201bb"
+
+def make_transactions(count):
+    return [(nonce, 20000000000, 21000, TO_ADDRESS, 10 ** 15, b'') for nonce in range(count)]
+
+async def ticker(stop, interval=0.005):
+    """measures the longest time the event loop was unable to run us"""
+    worst = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+async def bench_inline(transactions):
+    stop = asyncio.Event()
+    tick = asyncio.ensure_future(ticker(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    for tx in transactions:
+        sign_transaction(PRIVATE_KEY, *tx)
+        # yield between transactions as a handler signing one at a time would
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await tick
+
+async def bench_pool(transactions, service):
+    stop = asyncio.Event()
+    tick = asyncio.ensure_future(ticker(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await service.sign_batch(PRIVATE_KEY, transactions)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await tick
+
+async def main(count):
+    transactions = make_transactions(count)
+    service = SigningService()
+    # warm up the worker processes so their startup isn't counted
+    await service.sign_batch(PRIVATE_KEY, transactions[:os.cpu_count()])
+
+    try:
+        for name, coro in (("inline", bench_inline(transactions)),
+                           ("pool ({} workers)".format(os.cpu_count()), bench_pool(transactions, service))):
+            elapsed, stall = await coro
+            print("{:<20} {:>8} txs {:>8.3f}s {:>10.1f} tx/s  max loop stall {:>8.1f}ms".format(
+                name, count, elapsed, count / elapsed, stall * 1000))
+    finally:
+        service.shutdown()
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    asyncio.get_event_loop().run_until_complete(main(count))